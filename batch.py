@@ -0,0 +1,101 @@
+"""
+Execução em lote usada pelo dump.py, refine.py e repack.py.
+
+Cada arquivo é uma tarefa independente. Com --jobs maior que 1 as tarefas rodam num
+ProcessPoolExecutor; a saída de cada uma é capturada e impressa em bloco, na ordem
+dos arquivos, para que as mensagens não se misturem e o resultado seja o mesmo
+qualquer que seja o número de processos. Uma falha não interrompe o lote: tudo é
+reunido num resumo no final. Os tempos e contadores (metrics) de cada processo
+voltam junto com o resultado da tarefa e são somados no processo principal.
+"""
+import contextlib
+import io
+import os
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+
+BatchResult = namedtuple('BatchResult', ['name', 'ok', 'output', 'error', 'metrics'], defaults=[None])
+
+
+def add_jobs_argument(parser):
+    """Adiciona a opção --jobs a um ArgumentParser."""
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="número de processos em paralelo (0 = um por CPU; padrão: 1)",
+    )
+
+
+def resolve_jobs(jobs):
+    if jobs is None or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def run_task(func, name, args, capture=True):
+    """
+    Executa func(*args) e devolve um BatchResult. A tarefa falha se levantar uma
+    exceção ou se retornar False.
+    """
+    buffer = io.StringIO()
+    redirect = contextlib.redirect_stdout(buffer) if capture else contextlib.nullcontext()
+    error = None
+    with redirect:
+        try:
+            ok = func(*args) is not False
+        except Exception:
+            ok = False
+            error = traceback.format_exc()
+    return BatchResult(name, ok, buffer.getvalue(), error)
+
+
+def _run_task_in_worker(func, name, args, level):
+    """run_task num processo do pool: aplica o nível das mensagens e devolve os números da tarefa."""
+    metrics.set_level(level)
+    metrics.reset()
+    result = run_task(func, name, args)
+    return result._replace(metrics=metrics.snapshot())
+
+
+def _print_result(result):
+    if result.output:
+        print(result.output, end="")
+    if result.error:
+        print(f"ERRO: exceção ao processar {result.name}:\n{result.error}")
+
+
+def print_summary(results):
+    failures = [result.name for result in results if not result.ok]
+    print(f"=== Resumo: {len(results)} arquivo(s), {len(results) - len(failures)} ok, {len(failures)} com falha ===")
+    for name in failures:
+        print(f"  FALHA: {name}")
+
+
+def run_batch(func, tasks, jobs=1):
+    """
+    Executa func para cada tarefa (nome, args) e imprime um resumo.
+    Executa e imprime na ordem em que as tarefas chegam, e os resultados voltam nessa
+    mesma ordem; quem chama ordena a lista, se quiser.
+    """
+    jobs = min(resolve_jobs(jobs), max(len(tasks), 1))
+    results = []
+
+    if jobs == 1:
+        for name, args in tasks:
+            result = run_task(func, name, args, capture=False)
+            _print_result(result)
+            results.append(result)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_run_task_in_worker, func, name, args, metrics.get_level())
+                       for name, args in tasks]
+            for future in futures:
+                result = future.result()
+                metrics.merge(result.metrics)
+                _print_result(result)
+                results.append(result)
+
+    print_summary(results)
+    return results
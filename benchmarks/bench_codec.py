@@ -0,0 +1,119 @@
+"""
+Benchmark e verificação de ida e volta do codec 'scn' (scn_codec.py).
+
+Compara as implementações originais, byte a byte com `result +=` e regex por tag,
+com o codec baseado em tabela, e confere em entradas aleatórias que:
+  - decodificar dá exatamente o mesmo texto que a implementação original;
+  - codificar dá exatamente os mesmos bytes que a implementação original;
+  - codificar o texto decodificado devolve os bytes originais.
+
+Uso: python benchmarks/bench_codec.py [quantidade_de_amostras]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scn_codec
+
+
+def legacy_format_string_with_codes(data, start_offset):
+    result = ""
+    pos = start_offset
+    while pos < len(data) and data[pos] != 0:
+        byte_val = data[pos]
+        if byte_val == 0x0E:
+            result += '\n'
+        else:
+            if 0x20 <= byte_val <= 0x7E or 0xA1 <= byte_val <= 0xDF:
+                result += bytes([byte_val]).decode('latin-1')
+            else:
+                result += f"<HEX={byte_val:02X}>"
+        pos += 1
+    return result
+
+
+def legacy_convert_text_to_bytes(text):
+    text = text.replace('\n', chr(0x0E))
+
+    def hex_replacer(match):
+        return chr(int(match.group(1), 16))
+
+    text = re.sub(r'<HEX=([0-9A-F]{2})>', hex_replacer, text, flags=re.IGNORECASE)
+    return text.encode('latin-1')
+
+
+def random_string_bytes(rng):
+    """String sem 0x00, com predominância de texto como nos scripts reais."""
+    out = bytearray()
+    for _ in range(rng.randint(0, 80)):
+        roll = rng.random()
+        if roll < 0.7:
+            out.append(rng.randint(0x20, 0x7E))
+        elif roll < 0.85:
+            out.append(rng.randint(0xA1, 0xDF))
+        else:
+            out.append(rng.randint(1, 255))
+    return bytes(out)
+
+
+def random_translation(rng):
+    """Texto como um tradutor escreveria: letras, acentos, quebras de linha e tags em qualquer caixa."""
+    pieces = []
+    for _ in range(rng.randint(0, 20)):
+        roll = rng.random()
+        if roll < 0.6:
+            pieces.append(''.join(chr(rng.randint(0x20, 0xFF)) for _ in range(rng.randint(1, 8))))
+        elif roll < 0.75:
+            pieces.append('\n')
+        else:
+            tag = f"<HEX={rng.randint(0, 255):02X}>"
+            pieces.append(tag.lower() if rng.random() < 0.2 else tag)
+    return ''.join(pieces)
+
+
+def check_round_trip(samples, seed=0):
+    rng = random.Random(seed)
+    for _ in range(samples):
+        raw = random_string_bytes(rng) + b'\x00' + random_string_bytes(rng)
+        text = scn_codec.decode_string_at(raw, 0)
+        assert text == legacy_format_string_with_codes(raw, 0), raw
+        assert text.encode('scn') == raw[:raw.index(0)], raw
+        assert raw.decode('scn') == ''.join(scn_codec.DECODING_TABLE[b] for b in raw)
+
+        translation = random_translation(rng)
+        assert translation.encode('scn') == legacy_convert_text_to_bytes(translation), translation
+
+
+def timed(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(*item) if isinstance(item, tuple) else func(item)
+    return time.perf_counter() - start
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    check_round_trip(samples)
+    print(f"Ida e volta: {samples} amostras idênticas às funções originais.")
+
+    rng = random.Random(1)
+    blobs = [(random_string_bytes(rng) + b'\x00', 0) for _ in range(samples)]
+    texts = [random_translation(rng) for _ in range(samples)]
+    total_bytes = sum(len(blob) for blob, _ in blobs)
+    total_chars = sum(len(text) for text in texts)
+
+    old = timed(legacy_format_string_with_codes, blobs)
+    new = timed(scn_codec.decode_string_at, blobs)
+    print(f"Decodificação: antigo {total_bytes / old / 1e6:6.2f} MB/s | novo {total_bytes / new / 1e6:6.2f} MB/s | {old / new:5.1f}x")
+
+    old = timed(legacy_convert_text_to_bytes, texts)
+    new = timed(lambda text: text.encode('scn'), texts)
+    print(f"Codificação:   antigo {total_chars / old / 1e6:6.2f} Mc/s | novo {total_chars / new / 1e6:6.2f} Mc/s | {old / new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Verificação e benchmark da compactação do repack (rebuild_scn com compact=True).
+
+Para cada .SCN sintético (scn_corpus), as strings que o filtro do dump mantém são
+"traduzidas" com frases de um conjunto pequeno, metade delas sufixo de outra, e o
+arquivo é reconstruído com e sem compactação. Confere que:
+  - cada ponteiro das strings traduzidas aponta para o texto novo delas;
+  - cada ponteiro relocado de string descartada/órfã aponta para o mesmo conteúdo de antes;
+  - o tamanho compactado é o normal menos os bytes economizados informados.
+Mostra os bytes economizados, o tempo e quantos arquivos só cabem nos 64 KB com a
+compactação. Por fim, aumenta as traduções até estourar os 64 KB dos ponteiros
+e mostra o relatório do OverflowError.
+
+Uso: python benchmarks/bench_compact.py [quantidade_de_arquivos] [semente]
+"""
+import bisect
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dump
+import metrics
+import repack
+import scn_corpus
+import scn_strings
+
+PHRASES = ["Where is Anthy?", "Utena, wait for me!", "I will revolutionize the world.",
+           "The rose bride belongs to the victor of the duel.", "Yes.", "...", "Thank you."]
+
+
+def make_translation(rng):
+    phrase = rng.choice(PHRASES)
+    if rng.random() < 0.5:
+        return phrase
+    # Um sufixo de outra frase (começando num espaço, como costuma acontecer).
+    cut = rng.randint(0, len(phrase) - 1)
+    return phrase[cut:]
+
+
+def load_case(data, rng):
+    metrics.set_level(metrics.QUIET)
+    records = dump.extract_string_records(data)
+    kept = [record for record in records if dump.is_valid_text_record(record)]
+    for record in kept:
+        record.text = make_translation(rng)
+    return scn_strings.StringTable.from_records(kept), scn_strings.relocations_of(records)
+
+
+def check(data, strings_info, encoded_texts, relocations, new_data):
+    """
+    Compara só os bytes próprios de cada alvo: o texto novo de uma string traduzida e,
+    para os outros alvos, o original até o 0x00 ou até a próxima string traduzida
+    (strings sem terminador próprio continuam na seguinte, como no original).
+    """
+    expected = dict(zip(strings_info.offsets, encoded_texts))
+    starts = sorted(expected)
+    pointer_area_end = starts[0]
+    all_locs = {loc for loc, _ in relocations}
+    for loc, target in relocations:
+        # Candidatos sobrepostos (loc e loc+1) não podem ser os dois ponteiros de verdade.
+        if loc + 2 > pointer_area_end or loc - 1 in all_locs or loc + 1 in all_locs:
+            continue
+        new_target = new_data[loc] | (new_data[loc + 1] << 8)
+        if target in expected:
+            own = expected[target]
+        elif new_target != target:
+            end = data.find(b'\x00', target)
+            if end == -1:
+                end = len(data)
+            following = bisect.bisect_right(starts, target)
+            if following < len(starts):
+                end = min(end, starts[following])
+            own = data[target:end]
+        else:
+            continue
+        assert new_data[new_target:new_target + len(own)] == own, f"ponteiro em 0x{loc:X}"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = random.Random(seed)
+    cases = []
+    for number, size in enumerate(scn_corpus.corpus_sizes(count, seed)):
+        data = scn_corpus.make_scn(size, seed * 1000003 + number)
+        strings_info, relocations = load_case(data, rng)
+        if strings_info:
+            encoded = [repack.convert_text_to_bytes(text) for text in strings_info.texts]
+            cases.append((data, strings_info, encoded, relocations))
+
+    timings = {}
+    results = {}
+    for compact in (False, True):
+        results[compact] = []
+        start = time.perf_counter()
+        for data, strings_info, encoded, relocations in cases:
+            try:
+                results[compact].append(repack.rebuild_scn(data, strings_info, encoded, relocations, compact))
+            except OverflowError:
+                results[compact].append(None)
+        timings[compact] = time.perf_counter() - start
+
+    merged = saved = total = rescued = 0
+    for case, plain, compacted in zip(cases, results[False], results[True]):
+        assert compacted is not None or plain is None
+        if compacted is None:
+            continue
+        check(case[0], case[1], case[2], case[3], compacted[0])
+        merged += compacted[3][0]
+        saved += compacted[3][1]
+        total += len(compacted[0]) + compacted[3][1]
+        if plain is None:
+            rescued += 1
+        else:
+            assert len(plain[0]) - len(compacted[0]) == compacted[3][1]
+    overflowed = sum(result is None for result in results[False])
+    print(f"{len(cases)} arquivos, {sum(len(case[1]) for case in cases)} strings traduzidas")
+    print(f"  normal     {timings[False] * 1000:8.1f} ms | {overflowed} arquivo(s) passam de 64 KB")
+    print(f"  compactado {timings[True] * 1000:8.1f} ms | {overflowed - rescued} arquivo(s) passam de 64 KB | "
+          f"{merged} strings reaproveitadas, {saved} bytes economizados ({100 * saved / total:.1f}%)")
+    print("Ponteiros e dados preservados conferidos.")
+
+    # Estouro: traduções longas no maior arquivo até passar de 64 KB.
+    data, strings_info, _, relocations = max(cases, key=lambda case: len(case[0]))
+    long_texts = [repack.convert_text_to_bytes(text * 8) for text in strings_info.texts]
+    try:
+        repack.rebuild_scn(data, strings_info, long_texts, relocations, compact=True)
+        print("AVISO: o caso de estouro coube nos 64 KB.")
+    except OverflowError as error:
+        print(f"Relatório de estouro:\n{error}")
+
+
+if __name__ == "__main__":
+    main()
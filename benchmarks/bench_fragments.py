@@ -0,0 +1,69 @@
+"""
+Benchmark do filtro de fragmentos (substrings) do refine.py.
+
+Gera candidatos sintéticos (frases, cópias exatas e pedaços de outras frases) e mede
+refine.find_fragment_indices de 100 a 100k candidatos. Até um limite, também roda a
+comparação O(n²) original e confere que o conjunto rejeitado é exatamente o mesmo.
+
+Uso: python benchmarks/bench_fragments.py [limite_da_versao_antiga]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import refine
+
+WORDS = ("Utena Anthy Touga Juri Miki Saionji Nanami Wakaba Chu-Chu rose bride duel castle "
+         "eternity revolution prince coffin student council sword world shell egg").split()
+
+
+def make_candidates(count, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    while len(texts) < count:
+        roll = rng.random()
+        if texts and roll < 0.1:
+            texts.append(rng.choice(texts))
+        elif texts and roll < 0.3:
+            source = rng.choice(texts)
+            start = rng.randrange(len(source))
+            texts.append(source[start:rng.randint(start + 1, len(source))])
+        else:
+            texts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12))))
+    return texts
+
+
+def legacy_fragment_indices(texts):
+    indices_to_remove = set()
+    for i in range(len(texts)):
+        for j in range(len(texts)):
+            if i == j:
+                continue
+            if texts[i] in texts[j] and len(texts[i]) < len(texts[j]):
+                indices_to_remove.add(i)
+                break
+    return indices_to_remove
+
+
+def main():
+    legacy_limit = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    for count in (100, 300, 1000, 3000, 10000, 30000, 100000):
+        texts = make_candidates(count)
+        start = time.perf_counter()
+        fragments = refine.find_fragment_indices(texts)
+        new_time = time.perf_counter() - start
+        line = f"{count:>7} candidatos: {len(fragments):>6} fragmentos | novo {new_time:8.3f} s"
+        if count <= legacy_limit:
+            start = time.perf_counter()
+            expected = legacy_fragment_indices(texts)
+            old_time = time.perf_counter() - start
+            assert fragments == expected, "Conjunto rejeitado diferente da implementação original!"
+            line += f" | antigo {old_time:8.3f} s | {old_time / new_time:6.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
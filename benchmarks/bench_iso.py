@@ -0,0 +1,233 @@
+"""
+Verificação e benchmark do acesso direto à imagem do disco (scn_iso).
+
+Monta imagens sintéticas pequenas (ISO 9660 de 2048 bytes por setor e BIN cru de
+2352 bytes, Mode 1), com os .SCN numa subpasta, e confere:
+  - listagem e leitura de todos os .SCN direto da imagem;
+  - gravação no lugar (mesmo número de setores) e realocação para o fim da imagem,
+    com o registro de diretório e o tamanho do volume atualizados;
+  - EDC dos setores crus regravados e que os outros arquivos não mudaram;
+  - um nome repetido em duas pastas: só o caminho completo acha cada cópia;
+  - open_image_cached: a mesma imagem aberta é reaproveitada até o arquivo mudar.
+Também compara o tempo de ler todos os .SCN da imagem com o de lê-los já extraídos.
+
+Uso: python benchmarks/bench_iso.py [quantidade_de_arquivos]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scn_iso
+
+SECTOR = scn_iso.SECTOR_SIZE
+
+
+def make_record(name, extent, size, is_directory=False):
+    """Registro de diretório ISO 9660."""
+    name_bytes = name if isinstance(name, bytes) else name.encode('ascii')
+    length = 33 + len(name_bytes)
+    length += length % 2
+    record = bytearray(length)
+    record[0] = length
+    record[2:10] = scn_iso._both_endian32(extent)
+    record[10:18] = scn_iso._both_endian32(size)
+    record[25] = scn_iso.FLAG_DIRECTORY if is_directory else 0
+    record[28:32] = (1).to_bytes(2, 'little') + (1).to_bytes(2, 'big')
+    record[32] = len(name_bytes)
+    record[33:33 + len(name_bytes)] = name_bytes
+    return bytes(record)
+
+
+def make_directory(self_extent, parent_extent, children):
+    """Conteúdo de um diretório (vários setores se preciso; registros não cruzam setores)."""
+    records = [make_record(b'\x00', self_extent, 0, True), make_record(b'\x01', parent_extent, SECTOR, True)]
+    records += children
+    sectors = [bytearray()]
+    for record in records:
+        if len(sectors[-1]) + len(record) > SECTOR:
+            sectors.append(bytearray())
+        sectors[-1] += record
+    content = b''.join(bytes(sector).ljust(SECTOR, b'\x00') for sector in sectors)
+    # O tamanho do "." é o tamanho do próprio diretório.
+    content = bytearray(content)
+    content[10:18] = scn_iso._both_endian32(len(content))
+    return bytes(content)
+
+
+def make_synthetic_image(path, files, raw=False):
+    """Grava uma imagem com /SCN/<arquivos> e um README na raiz. `files` é {nome: bytes}."""
+    names = sorted(files)
+    scn_records_estimate = (len(names) * 48) // SECTOR + 2
+    root_lba = 18
+    scn_dir_lba = root_lba + 1
+    next_lba = scn_dir_lba + scn_records_estimate
+
+    sectors = {}
+    file_records = []
+    for name in names:
+        data = files[name]
+        file_records.append(make_record(f"{name};1", next_lba, len(data)))
+        for k in range(0, max(len(data), 1), SECTOR):
+            sectors[next_lba] = data[k:k + SECTOR]
+            next_lba += 1
+    readme = b"imagem sintetica\n"
+    readme_lba = next_lba
+    sectors[readme_lba] = readme
+    next_lba += 1
+
+    scn_dir = make_directory(scn_dir_lba, root_lba, file_records)
+    assert len(scn_dir) // SECTOR <= scn_records_estimate
+    for k in range(len(scn_dir) // SECTOR):
+        sectors[scn_dir_lba + k] = scn_dir[k * SECTOR:(k + 1) * SECTOR]
+    root = make_directory(root_lba, root_lba, [
+        make_record("README.TXT;1", readme_lba, len(readme)),
+        make_record("SCN", scn_dir_lba, len(scn_dir), True),
+    ])
+    sectors[root_lba] = root
+
+    pvd = bytearray(SECTOR)
+    pvd[0:6] = scn_iso.PVD_SIGNATURE
+    pvd[6] = 1
+    pvd[80:88] = scn_iso._both_endian32(next_lba)
+    pvd[156:190] = make_record(b'\x00', root_lba, len(root), True)
+    sectors[16] = bytes(pvd)
+    sectors[17] = b'\xffCD001\x01'
+
+    with open(path, 'wb') as f_out:
+        for lba in range(next_lba):
+            data = bytes(sectors.get(lba, b'')).ljust(SECTOR, b'\x00')
+            if not raw:
+                f_out.write(data)
+                continue
+            sector = bytearray(scn_iso.RAW_SECTOR_SIZE)
+            sector[0:12] = scn_iso.SYNC_PATTERN
+            sector[12:16] = scn_iso._msf_header(lba, 1)
+            sector[16:16 + SECTOR] = data
+            scn_iso.regenerate_edc_ecc(sector)
+            f_out.write(sector)
+
+
+def make_files(count, seed=0):
+    rng = random.Random(seed)
+    return {f"A{k:03d}.SCN": bytes(rng.randrange(256) for _ in range(rng.randint(100, 12000)))
+            for k in range(count)}
+
+
+def check_raw_edc(path):
+    """Confere o EDC de todos os setores crus da imagem."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    for start in range(0, len(content), scn_iso.RAW_SECTOR_SIZE):
+        sector = content[start:start + scn_iso.RAW_SECTOR_SIZE]
+        stored = int.from_bytes(sector[0x810:0x814], 'little')
+        assert scn_iso.compute_edc(sector[:0x810]) == stored, f"EDC inválido no setor {start // scn_iso.RAW_SECTOR_SIZE}"
+
+
+def check_image(path, files, raw):
+    with scn_iso.DiscImage(path) as image:
+        assert image.list_files(".SCN") == sorted(files)
+        for name, data in files.items():
+            assert image.read_file(name) == data, name
+        assert image.read_file("README.TXT") == b"imagem sintetica\n"
+        volume_size = image.sector_count
+
+    names = sorted(files)
+    expected = dict(files)
+    # Menor (mesmos setores), um pouco maior sem passar do setor e bem maior (realocação).
+    expected[names[0]] = files[names[0]][:len(files[names[0]]) // 2]
+    used = len(files[names[1]]) % SECTOR
+    expected[names[1]] = files[names[1]] + b'\x5a' * (SECTOR - used if used else 0)
+    expected[names[2]] = files[names[2]] + b'\xa5' * (3 * SECTOR)
+
+    with scn_iso.DiscImage(path, writable=True) as image:
+        assert image.write_file(names[0], expected[names[0]]) is False
+        assert image.write_file(names[1], expected[names[1]]) is False
+        assert image.write_file(names[2], expected[names[2]]) is True
+
+    with scn_iso.DiscImage(path) as image:
+        for name, data in expected.items():
+            assert image.read_file(name) == data, name
+        assert image.read_file("README.TXT") == b"imagem sintetica\n"
+        grown = scn_iso._sectors_for(len(expected[names[2]]))
+        assert image.sector_count == volume_size + grown
+        pvd = bytes(image.sector(scn_iso.PVD_SECTOR))
+        assert int.from_bytes(pvd[80:84], 'little') == image.sector_count
+        assert int.from_bytes(pvd[84:88], 'big') == image.sector_count
+    if raw:
+        check_raw_edc(path)
+
+
+def check_duplicate_names(path):
+    """README.TXT na raiz e outro em /SCN: o nome sozinho é ambíguo, o caminho completo não."""
+    make_synthetic_image(path, {"A001.SCN": b"script\n", "README.TXT": b"outro\n"})
+    with scn_iso.DiscImage(path, writable=True) as image:
+        assert image.list_files(".TXT") == ["/README.TXT", "/SCN/README.TXT"]
+        assert image.list_files(".SCN") == ["A001.SCN"]
+        try:
+            image.read_file("README.TXT")
+            raise AssertionError("nome repetido resolvido sem o caminho completo")
+        except ValueError:
+            pass
+        assert image.read_file("/README.TXT") == b"imagem sintetica\n"
+        assert image.read_file("SCN/README.TXT") == b"outro\n"
+        image.write_file("/SCN/README.TXT", b"novo\n")
+        assert image.read_file("/SCN/README.TXT") == b"novo\n"
+        assert image.read_file("/README.TXT") == b"imagem sintetica\n"
+
+
+def check_image_cache(path):
+    image = scn_iso.open_image_cached(path)
+    assert scn_iso.open_image_cached(path) is image
+    data = image.read_file("A001.SCN")
+    with scn_iso.DiscImage(path, writable=True) as writable:
+        writable.write_file("A001.SCN", data + b"!")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    reopened = scn_iso.open_image_cached(path)
+    assert reopened is not image and reopened.read_file("A001.SCN") == data + b"!"
+    reopened.close()
+
+
+def time_reads(path, folder, files):
+    start = time.perf_counter()
+    with scn_iso.DiscImage(path) as image:
+        total = sum(len(image.read_file(name)) for name in image.list_files(".SCN"))
+    image_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    extracted = 0
+    for name in files:
+        with open(os.path.join(folder, name), 'rb') as f:
+            extracted += len(f.read())
+    folder_time = time.perf_counter() - start
+    assert total == extracted
+    return image_time, folder_time
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    files = make_files(count)
+    with tempfile.TemporaryDirectory() as folder:
+        for name, data in files.items():
+            with open(os.path.join(folder, name), 'wb') as f_out:
+                f_out.write(data)
+        for raw in (False, True):
+            kind = "BIN 2352" if raw else "ISO 2048"
+            path = os.path.join(folder, "disco.bin" if raw else "disco.iso")
+            make_synthetic_image(path, files, raw=raw)
+            image_time, folder_time = time_reads(path, folder, files)
+            print(f"{kind}: {count} arquivos | leitura da imagem {image_time * 1000:.1f} ms | "
+                  f"arquivos extraídos {folder_time * 1000:.1f} ms")
+            check_image(path, files, raw)
+            print(f"{kind}: leitura, gravação no lugar e realocação OK")
+        path = os.path.join(folder, "repetidos.iso")
+        check_duplicate_names(path)
+        check_image_cache(path)
+        print("Nomes repetidos e reaproveitamento da imagem aberta OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark de memória do modelo de strings (scn_strings) contra as estruturas antigas.
+
+Extrai as strings de um lote de .SCN sintéticos (scn_corpus) e monta, para todos
+os arquivos de uma vez (como num lote grande rodando num só processo), as
+estruturas que o dump, o refine e o repack mantêm na memória:
+  - registros do dump: um dicionário por string x DumpRecord (__slots__);
+  - strings do repack: lista de dicionários x StringTable (colunas em array('I'));
+  - entradas do .idx: um objeto com lista de ponteiros por string x StringTable;
+  - candidatos do refine: um dicionário por bloco x colunas (posições, textos, blocos).
+Os textos já existem antes da medição e são compartilhados pelos dois lados, então
+o tracemalloc mede só o custo das estruturas.
+
+Uso: python benchmarks/bench_memory.py [quantidade_de_arquivos] [semente]
+"""
+import os
+import sys
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dump
+import metrics
+import scn_corpus
+import scn_strings
+
+
+class LegacyIndexEntry:
+    """Entrada do .idx como era antes: uma string com a sua própria lista de ponteiros."""
+
+    def __init__(self, offset, length, pointer_locs):
+        self.offset = offset
+        self.length = length
+        self.pointer_locs = pointer_locs
+
+
+def legacy_dump_records(fields):
+    return [{'offset': offset, 'length': length, 'pointer_locs': list(locs), 'text': text,
+             'num_hex_tags': num_hex_tags, 'clean_text': clean_text}
+            for offset, length, locs, text, num_hex_tags, clean_text, _ in fields]
+
+
+def new_dump_records(fields):
+    records = []
+    for offset, length, locs, text, num_hex_tags, clean_text, _ in fields:
+        record = dump.DumpRecord(offset, length, list(locs), text)
+        record.num_hex_tags = num_hex_tags
+        record.clean_text = clean_text
+        records.append(record)
+    return records
+
+
+def legacy_strings_info(fields):
+    return [{'original_offset': offset, 'pointer_locs': list(locs), 'text': text}
+            for offset, _, locs, text, _, _, _ in fields]
+
+
+def new_strings_info(fields):
+    table = scn_strings.StringTable()
+    for offset, _, locs, text, _, _, _ in fields:
+        table.append(offset, 0, locs, text)
+    return table
+
+
+def legacy_index_entries(fields):
+    return [LegacyIndexEntry(offset, length, list(locs)) for offset, length, locs, _, _, _, _ in fields]
+
+
+def new_index_entries(fields):
+    table = scn_strings.StringTable()
+    for offset, length, locs, _, _, _, _ in fields:
+        table.append(offset, length, locs)
+    return table
+
+
+def legacy_candidates(fields):
+    return [{'block': block, 'clean_text': clean_text, 'position': position}
+            for position, (_, _, _, _, _, clean_text, block) in enumerate(fields)]
+
+
+def new_candidates(fields):
+    positions = array('I')
+    clean_texts = []
+    raw_blocks = []
+    for position, (_, _, _, _, _, clean_text, block) in enumerate(fields):
+        positions.append(position)
+        clean_texts.append(clean_text)
+        raw_blocks.append(block)
+    return positions, clean_texts, raw_blocks
+
+
+STRUCTURES = [
+    ("registros do dump", legacy_dump_records, new_dump_records),
+    ("strings do repack", legacy_strings_info, new_strings_info),
+    ("entradas do .idx", legacy_index_entries, new_index_entries),
+    ("candidatos do refine", legacy_candidates, new_candidates),
+]
+
+
+def retained_memory(build, corpus):
+    """Memória que continua alocada depois de montar a estrutura de todos os arquivos."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = [build(fields) for fields in corpus]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return after - before
+
+
+def load_corpus(count, seed):
+    metrics.set_level(metrics.QUIET)
+    corpus = []
+    for number, size in enumerate(scn_corpus.corpus_sizes(count, seed)):
+        data = scn_corpus.make_scn(size, seed * 1000003 + number)
+        records = dump.extract_string_records(data) or []
+        # Campos prontos (textos e blocos já criados) para os dois lados usarem os mesmos objetos.
+        corpus.append([(record.offset, record.length, tuple(record.pointer_locs), record.text,
+                        record.num_hex_tags, record.clean_text, dump.format_string_block(k + 1, record))
+                       for k, record in enumerate(records)])
+    return corpus
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    corpus = load_corpus(count, seed)
+    strings = sum(len(fields) for fields in corpus)
+    pointers = sum(len(field[2]) for fields in corpus for field in fields)
+    print(f"{len(corpus)} arquivos, {strings} strings, {pointers} locais de ponteiro")
+
+    total_old = total_new = 0
+    for name, legacy, new in STRUCTURES:
+        old_bytes = retained_memory(legacy, corpus)
+        new_bytes = retained_memory(new, corpus)
+        total_old += old_bytes
+        total_new += new_bytes
+        print(f"  {name:<22} antigo {old_bytes / 1024:9.1f} KiB | novo {new_bytes / 1024:9.1f} KiB | "
+              f"{100 * (1 - new_bytes / old_bytes):5.1f}% menos")
+    print(f"  {'total':<22} antigo {total_old / 1024:9.1f} KiB | novo {total_new / 1024:9.1f} KiB | "
+          f"{100 * (1 - total_new / total_old):5.1f}% menos")
+
+
+if __name__ == "__main__":
+    main()
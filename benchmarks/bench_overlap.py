@@ -0,0 +1,77 @@
+"""
+Verificação das strings sobrepostas no repack (rebuild_scn).
+
+Às vezes um ponteiro aponta para o meio de uma string ("me!" dentro de "Wait for
+me!", sem 0x00 entre elas) e as duas vão para o .txt. Monta um .SCN pequeno com uma
+cadeia dessas (três strings que terminam no mesmo 0x00) e uma string comum depois,
+traduz cada combinação delas e confere, com e sem compactação, que cada ponteiro
+leva ao texto certo até o 0x00:
+  - sem mudança, o arquivo reconstruído é igual ao original;
+  - se o texto de fora ainda termina com o de dentro, elas continuam sobrepostas
+    (nenhum byte a mais que as traduções);
+  - senão, a de fora ganha o seu próprio terminador.
+
+Uso: python benchmarks/bench_overlap.py
+"""
+import itertools
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dump
+import repack
+import scn_strings
+
+POINTER_AREA = 0x20
+# (local do ponteiro, texto original). As três primeiras se sobrepõem.
+STRINGS = [(0x10, "Wait for me!"), (0x14, "for me!"), (0x18, "me!"), (0x1C, "Yes.")]
+TRANSLATIONS = ["Espere por mim!", "por mim!", "mim!", "Sim."]
+
+
+def make_case():
+    text = STRINGS[0][1].encode('ascii') + b'\x00\x00' + STRINGS[3][1].encode('ascii') + b'\x00'
+    data = bytearray(POINTER_AREA) + text
+    struct.pack_into('<H', data, dump.ANCHOR_POINTER_OFFSET, POINTER_AREA)
+    offsets = [POINTER_AREA + text.index(string.encode('ascii')) for _, string in STRINGS]
+    for (loc, _), offset in zip(STRINGS, offsets):
+        struct.pack_into('<H', data, loc, offset)
+    return bytes(data), offsets
+
+
+def read_string(data, loc):
+    target = data[loc] | (data[loc + 1] << 8)
+    return bytes(data[target:data.index(b'\x00', target)])
+
+
+def main():
+    data, offsets = make_case()
+    checked = 0
+    for changed in itertools.product((False, True), repeat=len(STRINGS)):
+        texts = [translation if change else original
+                 for (_, original), translation, change in zip(STRINGS, TRANSLATIONS, changed)]
+        strings_info = scn_strings.StringTable()
+        for (loc, _), offset, text in zip(STRINGS, offsets, texts):
+            strings_info.append(offset, 0, [loc], text)
+        encoded = [repack.convert_text_to_bytes(text) for text in texts]
+        for compact in (False, True):
+            new_data = repack.rebuild_scn(data, strings_info, encoded, compact=compact)[0]
+            for (loc, _), text_bytes in zip(STRINGS, encoded):
+                assert read_string(new_data, loc) == text_bytes, \
+                    f"{changed} compact={compact}: ponteiro em 0x{loc:X} leva a {read_string(new_data, loc)!r}"
+            if not any(changed):
+                assert new_data == data, f"compact={compact}: sem mudança, o arquivo mudou"
+            checked += 1
+    # A de fora ainda termina com a de dentro: só a diferença dos textos entra no arquivo.
+    strings_info = scn_strings.StringTable()
+    texts = ["Please wait for me!", "for me!", "me!", "Yes."]
+    for (loc, _), offset, text in zip(STRINGS, offsets, texts):
+        strings_info.append(offset, 0, [loc], text)
+    new_data = repack.rebuild_scn(data, strings_info)[0]
+    assert len(new_data) == len(data) + len("Please "), "a sobreposição não foi mantida"
+    print(f"{checked} combinações de traduções conferidas (strings sobrepostas).")
+
+
+if __name__ == "__main__":
+    main()
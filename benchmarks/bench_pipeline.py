@@ -0,0 +1,193 @@
+"""
+Benchmark de vazão das etapas do fluxo dump -> refine -> repack.
+
+Gera (ou reaproveita) um corpus sintético com scn_corpus e mede, separadamente e no
+mesmo processo:
+  dump    : dump.dump_pointers_only        (.SCN -> dump bruto)
+  refine  : refine.filter_and_renumber_dump (dump bruto -> .txt filtrado)
+  parse   : repack.parse_filtered_txt      (.txt filtrado -> lista de strings)
+  repack  : repack.repack_file             (.txt filtrado + .SCN -> .SCN novo)
+Cada etapa é repetida (--repeat) e vale o melhor tempo. Para cada etapa mostra bytes/s
+e strings/s, grava o resultado em JSON e compara com um baseline salvo antes
+(--save-baseline), apontando as etapas que ficaram mais lentas.
+
+Uso: python benchmarks/bench_pipeline.py [--files N] [--seed S] [--corpus PASTA]
+                                         [--output resultado.json] [--baseline baseline.json]
+                                         [--save-baseline] [--repeat 3] [--tolerance 0.10]
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+BENCH_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_FOLDER))
+
+import dump
+import dump_format
+import refine
+import repack
+import scn_corpus
+
+DEFAULT_BASELINE = os.path.join(BENCH_FOLDER, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_FOLDER, "results.json")
+STAGES = ["dump", "refine", "parse", "repack"]
+
+
+def count_blocks(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return sum(line.startswith(dump_format.STRING_MARKER) for line in f)
+
+
+def run_stage(items, func, repeat):
+    """
+    Roda `func(item)` para cada item, `repeat` vezes, com a saída das ferramentas
+    descartada. Retorna (melhor tempo em segundos, falhas).
+    """
+    best = None
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            failures = 0
+            start = time.perf_counter()
+            for item in items:
+                if func(item) in (False, None):
+                    failures += 1
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    return best, failures
+
+
+def stage_result(elapsed, byte_count, string_count, failures):
+    return {
+        'seconds': round(elapsed, 4),
+        'bytes': byte_count,
+        'strings': string_count,
+        'bytes_per_s': round(byte_count / elapsed) if elapsed else None,
+        'strings_per_s': round(string_count / elapsed) if elapsed else None,
+        'failures': failures,
+    }
+
+
+def run_pipeline(scn_paths, work_folder, repeat=1):
+    raw_folder = os.path.join(work_folder, "raw")
+    filtered_folder = os.path.join(work_folder, "filtered")
+    repacked_folder = os.path.join(work_folder, "repacked")
+    for folder in (raw_folder, filtered_folder, repacked_folder):
+        os.makedirs(folder, exist_ok=True)
+
+    names = [os.path.splitext(os.path.basename(path))[0] for path in scn_paths]
+    raw_paths = [os.path.join(raw_folder, f"{name}_raw_dump.txt") for name in names]
+    filtered_paths = [os.path.join(filtered_folder, f"{name}.txt") for name in names]
+    repacked_paths = [os.path.join(repacked_folder, f"{name}{dump.FILE_EXTENSION}") for name in names]
+    scn_bytes = sum(os.path.getsize(path) for path in scn_paths)
+
+    results = {}
+    elapsed, failures = run_stage(range(len(names)), lambda k: dump.dump_pointers_only(scn_paths[k], raw_paths[k]), repeat)
+    results['dump'] = stage_result(elapsed, scn_bytes, sum(count_blocks(p) for p in raw_paths), failures)
+
+    raw_bytes = sum(os.path.getsize(path) for path in raw_paths)
+    elapsed, failures = run_stage(range(len(names)),
+                                  lambda k: refine.filter_and_renumber_dump(raw_paths[k], filtered_paths[k]), repeat)
+    results['refine'] = stage_result(elapsed, raw_bytes, results['dump']['strings'], failures)
+
+    filtered_bytes = sum(os.path.getsize(path) for path in filtered_paths if os.path.exists(path))
+    filtered_strings = sum(count_blocks(path) for path in filtered_paths if os.path.exists(path))
+    elapsed, failures = run_stage(filtered_paths, repack.parse_filtered_txt, repeat)
+    results['parse'] = stage_result(elapsed, filtered_bytes, filtered_strings, failures)
+
+    elapsed, failures = run_stage(range(len(names)),
+                                  lambda k: repack.repack_file(filtered_paths[k], scn_paths[k], repacked_paths[k]), repeat)
+    results['repack'] = stage_result(elapsed, scn_bytes, filtered_strings, failures)
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Mostra a variação de vazão de cada etapa. Retorna a lista de etapas que regrediram."""
+    regressions = []
+    print(f"\nComparação com o baseline ({baseline.get('created', '?')}):")
+    for stage in STAGES:
+        current = results['stages'][stage]['bytes_per_s']
+        previous = baseline.get('stages', {}).get(stage, {}).get('bytes_per_s')
+        if not current or not previous:
+            print(f"  {stage:<7} sem dados para comparar")
+            continue
+        ratio = current / previous
+        flag = ""
+        if ratio < 1 - tolerance:
+            flag = "  <-- REGRESSÃO"
+            regressions.append(stage)
+        print(f"  {stage:<7} {ratio:6.2f}x{flag}")
+    if results['corpus'] != baseline.get('corpus'):
+        print("AVISO: o corpus do baseline é diferente do atual; a comparação é apenas indicativa.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a vazão de dump, refine, parse e repack num corpus sintético.")
+    parser.add_argument("--files", type=int, default=1000, help="quantidade de arquivos do corpus (padrão: 1000)")
+    parser.add_argument("--seed", type=int, default=0, help="semente do gerador (padrão: 0)")
+    parser.add_argument("--corpus", help="pasta de .SCN a usar no lugar do corpus gerado")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="arquivo JSON com o resultado")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="arquivo JSON do baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="grava o resultado também como baseline")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições de cada etapa; vale a melhor (padrão: 3)")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="queda de vazão tolerada antes de apontar regressão (padrão: 0.10)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_folder:
+        if args.corpus:
+            scn_paths = sorted(glob.glob(os.path.join(args.corpus, f"*{dump.FILE_EXTENSION}")))
+            corpus = {'folder': os.path.abspath(args.corpus), 'files': len(scn_paths)}
+        else:
+            start = time.perf_counter()
+            scn_paths = scn_corpus.generate_corpus(os.path.join(work_folder, "input"), args.files, args.seed)
+            print(f"Corpus: {len(scn_paths)} arquivos gerados em {time.perf_counter() - start:.1f} s")
+            corpus = {'files': args.files, 'seed': args.seed}
+        if not scn_paths:
+            print("ERRO: Nenhum arquivo .SCN no corpus.")
+            return 1
+        corpus['bytes'] = sum(os.path.getsize(path) for path in scn_paths)
+        stages = run_pipeline(scn_paths, work_folder, args.repeat)
+
+    results = {
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'numpy': dump.np is not None,
+        'corpus': corpus,
+        'stages': stages,
+    }
+    print(f"Corpus: {corpus['files']} arquivos, {corpus['bytes'] / 1e6:.1f} MB | NumPy: {'sim' if results['numpy'] else 'não'}")
+    for stage in STAGES:
+        result = stages[stage]
+        line = (f"  {stage:<7} {result['seconds']:8.2f} s | {result['bytes_per_s'] / 1e6:7.2f} MB/s | "
+                f"{result['strings_per_s']:>9} strings/s")
+        if result['failures']:
+            line += f" | {result['failures']} falha(s)"
+        print(line)
+
+    with open(args.output, 'w', encoding='utf-8') as f_out:
+        json.dump(results, f_out, indent=1)
+    print(f"--> Resultado salvo em: {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f_out:
+            json.dump(results, f_out, indent=1)
+        print(f"--> Baseline salvo em: {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"Sem baseline em '{args.baseline}'; use --save-baseline para criar um.")
+        return 0
+    return 1 if compare_with_baseline(results, baseline, args.tolerance) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
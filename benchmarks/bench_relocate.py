@@ -0,0 +1,105 @@
+"""
+Verificação dos ponteiros reais depois do repack (rebuild_scn), com e sem compactação.
+
+Gera .SCN sintéticos com bytecode montado a partir de scn_corpus.EXAMPLE_OPCODES, onde
+os locais dos ponteiros de texto de verdade são conhecidos. As strings que o filtro do
+dump mantém ganham textos mais longos, o arquivo é reconstruído e cada local real é
+conferido: o ponteiro de uma string mantida tem que apontar para o texto novo dela, e
+o de uma string descartada para os mesmos bytes de antes (até o 0x00 ou até a próxima
+string mantida).
+Com a tabela de opcodes, a varredura só lê operandos de verdade e nenhum ponteiro
+pode ficar errado. Na varredura bruta, um falso candidato colado num ponteiro real
+(loc - 1 ou loc + 1) às vezes também aponta para o começo de uma string e fica no
+lugar dele; esses casos são contados e não podem passar de MAX_STALE_RATIO.
+
+Uso: python benchmarks/bench_relocate.py [quantidade_de_arquivos] [semente]
+"""
+import bisect
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dump
+import metrics
+import repack
+import scn_corpus
+import scn_script
+import scn_strings
+
+MAX_STALE_RATIO = 0.01
+SUFFIXES = ["", " (tr)", " - traduzido", "!!"]
+
+
+def load_case(data, table, rng):
+    records = dump.extract_string_records(data, table)
+    kept = [record for record in records if dump.is_valid_text_record(record)]
+    for record in kept:
+        record.text += rng.choice(SUFFIXES)
+    strings_info = scn_strings.StringTable.from_records(kept)
+    encoded = [repack.convert_text_to_bytes(text) for text in strings_info.texts]
+    return strings_info, encoded, scn_strings.relocations_of(records)
+
+
+def stale_pointers(data, real_locs, strings_info, encoded_texts, new_data):
+    """Locais reais cujo ponteiro não leva mais aos bytes da string. Retorna (mantidas, descartadas)."""
+    expected = dict(zip(strings_info.offsets, encoded_texts))
+    starts = sorted(expected)
+    stale_kept = []
+    stale_dropped = []
+    for loc in real_locs:
+        target = data[loc] | (data[loc + 1] << 8)
+        new_target = new_data[loc] | (new_data[loc + 1] << 8)
+        if target in expected:
+            if new_data[new_target:new_target + len(expected[target])] != expected[target]:
+                stale_kept.append(loc)
+            continue
+        end = data.find(b'\x00', target)
+        following = bisect.bisect_right(starts, target)
+        if following < len(starts):
+            end = min(end, starts[following])
+        if new_data[new_target:new_target + end - target] != data[target:end]:
+            stale_dropped.append(loc)
+    return stale_kept, stale_dropped
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    files = [scn_corpus.make_scripted_scn(size, seed * 1000003 + number)
+             for number, size in enumerate(scn_corpus.corpus_sizes(count, seed))]
+    print(f"{count} arquivos, {sum(len(real_locs) for _, real_locs in files)} ponteiros de texto reais")
+
+    metrics.set_level(metrics.QUIET)
+    modes = {'bruta': None, 'tabela': scn_script.parse_opcode_table(scn_corpus.EXAMPLE_OPCODES)}
+    for mode, table in modes.items():
+        rng = random.Random(seed)
+        cases = [(data, real_locs) + load_case(data, table, rng) for data, real_locs in files]
+        for compact in (False, True):
+            checked = overflowed = 0
+            stale_kept = stale_dropped = 0
+            start = time.perf_counter()
+            for data, real_locs, strings_info, encoded, relocations in cases:
+                try:
+                    new_data = repack.rebuild_scn(data, strings_info, encoded, relocations, compact)[0]
+                except OverflowError:
+                    overflowed += 1
+                    continue
+                kept, dropped = stale_pointers(data, real_locs, strings_info, encoded, new_data)
+                assert table is None or not (kept or dropped), \
+                    f"ponteiros errados com a tabela de opcodes em {[hex(loc) for loc in (kept + dropped)[:5]]}"
+                checked += len(real_locs)
+                stale_kept += len(kept)
+                stale_dropped += len(dropped)
+            elapsed = time.perf_counter() - start
+            label = f"{mode} {'compactado' if compact else 'normal'}"
+            print(f"  {label:<18} {checked} ponteiros conferidos | errados: {stale_kept} de strings mantidas, "
+                  f"{stale_dropped} de descartadas | {overflowed} arquivo(s) acima de 64 KB | {elapsed * 1000:.0f} ms")
+            assert stale_kept + stale_dropped <= MAX_STALE_RATIO * checked, "ponteiros errados demais"
+    print("Ponteiros reais conferidos.")
+
+
+if __name__ == "__main__":
+    main()
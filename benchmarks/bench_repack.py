@@ -0,0 +1,121 @@
+"""
+Benchmark da montagem do repack (repack.rebuild_scn).
+
+Compara a montagem original (find por string, bytearray crescendo com extend e
+cópia final bytes(ponteiros) + bytes(texto)) com a montagem num único buffer de
+tamanho exato, conferindo que o resultado é idêntico.
+Os .SCN sintéticos são válidos (âncora, ponteiros de 16 bits) e o maior tamanho
+padrão fica perto do limite de 64 KB, antes e depois da "tradução".
+Mede tempo e pico de memória (tracemalloc).
+
+Uso: python benchmarks/bench_repack.py [quantidade_de_strings ...]
+"""
+import os
+import random
+import struct
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dump
+import repack
+import scn_strings
+
+POINTERS_START = 0x10
+WORDS = "Utena Anthy rose bride duel castle prince sword".split()
+
+
+def make_synthetic_case(string_count, seed=0):
+    """
+    Cria um .SCN sintético válido (âncora com o início do texto, um ponteiro de 16 bits
+    por string) e o StringTable de uma "tradução" com textos de tamanho parecido, para
+    que o arquivo reconstruído também caiba nos 64 KB.
+    """
+    rng = random.Random(seed)
+    pointer_area = POINTERS_START + string_count * 4
+    text = bytearray()
+    offsets = []
+    for _ in range(string_count):
+        offsets.append(pointer_area + len(text))
+        text += bytes(rng.randint(0x20, 0x7E) for _ in range(rng.randint(4, 30)))
+        text += b'\x00' * rng.randint(1, 4)
+        if rng.random() < 0.1:
+            text += bytes(rng.randint(1, 255) for _ in range(rng.randint(1, 6))) + b'\x00'
+    code = bytearray(pointer_area)
+    struct.pack_into('<H', code, dump.ANCHOR_POINTER_OFFSET, pointer_area)
+    for k, offset in enumerate(offsets):
+        struct.pack_into('<H', code, POINTERS_START + k * 4, offset)
+    data = bytes(code + text)
+
+    strings_info = scn_strings.StringTable()
+    for k, offset in enumerate(offsets):
+        translation = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.2:
+            translation += "\n<HEX=8F>"
+        strings_info.append(offset, 0, [POINTERS_START + k * 4], translation)
+    return data, strings_info
+
+
+def legacy_rebuild(original_data, strings_info):
+    file_end = len(original_data)
+    first_string_original_offset = strings_info.offsets[0]
+    pointer_block = bytearray(original_data[:first_string_original_offset])
+    new_text_block = bytearray()
+    new_pointer_map = {}
+    current_new_offset = first_string_original_offset
+    for i, string_info in enumerate(strings_info):
+        original_offset = string_info.offset
+        new_pointer_map[original_offset] = current_new_offset
+        next_start = strings_info.offsets[i+1] if i + 1 < len(strings_info) else file_end
+        text_bytes = repack.convert_text_to_bytes(string_info.text)
+        new_text_block.extend(text_bytes)
+        current_new_offset += len(text_bytes)
+        first_zero = original_data.find(b'\x00', original_offset)
+        if first_zero != -1 and first_zero < next_start:
+            tail = original_data[first_zero:next_start]
+            new_text_block.extend(tail)
+            current_new_offset += len(tail)
+    for string_info in strings_info:
+        new_offset = new_pointer_map.get(string_info.offset)
+        if new_offset is not None:
+            new_pointer_bytes = struct.pack('<H', new_offset & 0xFFFF)
+            for loc in string_info.pointer_locs:
+                if loc + 2 <= len(pointer_block):
+                    pointer_block[loc:loc+2] = new_pointer_bytes
+    return bytes(pointer_block) + bytes(new_text_block)
+
+
+def measure(func, *args, repeat=20):
+    """Melhor tempo de `repeat` execuções e, numa execução à parte, o pico de memória."""
+    elapsed = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        run_time = time.perf_counter() - start
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [500, 1500, 2600]
+    for count in counts:
+        data, strings_info = make_synthetic_case(count)
+        old_time, old_peak, old_data = measure(legacy_rebuild, data, strings_info)
+        if max(len(data), len(old_data)) > repack.POINTER_LIMIT + 1:
+            print(f"{count} strings: arquivo grande demais para ponteiros de 16 bits, ignorado.")
+            continue
+        new_time, new_peak, new_data = measure(lambda: repack.rebuild_scn(data, strings_info)[0])
+        assert new_data == old_data, "Resultado diferente da montagem original!"
+        print(f"{count:>5} strings, {len(data):>6} bytes -> {len(old_data):>6} bytes: "
+              f"antigo {old_time * 1000:7.2f} ms / pico {old_peak / 1024:7.1f} KiB | "
+              f"novo {new_time * 1000:7.2f} ms / pico {new_peak / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Verificação e benchmark da varredura de limites do refine (refine.py --sweep).
+
+Gera um corpus sintético (scn_corpus), grava os dumps brutos (todas as strings, com
+mais códigos <HEX> que os dumps filtrados) e mede:
+  - o cache de características: montagem a partir dos dumps e leitura de volta;
+  - a varredura de uma grade de limites sobre o cache;
+  - uma passada completa do refine, que é o que cada combinação custaria sem o cache.
+Depois roda o refine de verdade com algumas combinações da grade (as constantes
+trocadas no módulo) e confere que strings_kept e cada contador de rejeição batem
+com os da varredura, com e sem NumPy (se ele estiver instalado).
+
+Uso: python benchmarks/bench_sweep.py [quantidade_de_arquivos] [semente]
+"""
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dump
+import metrics
+import refine
+import refine_features
+import scn_corpus
+
+RATIOS = [0.3, 0.5, 0.6, 0.7, 0.8, 0.9]
+MAX_CONTROL_CODES = [0, 1, 2, 3, 5, 8]
+MIN_ALPHA_CHARS = [1, 2, 3, 5, 8]
+CHECKED_SETTINGS = 6
+
+
+def refine_counters(dump_paths):
+    """Contadores de uma passada do refine (sem gravar nada) com as constantes atuais do módulo."""
+    metrics.reset()
+    kept = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for path in dump_paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                kept += len(refine.refine_dump(f, os.path.basename(path))[1])
+    counters = metrics.snapshot()['counters']
+    counters['strings_kept'] = kept
+    return counters
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    metrics.set_level(metrics.QUIET)
+    with tempfile.TemporaryDirectory() as work_folder:
+        scn_paths = scn_corpus.generate_corpus(os.path.join(work_folder, "input"), count, seed)
+        dump_paths = []
+        for path in scn_paths:
+            dump_path = os.path.join(work_folder, os.path.basename(path) + ".txt")
+            if dump.dump_pointers_only(path, dump_path):
+                dump_paths.append(dump_path)
+        refine.OUTPUT_FOLDER = work_folder
+
+        start = time.perf_counter()
+        table = refine.update_feature_cache(dump_paths, force=True)
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        table = refine.update_feature_cache(dump_paths)
+        load_time = time.perf_counter() - start
+        cache_size = os.path.getsize(os.path.join(work_folder, refine_features.FEATURES_NAME))
+
+        start = time.perf_counter()
+        results = refine.sweep_thresholds(table, RATIOS, MAX_CONTROL_CODES, MIN_ALPHA_CHARS, use_numpy=False)
+        sweep_time = time.perf_counter() - start
+        backends = {"sem NumPy": sweep_time}
+        if refine.np is not None:
+            start = time.perf_counter()
+            numpy_results = refine.sweep_thresholds(table, RATIOS, MAX_CONTROL_CODES, MIN_ALPHA_CHARS)
+            backends["NumPy"] = time.perf_counter() - start
+            assert numpy_results == results, "NumPy e máscaras em inteiros discordam!"
+
+        start = time.perf_counter()
+        current = refine_counters(dump_paths)
+        refine_time = time.perf_counter() - start
+
+        checked = random.Random(seed).sample(results, min(CHECKED_SETTINGS, len(results)))
+        original = (refine.TEXT_TO_CODE_RATIO_THRESHOLD, refine.MAX_CONTROL_CODES, refine.MIN_ALPHA_CHARS)
+        try:
+            for result in checked:
+                refine.TEXT_TO_CODE_RATIO_THRESHOLD = result['TEXT_TO_CODE_RATIO_THRESHOLD']
+                refine.MAX_CONTROL_CODES = result['MAX_CONTROL_CODES']
+                refine.MIN_ALPHA_CHARS = result['MIN_ALPHA_CHARS']
+                counters = refine_counters(dump_paths)
+                for name in ('strings_kept',) + refine.REJECTION_RULES:
+                    assert counters.get(name, 0) == result[name], f"{name} diferente em {result}"
+        finally:
+            refine.TEXT_TO_CODE_RATIO_THRESHOLD, refine.MAX_CONTROL_CODES, refine.MIN_ALPHA_CHARS = original
+
+    print(f"{len(dump_paths)} dumps, {len(table)} blocos, {len(table.containers)} contêineres de fragmento")
+    print(f"  cache       montagem {build_time:6.2f} s | leitura {load_time:6.2f} s | {cache_size / 1024:.0f} KiB")
+    print(f"  refine      {refine_time:6.2f} s por combinação ({current.get('strings_kept', 0)} strings mantidas) "
+          f"-> {refine_time * len(results):.1f} s para a grade inteira")
+    for backend, elapsed in backends.items():
+        print(f"  varredura   {elapsed:6.2f} s para {len(results)} combinações ({backend})")
+    print(f"Contadores de {len(checked)} combinações conferidos com o refine.")
+
+
+if __name__ == "__main__":
+    main()
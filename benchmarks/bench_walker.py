@@ -0,0 +1,74 @@
+"""
+Verificação e benchmark da leitura estruturada do bytecode (scn_script).
+
+Gera .SCN sintéticos com bytecode montado a partir de scn_corpus.EXAMPLE_OPCODES e
+compara, em cada arquivo, a varredura bruta com a leitura pela tabela completa e
+por uma tabela sem um dos opcodes (que força a volta para a varredura bruta no
+meio da área). O tempo é o da extração inteira (dump.extract_string_records:
+varredura e decodificação das strings apontadas). Mostra candidatos, strings mapeadas, ponteiros reais perdidos,
+cobertura e tempo de cada modo. A varredura bruta não lê o último par de bytes da
+área, então pode perder um operando que termine exatamente no fim dela; a leitura
+pela tabela completa não pode perder nenhum.
+
+Uso: python benchmarks/bench_walker.py [quantidade_de_arquivos] [semente]
+"""
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dump
+import metrics
+import scn_corpus
+import scn_script
+
+# Opcode retirado da tabela parcial (um comando comum, sem texto).
+MISSING_OPCODE = "0x04"
+
+
+def make_tables():
+    partial = copy.deepcopy(scn_corpus.EXAMPLE_OPCODES)
+    del partial["opcodes"][MISSING_OPCODE]
+    return {
+        'bruta': None,
+        'tabela': scn_script.parse_opcode_table(scn_corpus.EXAMPLE_OPCODES),
+        'parcial': scn_script.parse_opcode_table(partial),
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    files = [scn_corpus.make_scripted_scn(size, seed * 1000003 + number)
+             for number, size in enumerate(scn_corpus.corpus_sizes(count, seed))]
+    real_pointers = sum(len(real_locs) for _, real_locs in files)
+    print(f"{count} arquivos, {sum(len(data) for data, _ in files) / 1e6:.1f} MB, "
+          f"{real_pointers} ponteiros de texto reais")
+
+    metrics.set_level(metrics.QUIET)
+    for mode, table in make_tables().items():
+        metrics.reset()
+        candidates = strings = lost = 0
+        start = time.perf_counter()
+        for number, (data, real_locs) in enumerate(files):
+            records = dump.extract_string_records(data, table)
+            found = {loc for record in records for loc in record.pointer_locs}
+            missing = [loc for loc in real_locs if loc not in found]
+            assert not missing or mode != 'tabela', f"arquivo {number} perdeu ponteiros em {missing[:5]}"
+            lost += len(missing)
+            candidates += len(found)
+            strings += len(records)
+        elapsed = time.perf_counter() - start
+
+        counters = metrics.snapshot()['counters']
+        walked = counters.get("bytecode_bytes_walked", 0)
+        scanned = counters.get("bytecode_bytes_scanned", 0)
+        coverage = f"{100 * walked / (walked + scanned):5.1f}%" if walked + scanned else "    -"
+        print(f"  {mode:<8} {elapsed * 1000:8.1f} ms | {candidates:7} candidatos | "
+              f"{strings:6} strings | {lost:3} perdidos | cobertura {coverage}")
+
+
+if __name__ == "__main__":
+    main()
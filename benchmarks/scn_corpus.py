@@ -0,0 +1,164 @@
+"""
+Gerador determinístico de corpus .SCN sintético para os benchmarks.
+
+Cada arquivo segue o formato que as ferramentas assumem: ponteiro âncora em
+ANCHOR_POINTER_OFFSET com o início do texto, área de ponteiros (bytecode sintético,
+com ponteiros de 16 bits para as strings espalhados no meio dele) e
+strings terminadas em 0x00 com códigos de controle, quebras de linha, preenchimento
+e dados órfãos entre elas. O tamanho total vai de alguns KB até o limite de 64 KB
+dos ponteiros. A mesma semente gera sempre os mesmos bytes.
+
+make_scripted_scn gera o bytecode como uma sequência de comandos de uma tabela de
+opcodes (EXAMPLE_OPCODES, no formato do scn_script), para testar a leitura
+estruturada, e devolve também os locais reais dos ponteiros de texto.
+
+Uso: python benchmarks/scn_corpus.py PASTA [quantidade] [semente]
+"""
+import os
+import random
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dump
+import scn_codec
+import scn_script
+
+MIN_FILE_SIZE = 4 * 1024
+MAX_FILE_SIZE = 0xFFFF   # Ponteiros de 16 bits: nenhum offset pode passar disso.
+
+WORDS = ("Utena Anthy Touga Juri Miki Saionji Nanami Wakaba Chu-Chu rose bride duel castle "
+         "eternity revolution prince coffin student council sword world shell egg").split()
+CONTROL_CODES = [0x01, 0x02, 0x05, 0x1B, 0x8F, 0xE5]
+BYTECODE_TABLE = bytes(value & 0x1F if value < 0xC0 else value for value in range(256))
+
+# Tabela de opcodes de exemplo, no formato do scn_script (só para o corpus sintético).
+EXAMPLE_OPCODES = {
+    "bytecode_start": "0x0C",
+    "opcodes": {
+        "0x00": {"length": 1, "name": "nop"},
+        "0x01": {"length": 3, "name": "jump"},
+        "0x02": {"length": 5, "name": "if"},
+        "0x03": {"length": 2, "name": "wait"},
+        "0x04": {"length": 4, "name": "set_flag"},
+        "0x05": {"length": 6, "name": "sprite"},
+        "0x10": {"length": 3, "text_pointers": [1], "name": "message"},
+        "0x11": {"length": 4, "text_pointers": [2], "name": "speaker_message"},
+        "0x12": {"length": 7, "text_pointers": [1, 3, 5], "name": "choice"},
+    },
+}
+
+
+def make_string(rng):
+    """Bytes de uma string, sem o terminador: na maioria texto, às vezes números ou lixo."""
+    roll = rng.random()
+    if roll < 0.65:
+        text = bytearray(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 10))).encode('ascii'))
+        if rng.random() < 0.4:
+            text.insert(rng.randint(0, len(text)), scn_codec.LINE_BREAK_BYTE)
+        if rng.random() < 0.3:
+            text.insert(rng.randint(0, len(text)), rng.choice(CONTROL_CODES))
+        return bytes(text)
+    if roll < 0.8:
+        return bytes(rng.randint(0xA1, 0xDF) for _ in range(rng.randint(2, 12)))
+    if roll < 0.9:
+        return str(rng.randint(0, 99999)).encode('ascii')
+    return bytes(rng.randint(1, 255) for _ in range(rng.randint(1, 10)))
+
+
+def make_scn(size, seed=0):
+    """Um .SCN sintético de exatamente `size` bytes (entre MIN_FILE_SIZE e MAX_FILE_SIZE)."""
+    rng = random.Random(seed)
+    size = max(MIN_FILE_SIZE, min(size, MAX_FILE_SIZE))
+    pointer_area = int(size * rng.uniform(0.2, 0.5))
+
+    text = bytearray()
+    offsets = []
+    text_size = size - pointer_area
+    while True:
+        string = make_string(rng)
+        padding = b'\x00' * rng.randint(1, 3)
+        orphan = b''
+        if rng.random() < 0.1:
+            orphan = bytes(rng.randint(1, 255) for _ in range(rng.randint(1, 5))) + b'\x00'
+        if len(text) + len(string) + len(padding) + len(orphan) > text_size:
+            break
+        offsets.append(pointer_area + len(text))
+        text += string + padding + orphan
+    text += b'\x00' * (text_size - len(text))
+
+    # Bytecode: na maioria opcodes e operandos pequenos, com alguns bytes quaisquer no meio.
+    code = bytearray(rng.randbytes(pointer_area).translate(BYTECODE_TABLE))
+    struct.pack_into('<H', code, dump.ANCHOR_POINTER_OFFSET, pointer_area)
+    position = 0x10
+    for offset in offsets:
+        for _ in range(rng.choice((1, 1, 2))):
+            if position + 2 > pointer_area:
+                break
+            struct.pack_into('<H', code, position, offset)
+            position += rng.randint(3, 9)
+    return bytes(code + text)
+
+
+def make_scripted_scn(size, seed=0, table_content=EXAMPLE_OPCODES):
+    """
+    Um .SCN sintético cujo bytecode é uma sequência de comandos de `table_content`.
+    Retorna (bytes, locais reais dos ponteiros de texto).
+    """
+    table = scn_script.parse_opcode_table(table_content)
+    rng = random.Random(seed)
+    data = bytearray(make_scn(size, seed))
+    pointer_area = struct.unpack_from('<H', data, dump.ANCHOR_POINTER_OFFSET)[0]
+    offsets = [k for k in range(pointer_area, len(data)) if data[k] and not data[k - 1]]
+
+    text_opcodes = [op for op in range(256) if table.lengths[op] and table.text_pointers[op]]
+    other_opcodes = [op for op in range(256) if table.lengths[op] and not table.text_pointers[op]]
+    # O fim da área é completado com um opcode de 1 byte (a tabela precisa ter um).
+    filler = table.lengths.index(1)
+    data[table.bytecode_start:pointer_area] = rng.randbytes(pointer_area - table.bytecode_start).translate(BYTECODE_TABLE)
+    real_locs = []
+    position = table.bytecode_start
+    while True:
+        opcode = rng.choice(text_opcodes if rng.random() < 0.3 else other_opcodes)
+        if position + table.lengths[opcode] > pointer_area:
+            break
+        data[position] = opcode
+        for operand in table.text_pointers[opcode]:
+            struct.pack_into('<H', data, position + operand, rng.choice(offsets))
+            real_locs.append(position + operand)
+        position += table.lengths[opcode]
+    data[position:pointer_area] = bytes([filler]) * (pointer_area - position)
+    return bytes(data), real_locs
+
+
+def corpus_sizes(count, seed=0, min_size=MIN_FILE_SIZE, max_size=MAX_FILE_SIZE):
+    rng = random.Random(seed)
+    return [rng.randint(min_size, max_size) for _ in range(count)]
+
+
+def generate_corpus(folder, count, seed=0, min_size=MIN_FILE_SIZE, max_size=MAX_FILE_SIZE):
+    """Grava `count` arquivos S0000.SCN, S0001.SCN... em `folder`. Retorna a lista de caminhos."""
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for number, size in enumerate(corpus_sizes(count, seed, min_size, max_size)):
+        path = os.path.join(folder, f"S{number:04d}{dump.FILE_EXTENSION}")
+        with open(path, 'wb') as f_out:
+            f_out.write(make_scn(size, seed * 1000003 + number))
+        paths.append(path)
+    return paths
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        return
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    paths = generate_corpus(sys.argv[1], count, seed)
+    total = sum(os.path.getsize(path) for path in paths)
+    print(f"{len(paths)} arquivos ({total / 1e6:.1f} MB) gravados em '{sys.argv[1]}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Cache de reconstrução incremental usado pelo dump.py, refine.py e repack.py.
+
+Cada etapa guarda, na sua pasta de saída, um manifesto JSON com a impressão digital
+(SHA-256) das entradas de cada arquivo processado, junto com a configuração da
+ferramenta (limites do filtro e o próprio código-fonte dos scripts). Na execução
+seguinte, os arquivos cujas entradas, configuração e saídas não mudaram são pulados.
+"""
+import hashlib
+import json
+import os
+
+import batch
+import metrics
+
+MANIFEST_NAME = ".build_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def add_force_argument(parser):
+    """Adiciona a opção --force a um ArgumentParser."""
+    parser.add_argument(
+        "--force", action="store_true",
+        help="ignora o cache e reconstrói todos os arquivos",
+    )
+
+
+def file_sha256(path):
+    """SHA-256 do conteúdo do arquivo, ou None se ele não existir."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def config_fingerprint(settings, source_paths):
+    """
+    Impressão digital da configuração: os valores em `settings` mais o conteúdo
+    dos arquivos de código da ferramenta (uma mudança no código invalida o cache).
+    """
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    for path in sorted(set(source_paths)):
+        digest.update(os.path.basename(path).encode('utf-8'))
+        digest.update((file_sha256(path) or "").encode('ascii'))
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Manifesto de uma etapa: {nome -> {impressão das entradas, saídas}}."""
+
+    def __init__(self, folder, stage, config, force=False):
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self.stage = stage
+        self.config = config
+        self.force = force
+        self.entries = {}
+        self.pending = {}
+        self.skipped = []
+        self.rebuilt = []
+        self.failed = []
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if stored.get('version') == MANIFEST_VERSION and stored.get('stage') == stage:
+            self.entries = stored.get('files', {})
+
+    def _fingerprint(self, input_paths):
+        digest = hashlib.sha256(self.config.encode('ascii'))
+        for path in input_paths:
+            digest.update(os.path.basename(path).encode('utf-8'))
+            digest.update((file_sha256(path) or "ausente").encode('ascii'))
+        return digest.hexdigest()
+
+    def needs_rebuild(self, name, input_paths, output_paths):
+        """Retorna True se o arquivo `name` precisa ser processado de novo."""
+        fingerprint = self._fingerprint(input_paths)
+        entry = self.entries.get(name)
+        up_to_date = (
+            not self.force
+            and entry is not None
+            and entry.get('fingerprint') == fingerprint
+            and all(os.path.exists(path) for path in output_paths)
+        )
+        if up_to_date:
+            self.skipped.append(name)
+            return False
+        self.pending[name] = {'fingerprint': fingerprint, 'outputs': [os.path.basename(p) for p in output_paths]}
+        return True
+
+    def record_results(self, results):
+        """Registra o resultado do lote: sucesso atualiza o manifesto, falha o invalida."""
+        for result in results:
+            if result.ok and result.name in self.pending:
+                self.entries[result.name] = self.pending[result.name]
+                self.rebuilt.append(result.name)
+            else:
+                self.entries.pop(result.name, None)
+                self.failed.append(result.name)
+
+    def save(self):
+        content = {'version': MANIFEST_VERSION, 'stage': self.stage, 'files': self.entries}
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f_out:
+            json.dump(content, f_out, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def print_report(self):
+        print(f"=== Incremental ({self.stage}): {len(self.rebuilt)} reconstruído(s), "
+              f"{len(self.skipped)} sem mudanças, {len(self.failed)} com falha ===")
+        for name in sorted(self.rebuilt):
+            metrics.info(f"  RECONSTRUÍDO: {name}")
+        for name in sorted(self.skipped):
+            metrics.info(f"  PULADO: {name}")
+
+
+def run_incremental(manifest, func, tasks, jobs=1):
+    """
+    Executa no lote apenas as tarefas (nome, args, entradas, saídas) desatualizadas,
+    atualiza e salva o manifesto e imprime o relatório do que foi pulado e reconstruído.
+    """
+    stale = [(name, args) for name, args, input_paths, output_paths in tasks
+             if manifest.needs_rebuild(name, input_paths, output_paths)]
+    if stale:
+        manifest.record_results(batch.run_batch(func, stale, jobs))
+        manifest.save()
+    manifest.print_report()
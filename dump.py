@@ -1,8 +1,23 @@
 import os
 import struct
 import glob
-import string
-import re
+import argparse
+import sys
+from array import array
+
+import batch
+import build_cache
+import metrics
+import scn_codec
+import scn_index
+import scn_iso
+import scn_script
+import scn_strings
+
+try:
+    import numpy as np  # Opcional: acelera a varredura de ponteiros em arquivos grandes.
+except ImportError:
+    np = None
 
 # --- CONFIGURAÇÃO ---
 INPUT_FOLDER = "input"
@@ -19,169 +34,400 @@ TEXT_TO_CODE_RATIO_THRESHOLD = 0.3
 # Limite máximo de códigos de controle permitidos em uma string de texto válida.
 MAX_CONTROL_CODES = 3
 
+BLOCK_SEPARATOR = "####################################"
+# Pasta do dump bruto (sem filtro), gravado apenas com a opção --raw-dump.
+RAW_DUMP_FOLDER = os.path.join(OUTPUT_FOLDER, "raw")
+# Tabela de opcodes do bytecode (formato em scn_script.py). Se existir, a área de
+# ponteiros é lida comando a comando em vez da varredura bruta de todos os offsets.
+OPCODE_TABLE_FILE = "scn_opcodes.json"
+
 def format_string_with_codes(data, start_offset):
-    """Lê uma string byte a byte, convertendo não-texto em tags <HEX> e 0E em quebra de linha."""
-    result = ""
-    pos = start_offset
-    while pos < len(data) and data[pos] != 0:
-        byte_val = data[pos]
-        
-        if byte_val == 0x0E:
-            result += '\n'
-        else:
-            if 0x20 <= byte_val <= 0x7E or 0xA1 <= byte_val <= 0xDF:
-                result += bytes([byte_val]).decode('latin-1')
-            else:
-                 result += f"<HEX={byte_val:02X}>"
-        pos += 1
-    return result
+    """Lê uma string até o terminador, convertendo não-texto em tags <HEX> e 0E em quebra de linha."""
+    return scn_codec.decode_string_at(data, start_offset)
 
-def dump_pointers_only(input_path, raw_output_path):
+def read_u16_le_all(data, count):
     """
-    Extrai todas as strings que possuem ponteiros para um arquivo bruto.
+    Lê em bloco os `count` valores de 16 bits (little-endian) sobrepostos que começam
+    nos offsets 0 .. count-1, usando duas visões com passo 2 (offsets pares e ímpares).
     """
-    print(f"--- Processando (Passo 1: Extração Bruta): {os.path.basename(input_path)} ---")
-    
+    view = memoryview(data)
+    even = array('H')
+    even.frombytes(view[0:2 * ((count + 1) // 2)])
+    odd = array('H')
+    odd.frombytes(view[1:1 + 2 * (count // 2)])
+    if sys.byteorder == 'big':
+        even.byteswap()
+        odd.byteswap()
+    values = array('H', bytes(2 * count))
+    values[0::2] = even
+    values[1::2] = odd
+    return values
+
+def scan_pointer_candidates(data, pointer_area_end, text_area_start, start=0, string_map=None):
+    """
+    Varre a área de ponteiros (a partir de `start`) e retorna {offset_da_string: [locais_dos_ponteiros]}.
+    Um valor é candidato se cair na área de texto e existir um terminador 0x00 em
+    algum ponto a partir dele (ou seja, se não passar do último 0x00 do arquivo).
+    Se `string_map` for dado, os candidatos são acrescentados nele.
+    """
+    file_size = len(data)
+    # O último par lido começa em pointer_area_end - 3 e nunca pode passar do fim do arquivo.
+    count = min(pointer_area_end - 2, file_size - 1) - start
+    if string_map is None:
+        string_map = {}
+    if count <= 0:
+        return string_map
+
+    # Índice de terminadores: existe 0x00 em/após X  <=>  X <= último 0x00 do arquivo.
+    last_null = data.rfind(b'\x00')
+    if last_null < text_area_start:
+        return string_map
+
+    if np is not None:
+        raw = np.frombuffer(data, dtype=np.uint8, count=count + 1, offset=start).astype(np.uint16)
+        values = raw[:-1] | (raw[1:] << 8)
+        hits = np.nonzero((values >= text_area_start) & (values <= last_null))[0]
+        for i, ptr_val in zip((hits + start).tolist(), values[hits].tolist()):
+            string_map.setdefault(ptr_val, []).append(i)
+        return string_map
+
+    view = memoryview(data)[start:] if start else data
+    for i, ptr_val in enumerate(read_u16_le_all(view, count), start):
+        if text_area_start <= ptr_val <= last_null:
+            string_map.setdefault(ptr_val, []).append(i)
+    return string_map
+
+def find_pointer_candidates(data, pointer_area_end, text_area_start, opcode_table=None):
+    """
+    Como scan_pointer_candidates, mas usando a tabela de opcodes (scn_script) quando
+    houver: o cabeçalho antes do bytecode e o que vier depois de um opcode desconhecido
+    continuam na varredura bruta; o trecho decodificado só contribui com os operandos
+    de ponteiro de texto. Sem tabela, é a varredura bruta de sempre.
+    """
+    if opcode_table is None:
+        return scan_pointer_candidates(data, pointer_area_end, text_area_start)
+
+    header_end = min(opcode_table.bytecode_start, pointer_area_end)
+    string_map = scan_pointer_candidates(data, min(header_end + 2, pointer_area_end), text_area_start)
+    walk = scn_script.walk_bytecode(data, opcode_table, min(pointer_area_end, len(data)))
+    last_null = data.rfind(b'\x00')
+    for loc in walk.pointer_locs:
+        ptr_val = data[loc] | (data[loc + 1] << 8)
+        if text_area_start <= ptr_val <= last_null:
+            string_map.setdefault(ptr_val, []).append(loc)
+    scan_pointer_candidates(data, pointer_area_end, text_area_start, max(walk.stop, header_end), string_map)
+
+    walked = max(walk.stop - header_end, 0)
+    metrics.count("bytecode_commands", walk.commands)
+    metrics.count("bytecode_bytes_walked", walked)
+    metrics.count("bytecode_bytes_scanned", max(pointer_area_end - header_end - walked, 0))
+    metrics.count("pointer_candidates_walked", len(walk.pointer_locs))
+    area = pointer_area_end - header_end
+    coverage = f"{100 * walked / area:.1f}%" if area > 0 else "-"
+    message = f"Bytecode: {walk.commands} comandos, {coverage} da área decodificada"
+    if walk.unknown_opcode is not None:
+        metrics.count(f"unknown_opcode_0x{walk.unknown_opcode:02X}")
+        message += f"; opcode desconhecido 0x{walk.unknown_opcode:02X} em 0x{walk.stop:X}, resto por varredura bruta"
+    elif walk.stop < pointer_area_end:
+        message += f"; comando em 0x{walk.stop:X} passa do fim da área, resto por varredura bruta"
+    metrics.info(message + ".")
+    return string_map
+
+def load_scn(input_path):
+    """Lê o .SCN inteiro. Retorna None (e avisa) se o arquivo não existir."""
     try:
-        with open(input_path, 'rb') as f: data = f.read()
+        with metrics.phase("read"), open(input_path, 'rb') as f:
+            return f.read()
     except FileNotFoundError:
-        print(f"ERRO: Arquivo não encontrado {input_path}"); return False
+        print(f"ERRO: Arquivo não encontrado {input_path}")
+        return None
+
+class DumpRecord(scn_strings.StringRecord):
+    """StringRecord com as contagens usadas pelo filtro do dump."""
+    __slots__ = ('num_hex_tags', 'clean_text')
+
+def make_string_record(data, string_offset, pointer_locs):
+    """
+    Monta o registro de uma string: offset, locais dos ponteiros, texto decodificado
+    e as contagens usadas pelo filtro, calculadas direto dos bytes.
+    """
+    end = data.find(b'\x00', string_offset)
+    if end == -1:
+        end = len(data)
+    raw = data[string_offset:end]
+    record = DumpRecord(string_offset, len(raw), pointer_locs, scn_codec.decode(raw)[0])
+    record.num_hex_tags = scn_codec.count_control_codes(raw)
+    record.clean_text = scn_codec.strip_control_codes(raw).strip()
+    return record
 
+def extract_string_records(data, opcode_table=None):
+    """
+    Localiza todas as strings que possuem ponteiros e devolve seus registros,
+    ordenados por offset. Retorna None se nada puder ser extraído.
+    `opcode_table` é uma scn_script.OpcodeTable, ou None para a varredura bruta.
+    """
     file_size = len(data)
     
     if ANCHOR_POINTER_OFFSET + 2 > file_size:
-        print("ERRO: Arquivo muito pequeno para ler o ponteiro âncora."); return False
+        print("ERRO: Arquivo muito pequeno para ler o ponteiro âncora."); return None
         
     first_string_offset = struct.unpack('<H', data[ANCHOR_POINTER_OFFSET:ANCHOR_POINTER_OFFSET+2])[0]
     
     pointer_area_end = first_string_offset
     text_area_start = first_string_offset
     
-    print(f"Ponteiro âncora em 0x{ANCHOR_POINTER_OFFSET:X} aponta para 0x{first_string_offset:X}.")
-    print(f"Área de Ponteiros definida: 0x00 - 0x{pointer_area_end:X}")
+    metrics.info(f"Ponteiro âncora em 0x{ANCHOR_POINTER_OFFSET:X} aponta para 0x{first_string_offset:X}.")
+    metrics.info(f"Área de Ponteiros definida: 0x00 - 0x{pointer_area_end:X}")
 
-    string_map = {}
-    
-    for i in range(pointer_area_end - 2):
-        ptr_val = struct.unpack('<H', data[i:i+2])[0]
-        
-        if ptr_val >= text_area_start and ptr_val < file_size and data.find(b'\x00', ptr_val) != -1:
-            if ptr_val not in string_map:
-                string_map[ptr_val] = []
-            if i not in string_map[ptr_val]:
-                string_map[ptr_val].append(i)
+    with metrics.phase("scan"):
+        string_map = find_pointer_candidates(data, pointer_area_end, text_area_start, opcode_table)
+    metrics.count("pointer_offsets_scanned", max(min(pointer_area_end, file_size) - 2, 0))
+    metrics.count("pointer_candidates", sum(len(locs) for locs in string_map.values()))
 
     if not string_map:
-        print("--> Nenhum ponteiro válido encontrado na área definida."); return False
+        print("--> Nenhum ponteiro válido encontrado na área definida."); return None
 
     sorted_string_offsets = sorted(string_map.keys())
     
-    print(f"--> Mapeadas {len(sorted_string_offsets)} strings únicas.")
-
-    with open(raw_output_path, 'w', encoding='utf-8') as f_out:
-        f_out.write(f"// Dump Bruto do arquivo: {os.path.basename(input_path)}\n\n")
-
-        for i, string_offset in enumerate(sorted_string_offsets):
-            pointer_locs = sorted(string_map[string_offset])
-            formatted_text = format_string_with_codes(data, string_offset)
-            
-            f_out.write("####################################\n")
-            f_out.write(f"// STRING #{i + 1}\n")
-            f_out.write(f"// String Offset: 0x{string_offset:08X}\n")
-            for p_loc in pointer_locs:
-                original_pointer_bytes = data[p_loc:p_loc+2].hex().upper()
-                f_out.write(f"// -> Apontada por: 0x{p_loc:08X} (Valor: {original_pointer_bytes})\n")
-            f_out.write(f"\n{formatted_text}\n\n<END>\n")
-            f_out.write("####################################\n\n")
-            
-    print(f"--> Extração bruta concluída: {os.path.basename(raw_output_path)}")
+    metrics.info(f"--> Mapeadas {len(sorted_string_offsets)} strings únicas.")
+    metrics.count("strings_mapped", len(sorted_string_offsets))
+
+    with metrics.phase("decode"):
+        return [make_string_record(data, offset, string_map[offset]) for offset in sorted_string_offsets]
+
+def is_valid_text_record(record):
+    """Aplica as regras do filtro do dump a um registro de string."""
+    num_hex_tags = record.num_hex_tags
+    clean_text = record.clean_text
+
+    if num_hex_tags > MAX_CONTROL_CODES:
+        metrics.count("rejected_control_codes")
+        return False
+    if not clean_text:
+        metrics.count("rejected_empty")
+        return False
+    if len(clean_text) < 30 and clean_text[0].islower():
+        metrics.count("rejected_lowercase_start")
+        return False
+
+    num_text_chars = len(clean_text)
+    ratio = num_text_chars / (num_text_chars + num_hex_tags)
+    if ratio < TEXT_TO_CODE_RATIO_THRESHOLD:
+        metrics.count("rejected_text_ratio")
+        return False
     return True
 
-def filter_and_renumber_dump(raw_dump_path, final_output_path):
-    """Lê um arquivo de dump bruto, filtra o lixo e renumera as strings."""
-    print(f"--- Processando (Passo 2: Filtragem e Limpeza): {os.path.basename(raw_dump_path)} ---")
-    
-    try:
-        with open(raw_dump_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        print(f"ERRO: Arquivo de dump bruto não encontrado: {raw_dump_path}"); return
+def format_string_block(number, record, with_original_offset=False):
+    """Formata um registro como bloco do arquivo de dump."""
+    string_offset = record.offset
+    # O valor gravado em cada local de ponteiro é o próprio offset da string, em little-endian.
+    pointer_value = struct.pack('<H', string_offset).hex().upper()
 
-    blocks = content.split("####################################")
-    
-    filtered_blocks = []
-    for block in blocks:
-        block_content = block.strip()
-        if not block_content or "// STRING #" not in block_content:
-            continue
-        
-        text_content_match = re.search(r'\n\n(.*?)\n\n<END>', block, re.DOTALL)
-        if not text_content_match: continue
-        
-        text_to_check = text_content_match.group(1)
-        
-        hex_tags = re.findall(r'<HEX=[0-9A-F]{2}>', text_to_check)
-        
-        if len(hex_tags) > MAX_CONTROL_CODES:
-            continue
+    lines = [BLOCK_SEPARATOR, f"// STRING #{number}"]
+    if with_original_offset:
+        lines.append(f"// Offset Original: 0x{string_offset:08X}")
+    lines.append(f"// String Offset: 0x{string_offset:08X}")
+    for p_loc in record.pointer_locs:
+        lines.append(f"// -> Apontada por: 0x{p_loc:08X} (Valor: {pointer_value})")
+    lines.append(f"\n{record.text}\n\n<END>")
+    lines.append(BLOCK_SEPARATOR + "\n\n")
+    return "\n".join(lines)
 
-        clean_text = re.sub(r'<HEX=[0-9A-F]{2}>|\n', '', text_to_check).strip()
-        
-        if not clean_text: continue
+def format_raw_dump(file_name, records):
+    parts = [f"// Dump Bruto do arquivo: {file_name}\n\n"]
+    parts.extend(format_string_block(i + 1, record) for i, record in enumerate(records))
+    return "".join(parts)
 
-        if len(clean_text) < 30 and clean_text[0].islower():
-            continue
+def format_filtered_dump(file_name, records):
+    parts = [
+        f"// Dump Filtrado do arquivo: {file_name}\n\n",
+        f"// Total de strings de texto válidas: {len(records)}\n\n",
+    ]
+    parts.extend(format_string_block(i + 1, record, with_original_offset=True) for i, record in enumerate(records))
+    return "".join(parts)
 
-        num_hex_tags = len(hex_tags)
-        num_text_chars = len(clean_text)
-        
-        total_tokens = num_text_chars + num_hex_tags
-        if total_tokens == 0: continue
-
-        ratio = num_text_chars / total_tokens
-        if ratio < TEXT_TO_CODE_RATIO_THRESHOLD:
-            continue
-
-        filtered_blocks.append(block)
-
-    with open(final_output_path, 'w', encoding='utf-8') as f_out:
-        header_match = re.search(r"(// Dump Bruto do arquivo:.*?)\n\n", content)
-        if header_match:
-            header = header_match.group(1).replace("Dump Bruto do", "Dump Filtrado do")
-            f_out.write(header + "\n\n")
-            
-        f_out.write(f"// Total de strings de texto válidas: {len(filtered_blocks)}\n\n")
-        
-        for i, block in enumerate(filtered_blocks):
-            renumbered_block = re.sub(r"// STRING #\d+", f"// STRING #{i + 1}", block)
-            original_offset_match = re.search(r"// String Offset: (0x[0-9A-F]{8})", block)
-            if original_offset_match:
-                renumbered_block = re.sub(r"(// STRING #\d+)", r"\1\n" + f"// Offset Original: {original_offset_match.group(1)}", renumbered_block)
+def write_text_file(path, content):
+    """Grava o arquivo de uma vez só, numa única escrita bufferizada."""
+    with open(path, 'w', encoding='utf-8') as f_out:
+        f_out.write(content)
+
+def write_dump_index(txt_path, data, records, all_records):
+    """
+    Grava o .idx que acompanha um dump: as strings de `records`, na ordem dos blocos,
+    e a tabela de relocação completa, com os ponteiros de todas as strings apontadas.
+    """
+    entries = scn_strings.StringTable.from_records(records)
+    relocations = scn_strings.relocations_of(all_records)
+    scn_index.write_index(scn_index.index_path_for(txt_path), scn_index.source_hash(data), entries, relocations)
+
+def load_opcode_table(opcodes_path):
+    """Tabela de opcodes de `opcodes_path` (None se não houver). Levanta OSError/ValueError."""
+    return scn_script.load_opcode_table(opcodes_path) if opcodes_path else None
+
+def dump_pointers_only(input_path, raw_output_path, opcodes_path=None):
+    """
+    Extrai todas as strings que possuem ponteiros para um arquivo bruto (com seu .idx).
+    """
+    metrics.info(f"--- Processando (Extração Bruta): {os.path.basename(input_path)} ---")
 
-            f_out.write("####################################" + renumbered_block + "####################################\n\n")
+    data = load_scn(input_path)
+    if data is None:
+        return False
+    records = extract_string_records(data, load_opcode_table(opcodes_path))
+    if records is None:
+        return False
 
-    print(f"--> Arquivo final limpo e renumerado salvo em: {os.path.basename(final_output_path)}")
+    with metrics.phase("write"):
+        write_text_file(raw_output_path, format_raw_dump(os.path.basename(input_path), records))
+        write_dump_index(raw_output_path, data, records, records)
+    metrics.info(f"--> Extração bruta concluída: {os.path.basename(raw_output_path)}")
+    return True
+
+def dump_file(file_path, raw_dump=False, opcodes_path=None):
+    """
+    Extrai, filtra e salva o dump final de um único .SCN, tudo em memória.
+    O dump bruto só é gravado em disco quando `raw_dump` é verdadeiro (depuração).
+    """
+    file_name = os.path.basename(file_path)
+    metrics.info(f"--- Processando: {file_name} ---")
 
+    data = load_scn(file_path)
+    if data is None:
+        return False
+    return dump_data(file_name, data, raw_dump, opcodes_path)
+
+def dump_image_file(image_path, file_name, raw_dump=False, opcodes_path=None):
+    """Igual a dump_file, mas lê o .SCN direto de dentro da imagem do disco."""
+    metrics.info(f"--- Processando: {file_name} (imagem {os.path.basename(image_path)}) ---")
+    try:
+        with metrics.phase("read"):
+            data = scn_iso.open_image_cached(image_path).read_file(file_name)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERRO: Não foi possível ler '{file_name}' da imagem '{image_path}': {e}")
+        return False
+    return dump_data(file_name, data, raw_dump, opcodes_path)
+
+def dump_data(file_name, data, raw_dump=False, opcodes_path=None):
+    """Extrai, filtra e salva o dump de um .SCN já carregado em `data`."""
+    base_name = os.path.splitext(file_name)[0]
+    final_output_path = os.path.join(OUTPUT_FOLDER, f"{base_name}.txt")
+
+    # Passo 1: Extrai todas as strings apontadas.
+    records = extract_string_records(data, load_opcode_table(opcodes_path))
+    if records is None:
+        return False
+
+    if raw_dump:
+        raw_output_path = os.path.join(RAW_DUMP_FOLDER, f"{base_name}_raw_dump.txt")
+        with metrics.phase("write"):
+            write_text_file(raw_output_path, format_raw_dump(file_name, records))
+        metrics.info(f"--> Dump bruto salvo em: {raw_output_path}")
+
+    # Passo 2: Filtra o lixo e renumera as strings restantes.
+    with metrics.phase("filter"):
+        valid_records = [record for record in records if is_valid_text_record(record)]
+    metrics.count("strings_kept", len(valid_records))
+
+    with metrics.phase("write"):
+        write_text_file(final_output_path, format_filtered_dump(file_name, valid_records))
+        # Índice binário com offsets, tamanhos e ponteiros, na mesma ordem dos blocos do .txt.
+        write_dump_index(final_output_path, data, valid_records, records)
+    metrics.count("files")
+    metrics.info(f"--> Processo concluído para {base_name}. O arquivo final é '{os.path.basename(final_output_path)}'.\n")
+    return True
+
+def print_bytecode_coverage(counters):
+    """Resumo da cobertura da tabela de opcodes no lote (a partir dos contadores somados)."""
+    walked = counters.get("bytecode_bytes_walked", 0)
+    scanned = counters.get("bytecode_bytes_scanned", 0)
+    if walked + scanned == 0:
+        return
+    print(f"=== Bytecode: {100 * walked / (walked + scanned):.1f}% decodificado pela tabela de opcodes "
+          f"({counters.get('bytecode_commands', 0)} comandos, "
+          f"{counters.get('pointer_candidates_walked', 0)} operandos de texto) ===")
+    unknown = sorted(((amount, name[len("unknown_opcode_"):]) for name, amount in counters.items()
+                      if name.startswith("unknown_opcode_")), reverse=True)
+    if unknown:
+        print("Opcodes desconhecidos que mais interromperam a leitura: "
+              + ", ".join(f"{opcode} ({amount}x)" for amount, opcode in unknown[:10]))
 
 def main():
+    parser = argparse.ArgumentParser(description="Extrai o texto dos arquivos .SCN da pasta de entrada.")
+    batch.add_jobs_argument(parser)
+    parser.add_argument("--raw-dump", action="store_true",
+                        help=f"também grava o dump bruto, sem filtro, em '{RAW_DUMP_FOLDER}' (depuração)")
+    parser.add_argument("--image", metavar="IMAGEM",
+                        help="lê os .SCN direto de uma imagem ISO/BIN do disco, em vez da pasta de entrada")
+    parser.add_argument("--opcodes", metavar="TABELA.json",
+                        help=f"tabela de opcodes para ler o bytecode (padrão: '{OPCODE_TABLE_FILE}', se existir)")
+    parser.add_argument("--brute-force", action="store_true",
+                        help="ignora a tabela de opcodes e varre todos os offsets da área de ponteiros")
+    build_cache.add_force_argument(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure(args)
+
+    opcodes_path = None
+    if not args.brute_force:
+        opcodes_path = args.opcodes or (OPCODE_TABLE_FILE if os.path.exists(OPCODE_TABLE_FILE) else None)
+    if opcodes_path:
+        try:
+            opcode_table = load_opcode_table(opcodes_path)
+        except (OSError, ValueError) as e:
+            print(f"ERRO: Tabela de opcodes inválida '{opcodes_path}': {e}")
+            return
+        print(f"Tabela de opcodes: {opcodes_path} ({sum(1 for length in opcode_table.lengths if length)} opcodes, "
+              f"bytecode a partir de 0x{opcode_table.bytecode_start:X})")
+
     if not os.path.exists(INPUT_FOLDER): os.makedirs(INPUT_FOLDER)
     if not os.path.exists(OUTPUT_FOLDER): os.makedirs(OUTPUT_FOLDER)
-    search_path = os.path.join(INPUT_FOLDER, f"*{FILE_EXTENSION}")
-    files_to_process = glob.glob(search_path)
-    if not files_to_process: print(f"Nenhum arquivo '{FILE_EXTENSION}' encontrado na pasta '{INPUT_FOLDER}'.")
-    for file_path in files_to_process:
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        raw_output_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_raw_dump.txt")
+    if args.raw_dump and not os.path.exists(RAW_DUMP_FOLDER): os.makedirs(RAW_DUMP_FOLDER)
+    if args.image:
+        try:
+            with scn_iso.DiscImage(args.image) as image:
+                files_to_process = image.list_files(FILE_EXTENSION)
+        except (OSError, ValueError) as e:
+            print(f"ERRO: Não foi possível abrir a imagem '{args.image}': {e}")
+            return
+        source_description = f"na imagem '{args.image}'"
+    else:
+        search_path = os.path.join(INPUT_FOLDER, f"*{FILE_EXTENSION}")
+        files_to_process = sorted(glob.glob(search_path))
+        source_description = f"na pasta '{INPUT_FOLDER}'"
+    if not files_to_process:
+        print(f"Nenhum arquivo '{FILE_EXTENSION}' encontrado {source_description}.")
+        return
+
+    settings = {
+        'ANCHOR_POINTER_OFFSET': ANCHOR_POINTER_OFFSET,
+        'TEXT_TO_CODE_RATIO_THRESHOLD': TEXT_TO_CODE_RATIO_THRESHOLD,
+        'MAX_CONTROL_CODES': MAX_CONTROL_CODES,
+        'raw_dump': args.raw_dump,
+        'opcodes': opcodes_path,
+    }
+    if args.image:
+        # Reler a imagem inteira para calcular o hash seria caro: usa tamanho e data dela.
+        settings.update(scn_iso.image_fingerprint(args.image))
+    config = build_cache.config_fingerprint(
+        settings, [__file__, scn_codec.__file__, scn_index.__file__, scn_iso.__file__, scn_script.__file__,
+                   scn_strings.__file__]
+        + ([opcodes_path] if opcodes_path else []))
+    manifest = build_cache.BuildManifest(OUTPUT_FOLDER, "dump", config, force=args.force)
+
+    tasks = []
+    for path in files_to_process:
+        base_name = os.path.splitext(os.path.basename(path))[0]
         final_output_path = os.path.join(OUTPUT_FOLDER, f"{base_name}.txt")
-        
-        # Passo 1: Extrai tudo para um arquivo bruto.
-        success = dump_pointers_only(file_path, raw_output_path)
-        
-        # Passo 2: Se a extração foi bem-sucedida, filtra o arquivo bruto.
-        if success:
-            filter_and_renumber_dump(raw_output_path, final_output_path)
-            os.remove(raw_output_path) # Remove o arquivo bruto para manter a pasta limpa.
-            print(f"--> Processo concluído para {base_name}. O arquivo final é '{os.path.basename(final_output_path)}'.\n")
+        output_paths = [final_output_path, scn_index.index_path_for(final_output_path)]
+        if args.image:
+            tasks.append((path, (args.image, path, args.raw_dump, opcodes_path), [], output_paths))
+        else:
+            tasks.append((os.path.basename(path), (path, args.raw_dump, opcodes_path), [path], output_paths))
+
+    with metrics.session(args, "dump"):
+        build_cache.run_incremental(manifest, dump_image_file if args.image else dump_file, tasks, args.jobs)
+        if opcodes_path:
+            print_bytecode_coverage(metrics.snapshot()['counters'])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,152 @@
+"""
+Leitura do formato de texto dos dumps (.txt gerados pelo dump.py e pelo refine.py).
+
+Um dump é uma sequência de blocos entre linhas separadoras:
+
+    ####################################
+    // STRING #1
+    // Offset Original: 0x00000123
+    // String Offset: 0x00000123
+    // -> Apontada por: 0x00000040 (Valor: 2301)
+
+    Texto da string
+
+    <END>
+    ####################################
+
+O DumpParser lê o arquivo linha a linha, numa única passada, e entrega cada bloco
+assim que ele termina (gerador), sem carregar o arquivo inteiro na memória.
+"""
+import re
+from collections import namedtuple
+
+BLOCK_SEPARATOR = "####################################"
+STRING_MARKER = "// STRING #"
+END_MARKER = "<END>"
+
+STRING_OFFSET_PATTERN = re.compile(r"// String Offset:\s+(0x[0-9A-F]{8})", re.IGNORECASE)
+POINTER_LOC_PATTERN = re.compile(r"// -> Apontada por:\s+(0x[0-9A-F]{8})", re.IGNORECASE)
+HEADER_PATTERN = re.compile(r"// Dump .*? do arquivo:")
+TOTAL_PATTERN = re.compile(r"// Total de strings de texto válidas:\s*(\d+)")
+
+# line: número da linha (a partir de 1) onde o bloco começa.
+# string_offset: valor de "// String Offset" (ou None se faltar).
+# pointer_locs: locais de "// -> Apontada por", na ordem do arquivo.
+# text: texto entre a linha em branco e <END> (ou None se o bloco não tiver texto).
+# raw: o bloco exatamente como está no arquivo, entre os dois separadores.
+DumpBlock = namedtuple('DumpBlock', ['line', 'string_offset', 'pointer_locs', 'text', 'raw'])
+
+
+class _Segment:
+    """Estado do trecho entre dois separadores enquanto ele está sendo lido."""
+    __slots__ = ('line', 'parts', 'has_marker', 'string_offset', 'pointer_locs',
+                 'prev_ends_newline', 'body', 'text')
+
+    def __init__(self, line):
+        self.line = line
+        self.parts = []
+        self.has_marker = False
+        self.string_offset = None
+        self.pointer_locs = []
+        self.prev_ends_newline = False
+        self.body = None   # Linhas do texto, a partir da primeira linha em branco.
+        self.text = None
+
+    def feed(self, line):
+        self.parts.append(line)
+        if '//' in line:
+            if STRING_MARKER in line:
+                self.has_marker = True
+            if self.string_offset is None:
+                match = STRING_OFFSET_PATTERN.search(line)
+                if match:
+                    self.string_offset = int(match.group(1), 16)
+            for loc in POINTER_LOC_PATTERN.findall(line):
+                self.pointer_locs.append(int(loc, 16))
+
+        if self.text is not None:
+            return
+        if self.body is None:
+            # O texto começa depois da primeira linha em branco do bloco.
+            if line == '\n' and self.prev_ends_newline:
+                self.body = []
+            self.prev_ends_newline = line.endswith('\n')
+            return
+
+        # O texto termina na primeira sequência "linha em branco + <END>".
+        if line.startswith(END_MARKER) and len(self.body) >= 2 and self.body[-1] == '\n':
+            self.text = ''.join(self.body[:-1])[:-1]
+            self.body = None
+        else:
+            self.body.append(line)
+
+    def close(self):
+        return DumpBlock(self.line, self.string_offset, self.pointer_locs, self.text, ''.join(self.parts))
+
+
+class DumpParser:
+    """
+    Parser de dumps em máquina de estados, linha a linha.
+
+    `parse(lines)` é um gerador de DumpBlock para cada bloco que contém "// STRING #".
+    Blocos sem texto são avisados com o número da linha e não são entregues.
+    O cabeçalho "// Dump ... do arquivo: ..." fica em `header` assim que for lido, e o
+    total da linha "// Total de strings de texto válidas: N" (antes do primeiro bloco)
+    em `declared_total` (None se o arquivo não tiver essa linha).
+    """
+
+    def __init__(self, source_name="<dump>"):
+        self.source_name = source_name
+        self.header = None
+        self.declared_total = None
+
+    def warn(self, line, message):
+        print(f"AVISO: {self.source_name}, linha {line}: {message}")
+
+    def _finish(self, segment):
+        if not segment.has_marker:
+            return None
+        block = segment.close()
+        if block.text is None:
+            self.warn(block.line, f"bloco sem texto terminado por linha em branco + {END_MARKER}; ignorado.")
+            return None
+        return block
+
+    def parse(self, lines):
+        segment = _Segment(1)
+        header_candidate = None
+
+        for line_number, line in enumerate(lines, 1):
+            if header_candidate is not None:
+                if line == '\n':
+                    self.header = header_candidate
+                header_candidate = None
+            if self.header is None and "// Dump " in line and line.endswith('\n'):
+                match = HEADER_PATTERN.search(line)
+                if match:
+                    header_candidate = line[match.start():-1]
+            if segment.line == 1 and self.declared_total is None and "// Total " in line:
+                match = TOTAL_PATTERN.search(line)
+                if match:
+                    self.declared_total = int(match.group(1))
+
+            if BLOCK_SEPARATOR in line:
+                # Normalmente o separador ocupa a linha inteira, mas ele divide blocos
+                # mesmo quando aparece no meio de uma linha.
+                pieces = line.split(BLOCK_SEPARATOR)
+                for piece in pieces[:-1]:
+                    if piece:
+                        segment.feed(piece)
+                    block = self._finish(segment)
+                    if block is not None:
+                        yield block
+                    segment = _Segment(line_number)
+                if pieces[-1]:
+                    segment.feed(pieces[-1])
+                continue
+
+            segment.feed(line)
+
+        block = self._finish(segment)
+        if block is not None:
+            yield block
@@ -0,0 +1,163 @@
+"""
+Instrumentação usada pelo dump.py, refine.py e repack.py.
+
+- Mensagens com nível: `info` (uma por arquivo) e `detail` (uma por string) só são
+  impressas se o nível atual permitir. Erros e avisos continuam com print direto.
+  --quiet deixa só erros, avisos e os resumos; --log-level info tira as mensagens
+  por string.
+- Cronômetros por fase (`with metrics.phase("scan"):`) e contadores
+  (`metrics.count("pointers_updated", n)`), somados ao longo da execução.
+- --metrics ARQUIVO.json grava fases e contadores; --profile ARQUIVO.prof grava um
+  perfil do cProfile (que só cobre o processo principal, por isso força --jobs 1).
+
+Em lote paralelo, cada processo devolve seus números junto com o resultado da
+tarefa (batch.BatchResult.metrics) e eles são somados no processo principal; os
+tempos das fases são então a soma entre processos, não o tempo de relógio.
+"""
+import contextlib
+import cProfile
+import json
+import time
+
+QUIET = 0
+INFO = 1
+DETAIL = 2
+LEVELS = {'quiet': QUIET, 'info': INFO, 'detail': DETAIL}
+
+_level = DETAIL
+_timings = {}
+_counters = {}
+
+
+def add_arguments(parser):
+    """Adiciona --quiet, --log-level, --metrics e --profile a um ArgumentParser."""
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="mostra só erros, avisos e resumos (o mesmo que --log-level quiet)")
+    parser.add_argument("--log-level", choices=list(LEVELS), default="detail",
+                        help="quiet: só erros e resumos; info: uma linha por arquivo; detail: tudo (padrão)")
+    parser.add_argument("--metrics", metavar="ARQUIVO.json",
+                        help="grava o tempo de cada fase e os contadores da execução em JSON")
+    parser.add_argument("--profile", metavar="ARQUIVO.prof",
+                        help="grava um perfil do cProfile da execução (força --jobs 1)")
+
+
+def configure(args):
+    """Aplica as opções de add_arguments (nível das mensagens e --profile com --jobs 1)."""
+    set_level(QUIET if args.quiet else LEVELS[args.log_level])
+    if args.profile and getattr(args, 'jobs', 1) != 1:
+        print("AVISO: --profile só mede o processo principal; usando --jobs 1.")
+        args.jobs = 1
+
+
+def set_level(level):
+    global _level
+    _level = level
+
+
+def get_level():
+    return _level
+
+
+def enabled(level):
+    return _level >= level
+
+
+def info(message):
+    if _level >= INFO:
+        print(message)
+
+
+def detail(message):
+    if _level >= DETAIL:
+        print(message)
+
+
+# --- Fases e contadores ---
+
+class _PhaseTimer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _timings[self.name] = _timings.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+def phase(name):
+    """Cronômetro de uma fase: `with metrics.phase("write"): ...` soma o tempo gasto nela."""
+    return _PhaseTimer(name)
+
+
+def count(name, amount=1):
+    _counters[name] = _counters.get(name, 0) + amount
+
+
+def reset():
+    _timings.clear()
+    _counters.clear()
+
+
+def snapshot():
+    return {'timings': dict(_timings), 'counters': dict(_counters)}
+
+
+def merge(numbers):
+    """Soma os números de outro processo (vindos de snapshot())."""
+    if not numbers:
+        return
+    for name, seconds in numbers['timings'].items():
+        _timings[name] = _timings.get(name, 0.0) + seconds
+    for name, amount in numbers['counters'].items():
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+# --- Relatório ---
+
+def print_report(stage, total_seconds):
+    print(f"=== Métricas ({stage}): {total_seconds:.3f} s no total ===")
+    for name, seconds in sorted(_timings.items(), key=lambda item: -item[1]):
+        print(f"  fase {name:<12} {seconds:9.3f} s")
+    for name in sorted(_counters):
+        print(f"  {name}: {_counters[name]}")
+
+
+def write_json(path, stage, total_seconds):
+    content = {
+        'stage': stage,
+        'total_seconds': round(total_seconds, 6),
+        'timings': {name: round(seconds, 6) for name, seconds in _timings.items()},
+        'counters': _counters,
+    }
+    with open(path, 'w', encoding='utf-8') as f_out:
+        json.dump(content, f_out, indent=1, sort_keys=True)
+    print(f"--> Métricas salvas em: {path}")
+
+
+@contextlib.contextmanager
+def session(args, stage):
+    """
+    Envolve a execução principal de uma ferramenta: cProfile opcional, tempo total,
+    relatório das fases e contadores (exceto com --quiet) e o JSON de --metrics.
+    """
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        total_seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"--> Perfil salvo em: {args.profile}")
+        if _level >= INFO and (_timings or _counters):
+            print_report(stage, total_seconds)
+        if args.metrics:
+            write_json(args.metrics, stage, total_seconds)
@@ -1,6 +1,26 @@
 import os
 import glob
 import re
+import argparse
+import bisect
+import csv
+import time
+from array import array
+from functools import lru_cache
+
+import batch
+import build_cache
+import metrics
+import dump_format
+import refine_features
+import scn_index
+import scn_strings
+import string_table
+
+try:
+    import numpy as np  # Opcional: acelera a varredura de limites (--sweep).
+except ImportError:
+    np = None
 
 # --- CONFIGURAÇÃO ---
 # Pasta onde estão os arquivos .txt gerados pelo script de dump.
@@ -22,119 +42,654 @@ MAX_CONTROL_CODES = 3
 # Strings com menos letras do que este valor serão descartadas.
 MIN_ALPHA_CHARS = 3
 
+# Quantos textos distintos ficam com as características dos filtros guardadas (por processo).
+TEXT_CACHE_SIZE = 1 << 16
+
+# --- VARREDURA DE LIMITES (--sweep) ---
+# Valores testados por padrão para cada regra acima (todas as combinações entre eles).
+SWEEP_RATIOS = [0.1, 0.2, 0.3, 0.4, 0.5]
+SWEEP_MAX_CONTROL_CODES = [0, 1, 2, 3, 4, 5]
+SWEEP_MIN_ALPHA_CHARS = [1, 2, 3, 4, 5]
+
+# Regras de rejeição, na ordem em que são aplicadas (nomes dos contadores das métricas).
+REJECTION_RULES = ("rejected_control_codes", "rejected_empty", "rejected_digits_only", "rejected_few_letters",
+                   "rejected_bad_start", "rejected_text_ratio", "rejected_fragment")
+
+HEX_TAG_PATTERN = re.compile(r'<HEX=[0-9A-F]{2}>')
+HEX_TAG_OR_NEWLINE_PATTERN = re.compile(r'<HEX=[0-9A-F]{2}>|\n')
+ALPHA_PATTERN = re.compile(r'[a-zA-Z]')
+STRING_NUMBER_PATTERN = re.compile(r"// STRING #\d+")
+STRING_OFFSET_PATTERN = re.compile(r"// String Offset: (0x[0-9A-F]{8})")
+
+class SuffixAutomaton:
+    """
+    Autômato de sufixos generalizado: aceita exatamente as substrings de todos os textos inseridos.
+    Inserção em tempo linear no tamanho do texto; consulta "é substring?" em O(len(consulta)).
+    """
+    __slots__ = ('transitions', 'links', 'lengths')
+
+    def __init__(self):
+        self.transitions = [{}]
+        self.links = [-1]
+        self.lengths = [0]
+
+    def __contains__(self, text):
+        state = 0
+        transitions = self.transitions
+        for char in text:
+            state = transitions[state].get(char)
+            if state is None:
+                return False
+        return True
+
+    def add(self, text):
+        last = 0
+        for char in text:
+            last = self._extend(last, char)
+
+    def _new_state(self, length, transitions, link):
+        self.transitions.append(transitions)
+        self.links.append(link)
+        self.lengths.append(length)
+        return len(self.lengths) - 1
+
+    def _split(self, p, char, q):
+        """Clona o estado q para que ele tenha comprimento lengths[p] + 1 e redireciona as transições de p em diante."""
+        transitions, links = self.transitions, self.links
+        clone = self._new_state(self.lengths[p] + 1, dict(transitions[q]), links[q])
+        while p != -1 and transitions[p].get(char) == q:
+            transitions[p][char] = clone
+            p = links[p]
+        links[q] = clone
+        return clone
+
+    def _extend(self, last, char):
+        transitions, links, lengths = self.transitions, self.links, self.lengths
+
+        # O caractere já existe a partir deste estado (prefixo compartilhado com um texto anterior).
+        q = transitions[last].get(char)
+        if q is not None:
+            if lengths[last] + 1 == lengths[q]:
+                return q
+            return self._split(last, char, q)
+
+        cur = self._new_state(lengths[last] + 1, {}, 0)
+        p = last
+        while p != -1 and char not in transitions[p]:
+            transitions[p][char] = cur
+            p = links[p]
+        if p != -1:
+            q = transitions[p][char]
+            if lengths[p] + 1 == lengths[q]:
+                links[cur] = q
+            else:
+                links[cur] = self._split(p, char, q)
+        return cur
+
+
+def find_fragment_indices(texts):
+    """
+    Retorna os índices dos textos que são substring de outro texto estritamente mais longo.
+    Duplicatas exatas não se eliminam entre si.
+
+    Os textos são processados do maior para o menor: cada grupo de mesmo tamanho é
+    consultado num autômato que contém apenas textos mais longos, e só os que não
+    são fragmentos são inseridos (os fragmentos já estão contidos em algum deles).
+    """
+    indices_by_text = {}
+    for i, text in enumerate(texts):
+        indices_by_text.setdefault(text, []).append(i)
+
+    automaton = SuffixAutomaton()
+    fragment_indices = set()
+    distinct_texts = sorted(indices_by_text, key=len, reverse=True)
+    group_start = 0
+    while group_start < len(distinct_texts):
+        group_length = len(distinct_texts[group_start])
+        group_end = group_start
+        while group_end < len(distinct_texts) and len(distinct_texts[group_end]) == group_length:
+            group_end += 1
+
+        group = distinct_texts[group_start:group_end]
+        survivors = []
+        for text in group:
+            if text in automaton:
+                fragment_indices.update(indices_by_text[text])
+            else:
+                survivors.append(text)
+        for text in survivors:
+            automaton.add(text)
+        group_start = group_end
+
+    return fragment_indices
+
+
+def find_fragment_containers(texts, indices):
+    """
+    Para cada índice i de `indices` cujo texto é substring de outro texto estritamente
+    mais longo de `indices`, devolve {i: índices desses textos mais longos}. É a relação
+    que find_fragment_indices usa, mas completa: serve para qualquer subconjunto dos
+    textos que venha a passar nos filtros (usada pelo cache da varredura de limites).
+
+    Os textos distintos ficam num só buffer, do maior para o menor; cada texto é
+    procurado só no trecho dos mais longos, e cada ocorrência é atribuída por bisect
+    ao texto em que caiu (e a busca continua no texto seguinte).
+    """
+    indices_by_text = {}
+    for i in indices:
+        if texts[i]:
+            indices_by_text.setdefault(texts[i], []).append(i)
+    distinct_texts = sorted(indices_by_text, key=len, reverse=True)
+    starts = []
+    position = 0
+    for text in distinct_texts:
+        starts.append(position)
+        position += len(text) + 1
+    joined = "\0".join(distinct_texts)
+
+    containers = {}
+    longer_count = 0
+    for text in distinct_texts:
+        while len(distinct_texts[longer_count]) > len(text):
+            longer_count += 1
+        if not longer_count:
+            continue
+        # Os textos estritamente mais longos ocupam joined[:longer_end].
+        longer_end = starts[longer_count] - 1
+        found = []
+        position = joined.find(text, 0, longer_end)
+        while position != -1:
+            k = bisect.bisect_right(starts, position) - 1
+            found.extend(indices_by_text[distinct_texts[k]])
+            position = joined.find(text, starts[k + 1], longer_end)
+        if found:
+            for i in indices_by_text[text]:
+                containers[i] = found
+    return containers
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def text_features(text):
+    """
+    Tudo o que os filtros iniciais olham num texto: (quantidade de códigos <HEX>,
+    texto limpo, quantidade de letras do texto limpo). Não depende dos limites, então
+    fica em cache: cada string repetida no corpus passa pelas expressões regulares uma
+    vez por processo.
+    """
+    clean_text = HEX_TAG_OR_NEWLINE_PATTERN.sub('', text).strip()
+    return len(HEX_TAG_PATTERN.findall(text)), clean_text, len(ALPHA_PATTERN.findall(clean_text))
+
+
+def is_bad_start(char):
+    """Texto que começa assim é continuação de outro, não o início de uma fala."""
+    return char.islower() or char in ',.?!'
+
+
+def classify_text(text_to_check):
+    """
+    Aplica os filtros iniciais a um texto. Retorna (regra, texto limpo): a regra é o
+    nome do contador da rejeição, ou None se o texto for candidato. Os limites são lidos
+    a cada chamada (só as características do texto ficam em cache), então mudar as
+    constantes do módulo vale na hora. A varredura de limites (sweep_thresholds) aplica as mesmas regras, na mesma ordem.
+    """
+    # --- APLICAÇÃO DOS FILTROS INICIAIS ---
+
+    num_hex_tags, clean_text, num_alpha_chars = text_features(text_to_check)
+    
+    if num_hex_tags > MAX_CONTROL_CODES:
+        return "rejected_control_codes", None
+
+    if not clean_text:
+        return "rejected_empty", None
+
+    # FILTRO (NOVO): Exclui strings que são apenas números.
+    if clean_text.isdigit():
+        return "rejected_digits_only", clean_text
+
+    if num_alpha_chars < MIN_ALPHA_CHARS:
+        return "rejected_few_letters", None
+
+    if is_bad_start(clean_text[0]):
+        return "rejected_bad_start", None
+
+    num_text_chars = len(clean_text)
+    
+    total_tokens = num_text_chars + num_hex_tags
+    if total_tokens == 0:
+        return "rejected_empty", None
+
+    ratio = num_text_chars / total_tokens
+    if ratio < TEXT_TO_CODE_RATIO_THRESHOLD:
+        return "rejected_text_ratio", None
+
+    # Se passou nos filtros iniciais, é um candidato.
+    return None, clean_text
+
+
+def check_candidate_block(block):
+    """
+    Aplica os filtros iniciais a um bloco lido pelo DumpParser.
+    Retorna o texto limpo do candidato ou None se o bloco for descartado.
+    """
+    rule, clean_text = classify_text(block.text)
+    if rule is not None:
+        metrics.count(rule)
+        if rule == "rejected_digits_only":
+            metrics.detail(f"    -> REJEITADO (Apenas números): {clean_text[:40]}...")
+        return None
+    return clean_text
+
+
+def write_filtered_index(raw_dump_path, final_output_path, block_count, positions):
+    """
+    Grava o índice .idx do arquivo filtrado com as entradas das strings mantidas,
+    a partir do índice que o dump.py gravou ao lado do arquivo de entrada.
+    """
+    input_index_path = scn_index.index_path_for(raw_dump_path)
+    output_index_path = scn_index.index_path_for(final_output_path)
+    if os.path.exists(output_index_path):
+        os.remove(output_index_path) # Um índice antigo não pode sobreviver a um .txt novo.
+
+    try:
+        index = scn_index.read_index(input_index_path)
+    except FileNotFoundError:
+        return
+    except ValueError as error:
+        print(f"AVISO: {error}; o índice não será copiado.")
+        return
+
+    if len(index.entries) != block_count:
+        print(f"AVISO: o índice {os.path.basename(input_index_path)} tem {len(index.entries)} strings, "
+              f"mas o dump tem {block_count}; o índice não será copiado.")
+        return
+
+    entries = index.entries.select(positions)
+    scn_index.write_index(output_index_path, index.source_sha256, entries, index.relocations)
+
+
+def refine_dump(lines, source_name):
+    """
+    Filtra e renumera as linhas de um dump. Retorna (conteúdo do .txt filtrado,
+    posições no dump dos blocos mantidos, quantidade de blocos lidos); se nenhum bloco
+    passar, o .txt só tem o cabeçalho e o total 0. Não lê nem grava arquivos (usado
+    também pelo verify.py).
+    """
+    parser = dump_format.DumpParser(source_name)
+    # Candidatos em colunas: posição no dump, texto limpo e bloco original.
+    positions = array('I')
+    clean_texts = []
+    raw_blocks = []
+    block_count = 0
+    with metrics.phase("parse+filter"):
+        # O parser entrega um bloco por vez; só os candidatos ficam na memória.
+        for position, block in enumerate(parser.parse(lines)):
+            clean_text = check_candidate_block(block)
+            if clean_text is not None:
+                positions.append(position)
+                clean_texts.append(clean_text)
+                raw_blocks.append(block.raw)
+            block_count = position + 1
+    metrics.count("blocks_read", block_count)
+
+    # --- FILTRO DE SUBCONJUNTO (SUBSTRING) ---
+    if not positions:
+        print("--> Nenhum bloco candidato passou na filtragem inicial.")
+
+    with metrics.phase("fragments"):
+        indices_to_remove = find_fragment_indices(clean_texts)
+    metrics.count("rejected_fragment", len(indices_to_remove))
+    if metrics.enabled(metrics.DETAIL):
+        for i in sorted(indices_to_remove):
+            # A string i é um pedaço mais curto de outra string candidata.
+            print(f"    -> REJEITADO (Fragmento de outra string): {clean_texts[i][:40]}...")
+
+    kept = [i for i in range(len(positions)) if i not in indices_to_remove]
+    final_positions = array('I', [positions[i] for i in kept])
+    final_blocks = [raw_blocks[i] for i in kept]
+
+    # Renumera os blocos que passaram no filtro.
+    with metrics.phase("write"):
+        parts = []
+        if parser.header is not None:
+            header = parser.header.replace("Bruto do", "Filtrado do")
+            parts.append(header + "\n\n")
+
+        parts.append(f"// Total de strings de texto válidas: {len(final_blocks)}\n\n")
+
+        for i, block in enumerate(final_blocks):
+            renumbered_block = STRING_NUMBER_PATTERN.sub(f"// STRING #{i + 1}", block)
+
+            if "// Offset Original:" not in renumbered_block:
+                original_offset_match = STRING_OFFSET_PATTERN.search(block)
+                if original_offset_match:
+                    renumbered_block = STRING_NUMBER_PATTERN.sub(r"\g<0>\n" + f"// Offset Original: {original_offset_match.group(1)}", renumbered_block)
+
+            parts.append(dump_format.BLOCK_SEPARATOR + renumbered_block + dump_format.BLOCK_SEPARATOR + "\n\n")
+
+    return "".join(parts), final_positions, block_count
+
+
 def filter_and_renumber_dump(raw_dump_path, final_output_path):
     """
     Lê um arquivo de dump, aplica filtros rigorosos para remover strings inválidas,
     e salva um novo arquivo limpo e renumerado.
     """
-    print(f"--- Filtrando o arquivo: {os.path.basename(raw_dump_path)} ---")
+    metrics.info(f"--- Filtrando o arquivo: {os.path.basename(raw_dump_path)} ---")
     
     try:
         with open(raw_dump_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            refined = refine_dump(f, os.path.basename(raw_dump_path))
     except FileNotFoundError:
-        print(f"ERRO: Arquivo de dump não encontrado: {raw_dump_path}"); return
+        print(f"ERRO: Arquivo de dump não encontrado: {raw_dump_path}"); return False
+    # Sem nenhuma string mantida, o .txt filtrado sai vazio (e o .idx também): um
+    # resultado antigo não pode ficar no lugar, e o manifesto não refaz o arquivo à toa.
+    content, positions, block_count = refined
 
-    # Divide o arquivo em blocos usando o separador "####################################".
-    blocks = content.split("####################################")
-    
-    candidate_blocks = []
-    for block in blocks:
-        block_content = block.strip()
-        # Ignora blocos vazios ou que não sejam de string.
-        if not block_content or "// STRING #" not in block_content:
-            continue
-        
-        # Extrai o texto real da string para análise.
-        text_content_match = re.search(r'\n\n(.*?)\n\n<END>', block, re.DOTALL)
-        if not text_content_match:
-            continue
-        
-        text_to_check = text_content_match.group(1)
-        
-        # --- APLICAÇÃO DOS FILTROS INICIAIS ---
-        
-        hex_tags = re.findall(r'<HEX=[0-9A-F]{2}>', text_to_check)
-        
-        if len(hex_tags) > MAX_CONTROL_CODES:
-            continue
+    with metrics.phase("write"):
+        with open(final_output_path, 'w', encoding='utf-8') as f_out:
+            f_out.write(content)
+        write_filtered_index(raw_dump_path, final_output_path, block_count, positions)
+    metrics.count("strings_kept", len(positions))
+    metrics.count("files")
 
-        clean_text = re.sub(r'<HEX=[0-9A-F]{2}>|\n', '', text_to_check).strip()
-        
-        if not clean_text:
-            continue
+    metrics.info(f"--> Arquivo final limpo e renumerado salvo em: {os.path.basename(final_output_path)}\n")
+    return True
 
-        # FILTRO (NOVO): Exclui strings que são apenas números.
-        if clean_text.isdigit():
-            print(f"    -> REJEITADO (Apenas números): {clean_text[:40]}...")
-            continue
 
-        alpha_chars = re.findall(r'[a-zA-Z]', clean_text)
-        if len(alpha_chars) < MIN_ALPHA_CHARS:
-            continue
+# --- CACHE DE CARACTERÍSTICAS E VARREDURA DE LIMITES ---
 
-        if clean_text[0].islower() or clean_text[0] in ',.?!':
-            continue
+def dominant_containers(containers, hex_tags, clean_lengths, alpha_counts):
+    """
+    Dos blocos que contêm o texto de um bloco, só os que podem mudar o resultado da
+    varredura: um contêiner com pelo menos tantos códigos <HEX>, no máximo tantas
+    letras e no máximo a mesma proporção de texto que outro só passa nos filtros
+    quando o outro também passa, então é deixado de fora.
+    """
+    def ratio(i):
+        return clean_lengths[i] / (clean_lengths[i] + hex_tags[i])
 
-        num_hex_tags = len(hex_tags)
-        num_text_chars = len(clean_text)
-        
-        total_tokens = num_text_chars + num_hex_tags
-        if total_tokens == 0:
-            continue
+    kept = []
+    # Em ordem de códigos <HEX>: cada um só pode ser superado pelos que já foram mantidos.
+    for i in sorted(containers, key=lambda i: (hex_tags[i], -alpha_counts[i], -ratio(i))):
+        if not any(alpha_counts[k] >= alpha_counts[i] and ratio(k) >= ratio(i) for k in kept):
+            kept.append(i)
+    return kept
+
+
+def dump_features(dump_path, sha256):
+    """
+    Lê um dump e calcula as características de todos os blocos (uma FeatureTable com
+    um dump). Os contêineres só são procurados entre os blocos que podem ser candidatos
+    com algum limite: os vazios, só de dígitos ou de início ruim nunca são.
+    """
+    name = os.path.basename(dump_path)
+    hex_column, clean_texts, alpha_column = [], [], []
+    with open(dump_path, 'r', encoding='utf-8') as f:
+        for block in dump_format.DumpParser(name).parse(f):
+            hex_tags, clean_text, alpha_count = text_features(block.text)
+            hex_column.append(hex_tags)
+            clean_texts.append(clean_text)
+            alpha_column.append(alpha_count)
 
-        ratio = num_text_chars / total_tokens
-        if ratio < TEXT_TO_CODE_RATIO_THRESHOLD:
+    eligible = [i for i, text in enumerate(clean_texts) if text and not text.isdigit() and not is_bad_start(text[0])]
+    containers = find_fragment_containers(clean_texts, eligible)
+    length_column = [len(text) for text in clean_texts]
+
+    table = refine_features.FeatureTable()
+    for i, clean_text in enumerate(clean_texts):
+        block_containers = containers.get(i)
+        if block_containers:
+            block_containers = dominant_containers(block_containers, hex_column, length_column, alpha_column)
+        table.append(hex_column[i], clean_text, alpha_column[i], block_containers or ())
+    table.close_file(name, sha256)
+    return table
+
+
+def update_feature_cache(dump_paths, force=False):
+    """
+    Características de todos os dumps, a partir do cache em OUTPUT_FOLDER: só os dumps
+    novos ou alterados (pelo SHA-256) são lidos, e o cache é regravado se algo mudou.
+    """
+    cache_path = os.path.join(OUTPUT_FOLDER, refine_features.FEATURES_NAME)
+    cached = None
+    if not force:
+        try:
+            cached = refine_features.read_features(cache_path)
+        except FileNotFoundError:
+            pass
+        except ValueError as error:
+            print(f"AVISO: {error}; as características serão recalculadas.")
+    cached_files = {name: k for k, name in enumerate(cached.names)} if cached else {}
+
+    table = refine_features.FeatureTable()
+    files_read = 0
+    for dump_path in sorted(dump_paths):
+        sha256 = bytes.fromhex(build_cache.file_sha256(dump_path))
+        k = cached_files.get(os.path.basename(dump_path))
+        if k is not None and cached.hashes[k] == sha256:
+            table.extend(cached.file_table(k))
             continue
+        with metrics.phase("features"):
+            table.extend(dump_features(dump_path, sha256))
+        files_read += 1
 
-        # Se passou nos filtros iniciais, é um candidato.
-        candidate_blocks.append({'block': block, 'clean_text': clean_text})
+    if cached is None or files_read or cached.names != table.names:
+        refine_features.write_features(cache_path, table)
+    metrics.info(f"--> Características: {files_read} dump(s) lido(s), {len(table.names) - files_read} do cache, "
+                 f"{len(table)} blocos ({cache_path})")
+    return table
 
-    # --- FILTRO DE SUBCONJUNTO (SUBSTRING) ---
-    if not candidate_blocks:
-        print("--> Nenhum bloco candidato passou na filtragem inicial.")
-        return
 
-    indices_to_remove = set()
-    for i in range(len(candidate_blocks)):
-        for j in range(len(candidate_blocks)):
-            if i == j:
-                continue
-            
-            text_i = candidate_blocks[i]['clean_text']
-            text_j = candidate_blocks[j]['clean_text']
-            
-            # Se a string i for um pedaço da string j, e for mais curta, marca para remoção.
-            if text_i in text_j and len(text_i) < len(text_j):
-                print(f"    -> REJEITADO (Fragmento de outra string): {text_i[:40]}...")
-                indices_to_remove.add(i)
-                break # Já sabemos que precisa ser removida, podemos pular para a próxima string i.
-
-    final_blocks = [candidate['block'] for i, candidate in enumerate(candidate_blocks) if i not in indices_to_remove]
-
-    # Renumera e salva os blocos que passaram no filtro.
-    with open(final_output_path, 'w', encoding='utf-8') as f_out:
-        header_match = re.search(r"(// Dump .*? do arquivo:.*?)\n\n", content)
-        if header_match:
-            header = header_match.group(1).replace("Bruto do", "Filtrado do")
-            f_out.write(header + "\n\n")
-            
-        f_out.write(f"// Total de strings de texto válidas: {len(final_blocks)}\n\n")
-        
-        for i, block in enumerate(final_blocks):
-            renumbered_block = re.sub(r"// STRING #\d+", f"// STRING #{i + 1}", block)
-            
-            if "// Offset Original:" not in renumbered_block:
-                original_offset_match = re.search(r"// String Offset: (0x[0-9A-F]{8})", block)
-                if original_offset_match:
-                    renumbered_block = re.sub(r"(// STRING #\d+)", r"\1\n" + f"// Offset Original: {original_offset_match.group(1)}", renumbered_block)
+class _BitMasks:
+    """Máscaras em lote sem NumPy: um inteiro com um bit por bloco."""
+
+    def __init__(self, table):
+        self.size = len(table)
+        self.full = (1 << self.size) - 1
+        self.hex_tags = table.hex_tags.tolist()
+        self.clean_lengths = table.clean_lengths.tolist()
+        self.alpha_counts = table.alpha_counts.tolist()
+        self.empty = self.where(length == 0 for length in self.clean_lengths)
+        self.digits_only = self.where(table.digits_only)
+        self.bad_start = self.where(char and is_bad_start(chr(char)) for char in table.first_chars)
+        # Bit i fica na posição size - 1 - i do texto binário da máscara.
+        last = self.size - 1
+        starts = table.container_starts
+        self.fragment_owners = [(last - i, [last - j for j in table.containers[starts[i]:starts[i + 1]]])
+                                for i in range(self.size) if starts[i] != starts[i + 1]]
+
+    def where(self, flags):
+        digits = bytes(48 + bool(flag) for flag in flags)
+        return int(digits[::-1], 2) if digits else 0
+
+    def invert(self, mask):
+        return self.full ^ mask
+
+    def count(self, mask):
+        return bin(mask).count('1')
+
+    def hex_at_most(self, limit):
+        return self.where(hex_tags <= limit for hex_tags in self.hex_tags)
+
+    def alpha_at_least(self, limit):
+        return self.where(alpha_count >= limit for alpha_count in self.alpha_counts)
+
+    def ratio_at_least(self, threshold):
+        return self.where(not (length + hex_tags and length / (length + hex_tags) < threshold)
+                          for length, hex_tags in zip(self.clean_lengths, self.hex_tags))
 
-            f_out.write("####################################" + renumbered_block + "####################################\n\n")
+    def fragments(self, candidates):
+        """Quantos candidatos têm um contêiner que também é candidato."""
+        bits = format(candidates, f"0{self.size}b")
+        count = 0
+        for position, container_positions in self.fragment_owners:
+            if bits[position] == '1':
+                for container_position in container_positions:
+                    if bits[container_position] == '1':
+                        count += 1
+                        break
+        return count
 
-    print(f"--> Arquivo final limpo e renumerado salvo em: {os.path.basename(final_output_path)}\n")
+
+class _NumpyMasks:
+    """Máscaras em lote com NumPy: um array de bool por máscara."""
+
+    def __init__(self, table):
+        self.hex_tags = np.frombuffer(table.hex_tags, dtype=np.uint32).astype(np.int64)
+        self.clean_lengths = np.frombuffer(table.clean_lengths, dtype=np.uint32).astype(np.int64)
+        self.alpha_counts = np.frombuffer(table.alpha_counts, dtype=np.uint32)
+        first_chars = np.frombuffer(table.first_chars, dtype=np.uint32)
+        totals = self.clean_lengths + self.hex_tags
+        self.ratios = np.divide(self.clean_lengths, totals, out=np.ones(len(table)), where=totals > 0)
+        self.empty = self.clean_lengths == 0
+        self.digits_only = np.frombuffer(table.digits_only, dtype=np.uint8) != 0
+        bad_chars = [char for char in np.unique(first_chars).tolist() if char and is_bad_start(chr(char))]
+        self.bad_start = np.isin(first_chars, bad_chars)
+        starts = np.frombuffer(table.container_starts, dtype=np.uint32).astype(np.int64)
+        self.fragment_owners = np.repeat(np.arange(len(table)), np.diff(starts))
+        self.fragment_containers = np.frombuffer(table.containers, dtype=np.uint32).astype(np.int64)
+
+    def invert(self, mask):
+        return ~mask
+
+    def count(self, mask):
+        return int(np.count_nonzero(mask))
+
+    def hex_at_most(self, limit):
+        return self.hex_tags <= limit
+
+    def alpha_at_least(self, limit):
+        return self.alpha_counts >= limit
+
+    def ratio_at_least(self, threshold):
+        return ~(self.ratios < threshold)
+
+    def fragments(self, candidates):
+        """Quantos candidatos têm um contêiner que também é candidato."""
+        hits = candidates[self.fragment_owners] & candidates[self.fragment_containers]
+        return int(np.unique(self.fragment_owners[hits]).size)
+
+
+def sweep_thresholds(table, ratios, max_control_codes, min_alpha_chars, use_numpy=True):
+    """
+    Avalia todas as combinações de limites sobre as características em cache, com as
+    regras de classify_text na mesma ordem e o filtro de fragmentos. Cada limite vira
+    uma máscara uma vez só, e cada combinação é um punhado de operações em lote sobre
+    elas. Retorna um dicionário por combinação: os limites, strings_kept e as
+    rejeições por regra (os mesmos contadores de uma passada do refine).
+    """
+    masks = _NumpyMasks(table) if use_numpy and np is not None else _BitMasks(table)
+    by_codes = {limit: masks.hex_at_most(limit) for limit in max_control_codes}
+    by_alpha = {limit: masks.alpha_at_least(limit) for limit in min_alpha_chars}
+    by_ratio = {threshold: masks.ratio_at_least(threshold) for threshold in ratios}
+    not_empty = masks.invert(masks.empty)
+    not_digits_only = masks.invert(masks.digits_only)
+    not_bad_start = masks.invert(masks.bad_start)
+
+    results = []
+    for max_codes in max_control_codes:
+        passed_codes = by_codes[max_codes]
+        passed_digits = passed_codes & not_empty & not_digits_only
+        codes_counts = {
+            "rejected_control_codes": masks.count(masks.invert(passed_codes)),
+            "rejected_empty": masks.count(passed_codes & masks.empty),
+            "rejected_digits_only": masks.count(passed_codes & not_empty & masks.digits_only),
+        }
+        for min_alpha in min_alpha_chars:
+            passed_alpha = passed_digits & by_alpha[min_alpha]
+            passed_start = passed_alpha & not_bad_start
+            alpha_counts = {
+                "rejected_few_letters": masks.count(passed_digits) - masks.count(passed_alpha),
+                "rejected_bad_start": masks.count(passed_alpha) - masks.count(passed_start),
+            }
+            start_count = masks.count(passed_start)
+            for threshold in ratios:
+                candidates = passed_start & by_ratio[threshold]
+                candidate_count = masks.count(candidates)
+                fragment_count = masks.fragments(candidates)
+                result = {
+                    'TEXT_TO_CODE_RATIO_THRESHOLD': threshold,
+                    'MAX_CONTROL_CODES': max_codes,
+                    'MIN_ALPHA_CHARS': min_alpha,
+                    'strings_kept': candidate_count - fragment_count,
+                }
+                result.update(codes_counts)
+                result.update(alpha_counts)
+                result["rejected_text_ratio"] = start_count - candidate_count
+                result["rejected_fragment"] = fragment_count
+                results.append(result)
+    return results
+
+
+def print_sweep(results):
+    """Tabela da varredura; a combinação das constantes atuais é marcada com '*'."""
+    current = (TEXT_TO_CODE_RATIO_THRESHOLD, MAX_CONTROL_CODES, MIN_ALPHA_CHARS)
+    print(f"  {'proporção':>9} {'códigos':>7} {'letras':>6} | {'mantidas':>8} | rejeitadas por: "
+          f"{'códigos':>7} {'vazia':>6} {'dígitos':>7} {'letras':>7} {'início':>7} {'proporção':>9} {'fragmento':>9}")
+    for result in results:
+        settings = (result['TEXT_TO_CODE_RATIO_THRESHOLD'], result['MAX_CONTROL_CODES'], result['MIN_ALPHA_CHARS'])
+        marker = "*" if settings == current else " "
+        rejected = " ".join(f"{result[rule]:>{width}}" for rule, width in zip(REJECTION_RULES, (7, 6, 7, 7, 7, 9, 9)))
+        print(f"{marker} {settings[0]:>9g} {settings[1]:>7} {settings[2]:>6} | {result['strings_kept']:>8} | "
+              f"{'':>15} {rejected}")
+
+
+def write_sweep_csv(path, results):
+    fieldnames = ['TEXT_TO_CODE_RATIO_THRESHOLD', 'MAX_CONTROL_CODES', 'MIN_ALPHA_CHARS', 'strings_kept']
+    with open(path, 'w', encoding='utf-8', newline='') as f_out:
+        writer = csv.DictWriter(f_out, fieldnames=fieldnames + list(REJECTION_RULES))
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"--> Varredura salva em: {path}")
+
+
+def run_sweep(dump_paths, args):
+    """Modo --sweep: atualiza o cache de características e avalia a grade de limites."""
+    table = update_feature_cache(dump_paths, args.force)
+    start = time.perf_counter()
+    with metrics.phase("sweep"):
+        results = sweep_thresholds(table, args.ratios, args.max_codes, args.min_alpha)
+    elapsed = time.perf_counter() - start
+    print_sweep(results)
+    print(f"=== Varredura: {len(results)} combinação(ões) de limites, {len(table)} blocos de "
+          f"{len(table.names)} dump(s) em {elapsed:.2f} s ({'NumPy' if np is not None else 'sem NumPy'}) ===")
+    if args.sweep_csv:
+        write_sweep_csv(args.sweep_csv, results)
+
+
+def number_list(kind):
+    """Tipo do argparse para uma lista de números separados por vírgula ("0.2,0.3")."""
+    def parse(value):
+        try:
+            numbers = sorted({kind(part) for part in value.split(",") if part.strip()})
+        except ValueError:
+            numbers = None
+        if not numbers:
+            raise argparse.ArgumentTypeError(f"lista de números inválida: '{value}'")
+        return numbers
+    return parse
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Filtra e renumera os dumps .txt da pasta de entrada.")
+    batch.add_jobs_argument(parser)
+    build_cache.add_force_argument(parser)
+    parser.add_argument("--no-sheet", action="store_true",
+                        help=f"não gera a planilha de tradução sem repetições em '{string_table.SHEET_FOLDER}'")
+    parser.add_argument("--sweep", action="store_true",
+                        help="não grava nada: avalia todas as combinações de --ratios, --max-codes e --min-alpha "
+                             "sobre as características dos blocos (em cache) e mostra quantas strings cada uma mantém")
+    parser.add_argument("--ratios", type=number_list(float), default=SWEEP_RATIOS, metavar="LISTA",
+                        help=f"valores de TEXT_TO_CODE_RATIO_THRESHOLD na varredura (padrão: {SWEEP_RATIOS})")
+    parser.add_argument("--max-codes", type=number_list(int), default=SWEEP_MAX_CONTROL_CODES, metavar="LISTA",
+                        help=f"valores de MAX_CONTROL_CODES na varredura (padrão: {SWEEP_MAX_CONTROL_CODES})")
+    parser.add_argument("--min-alpha", type=number_list(int), default=SWEEP_MIN_ALPHA_CHARS, metavar="LISTA",
+                        help=f"valores de MIN_ALPHA_CHARS na varredura (padrão: {SWEEP_MIN_ALPHA_CHARS})")
+    parser.add_argument("--sweep-csv", metavar="ARQUIVO", help="também grava o resultado da varredura em CSV")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure(args)
+
     if not os.path.exists(INPUT_FOLDER):
         os.makedirs(INPUT_FOLDER)
         print(f"Pasta '{INPUT_FOLDER}' criada. Por favor, coloque seus arquivos .txt de dump aqui.")
@@ -144,18 +699,43 @@ def main():
         os.makedirs(OUTPUT_FOLDER)
 
     search_path = os.path.join(INPUT_FOLDER, "*.txt")
-    files_to_process = glob.glob(search_path)
+    files_to_process = sorted(glob.glob(search_path))
     
     if not files_to_process:
         print(f"Nenhum arquivo '.txt' encontrado na pasta '{INPUT_FOLDER}'.")
         return
-        
+
+    if args.sweep:
+        with metrics.session(args, "refine --sweep"):
+            run_sweep(files_to_process, args)
+        return
+
+    settings = {
+        'TEXT_TO_CODE_RATIO_THRESHOLD': TEXT_TO_CODE_RATIO_THRESHOLD,
+        'MAX_CONTROL_CODES': MAX_CONTROL_CODES,
+        'MIN_ALPHA_CHARS': MIN_ALPHA_CHARS,
+    }
+    config = build_cache.config_fingerprint(settings, [__file__, dump_format.__file__, refine_features.__file__,
+                                                      scn_index.__file__, scn_strings.__file__, string_table.__file__])
+    manifest = build_cache.BuildManifest(OUTPUT_FOLDER, "refine", config, force=args.force)
+
+    tasks = []
     for file_path in files_to_process:
         base_name = os.path.splitext(os.path.basename(file_path))[0]
         clean_base_name = base_name.replace("_raw_dump", "").replace("_dump", "")
         final_output_path = os.path.join(OUTPUT_FOLDER, f"{clean_base_name}.txt")
-        
-        filter_and_renumber_dump(file_path, final_output_path)
+        input_paths = [file_path, scn_index.index_path_for(file_path)]
+        output_paths = [final_output_path]
+        # O .idx filtrado só existe se o dump tiver o seu.
+        if os.path.exists(input_paths[1]):
+            output_paths.append(scn_index.index_path_for(final_output_path))
+        tasks.append((os.path.basename(file_path), (file_path, final_output_path), input_paths, output_paths))
+
+    with metrics.session(args, "refine"):
+        build_cache.run_incremental(manifest, filter_and_renumber_dump, tasks, args.jobs)
+        if not args.no_sheet:
+            with metrics.phase("sheet"):
+                string_table.build_sheet(OUTPUT_FOLDER)
 
 if __name__ == "__main__":
     main()
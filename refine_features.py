@@ -0,0 +1,175 @@
+"""
+Cache colunar das características dos blocos dos dumps, usado pelo refine.py --sweep.
+
+Para cada bloco de cada dump .txt, o refine.py calcula uma vez tudo o que os filtros
+iniciais olham (quantidade de códigos <HEX>, tamanho e quantidade de letras do texto
+limpo, se ele é só de dígitos e o primeiro caractere) e, para os blocos que podem ser
+fragmento de outro, os blocos mais longos do mesmo dump que contêm o texto limpo
+deles. Com isso, a varredura de limites não relê os dumps nem roda as expressões
+regulares de novo. O SHA-256 de cada dump fica no cache: só os dumps que mudaram
+são lidos outra vez.
+
+Formato (little-endian), versão 1:
+    cabeçalho   : 'SCNF', versão (u16), reservado (u16), quantidade de dumps (u32),
+                  quantidade de blocos (u32), quantidade de contêineres (u32)
+    dumps       : SHA-256 (32 bytes), primeiro bloco (u32), tamanho do nome (u32), nome em UTF-8
+    colunas     : códigos <HEX>, tamanho do texto limpo, letras e primeiro caractere
+                  (u32 cada, um valor por bloco), só dígitos (u8 por bloco)
+    fragmentos  : início de cada bloco em 'contêineres' (u32, um a mais no fim) e os
+                  contêineres (u32, índice do bloco no cache inteiro)
+"""
+import os
+import struct
+import sys
+from array import array
+
+FEATURES_NAME = ".refine_features"
+FEATURES_MAGIC = b"SCNF"
+FEATURES_VERSION = 1
+
+HEADER_STRUCT = struct.Struct('<4sHHIII')
+FILE_STRUCT = struct.Struct('<32sII')
+
+U32_COLUMNS = ('hex_tags', 'clean_lengths', 'alpha_counts', 'first_chars')
+
+
+def _u32_bytes(values):
+    if sys.byteorder == 'big':
+        values = array('I', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _u32_array(buffer):
+    values = array('I')
+    values.frombytes(buffer)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class FeatureTable:
+    """
+    Características de todos os blocos de um ou mais dumps, em colunas. Os blocos do
+    dump k são file_starts[k]:file_starts[k + 1]; os contêineres do bloco i são
+    containers[container_starts[i]:container_starts[i + 1]].
+    """
+    __slots__ = ('names', 'hashes', 'file_starts', 'hex_tags', 'clean_lengths', 'alpha_counts',
+                 'first_chars', 'digits_only', 'container_starts', 'containers')
+
+    def __init__(self):
+        self.names = []
+        self.hashes = []
+        self.file_starts = array('I', [0])
+        self.hex_tags = array('I')
+        self.clean_lengths = array('I')
+        self.alpha_counts = array('I')
+        self.first_chars = array('I')
+        self.digits_only = array('B')
+        self.container_starts = array('I', [0])
+        self.containers = array('I')
+
+    def __len__(self):
+        return len(self.hex_tags)
+
+    def append(self, hex_tags, clean_text, alpha_count, containers=()):
+        """Acrescenta um bloco ao dump atual. `containers` são índices de blocos desta tabela."""
+        self.hex_tags.append(hex_tags)
+        self.clean_lengths.append(len(clean_text))
+        self.alpha_counts.append(alpha_count)
+        self.first_chars.append(ord(clean_text[0]) if clean_text else 0)
+        self.digits_only.append(clean_text.isdigit())
+        self.containers.extend(containers)
+        self.container_starts.append(len(self.containers))
+
+    def close_file(self, name, sha256):
+        """Marca os blocos acrescentados desde o dump anterior como sendo do dump `name`."""
+        self.names.append(name)
+        self.hashes.append(sha256)
+        self.file_starts.append(len(self))
+
+    def extend(self, other):
+        """Acrescenta todos os dumps de outra tabela, ajustando os índices dos contêineres."""
+        base = len(self)
+        for column in U32_COLUMNS + ('digits_only',):
+            getattr(self, column).extend(getattr(other, column))
+        pointer_base = len(self.containers)
+        self.containers.extend(index + base for index in other.containers)
+        self.container_starts.extend(start + pointer_base for start in other.container_starts[1:])
+        self.names.extend(other.names)
+        self.hashes.extend(other.hashes)
+        self.file_starts.extend(start + base for start in other.file_starts[1:])
+
+    def file_table(self, k):
+        """Nova tabela só com o dump k."""
+        start, end = self.file_starts[k], self.file_starts[k + 1]
+        table = FeatureTable()
+        for column in U32_COLUMNS + ('digits_only',):
+            getattr(table, column).extend(getattr(self, column)[start:end])
+        first, last = self.container_starts[start], self.container_starts[end]
+        table.containers.extend(index - start for index in self.containers[first:last])
+        table.container_starts.extend(position - first for position in self.container_starts[start + 1:end + 1])
+        table.close_file(self.names[k], self.hashes[k])
+        return table
+
+
+def write_features(path, table):
+    """Grava o cache de uma vez (num arquivo temporário, trocado no fim)."""
+    parts = [HEADER_STRUCT.pack(FEATURES_MAGIC, FEATURES_VERSION, 0, len(table.names), len(table),
+                                len(table.containers))]
+    for name, sha256, start in zip(table.names, table.hashes, table.file_starts):
+        encoded_name = name.encode('utf-8')
+        parts.append(FILE_STRUCT.pack(sha256, start, len(encoded_name)) + encoded_name)
+    parts.extend(_u32_bytes(getattr(table, column)) for column in U32_COLUMNS)
+    parts.append(table.digits_only.tobytes())
+    parts.append(_u32_bytes(table.container_starts))
+    parts.append(_u32_bytes(table.containers))
+    with open(path + ".tmp", 'wb') as f_out:
+        f_out.write(b"".join(parts))
+    os.replace(path + ".tmp", path)
+
+
+def read_features(path):
+    """
+    Lê o cache. Levanta FileNotFoundError se ele não existir e ValueError se o
+    arquivo não for um cache válido desta versão.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    if len(content) < HEADER_STRUCT.size:
+        raise ValueError(f"cache de características truncado: {path}")
+    magic, version, _, file_count, block_count, container_count = HEADER_STRUCT.unpack_from(content, 0)
+    if magic != FEATURES_MAGIC or version != FEATURES_VERSION:
+        raise ValueError(f"formato de cache de características desconhecido: {path}")
+
+    table = FeatureTable()
+    position = HEADER_STRUCT.size
+    starts = []
+    try:
+        for _ in range(file_count):
+            sha256, start, name_length = FILE_STRUCT.unpack_from(content, position)
+            position += FILE_STRUCT.size
+            table.names.append(content[position:position + name_length].decode('utf-8'))
+            table.hashes.append(sha256)
+            starts.append(start)
+            position += name_length
+    except (struct.error, UnicodeDecodeError):
+        raise ValueError(f"cache de características truncado: {path}") from None
+
+    expected_size = position + block_count * (4 * len(U32_COLUMNS) + 1) + (block_count + 1 + container_count) * 4
+    if len(content) != expected_size:
+        raise ValueError(f"cache de características truncado: {path}")
+    for column in U32_COLUMNS:
+        setattr(table, column, _u32_array(content[position:position + block_count * 4]))
+        position += block_count * 4
+    table.digits_only = array('B', content[position:position + block_count])
+    position += block_count
+    table.container_starts = _u32_array(content[position:position + (block_count + 1) * 4])
+    position += (block_count + 1) * 4
+    table.containers = _u32_array(content[position:])
+    table.file_starts = array('I', starts)
+    table.file_starts.append(block_count)
+    if (table.container_starts[-1] != container_count or list(table.file_starts) != sorted(table.file_starts)
+            or (container_count and max(table.containers) >= block_count)):
+        raise ValueError(f"cache de características inválido: {path}")
+    return table
@@ -1,7 +1,22 @@
 import os
 import glob
-import re
 import struct
+import argparse
+import bisect
+import re
+import time
+from array import array
+from functools import lru_cache
+
+import batch
+import build_cache
+import dump_format
+import metrics
+import scn_codec
+import scn_index
+import scn_iso
+import scn_strings
+import string_table
 
 # --- CONFIGURAÇÃO ---
 # Pasta com os arquivos .SCN originais.
@@ -10,66 +25,113 @@ ORIGINAL_FOLDER = "input"
 TEXT_FOLDER = "filtered_files"
 # Pasta onde os novos arquivos .SCN serão salvos.
 REPACK_FOLDER = "repacked"
+# Maior offset que um ponteiro de 16 bits consegue guardar.
+POINTER_LIMIT = 0xFFFF
+# Intervalo (segundos) entre as verificações de mudança no modo --watch.
+WATCH_INTERVAL = 0.2
+# Quantos textos distintos ficam com os bytes já codificados na memória (por processo).
+ENCODE_CACHE_SIZE = 1 << 16
+# Sequência de locais vizinhos com candidato a ponteiro (peso diferente de 0).
+CANDIDATE_RUN_PATTERN = re.compile(rb'[^\x00]+')
 
 def parse_filtered_txt(txt_path):
     """
     Lê um arquivo de texto filtrado e extrai as strings e seus ponteiros originais.
-    Retorna uma lista de dicionários, cada um representando uma string.
+    Retorna uma scn_strings.StringTable (sem os tamanhos originais, que o .txt não tem),
+    ou None se o arquivo não existir ou não tiver nenhuma string sem declarar um total
+    de 0 strings (um .txt danificado ou que não é um dump).
     """
+    parser = dump_format.DumpParser(os.path.basename(txt_path))
+    strings_info = scn_strings.StringTable()
     try:
         with open(txt_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            for block in parser.parse(f):
+                if block.string_offset is None:
+                    parser.warn(block.line, "bloco sem '// String Offset'; ignorado.")
+                    continue
+
+                strings_info.append(block.string_offset, 0, block.pointer_locs, block.text)
     except FileNotFoundError:
         return None
+    if not strings_info and parser.declared_total != 0:
+        return None
 
-    strings_info = []
-    blocks = content.split("####################################")
+    # Ordena as strings pelo seu offset original para processá-las na ordem correta.
+    return strings_info.sorted_by_offset()
 
-    for block in blocks:
-        if not block.strip() or "// STRING #" not in block:
-            continue
+def parse_translated_texts(txt_path):
+    """Lê apenas os textos dos blocos, na ordem do arquivo (os comentários são ignorados)."""
+    parser = dump_format.DumpParser(os.path.basename(txt_path))
+    try:
+        with open(txt_path, 'r', encoding='utf-8') as f:
+            return [block.text for block in parser.parse(f)]
+    except FileNotFoundError:
+        return None
 
-        # Extrai o offset original da string.
-        original_offset_match = re.search(r"// String Offset:\s+(0x[0-9A-F]{8})", block, re.IGNORECASE)
-        if not original_offset_match:
-            continue
-        
-        original_offset = int(original_offset_match.group(1), 16)
-        
-        # Extrai todos os locais de ponteiros que apontavam para esta string.
-        pointer_locs = [int(loc, 16) for loc in re.findall(r"// -> Apontada por:\s+(0x[0-9A-F]{8})", block, re.IGNORECASE)]
-        
-        # Extrai o conteúdo do texto.
-        text_content_match = re.search(r'\n\n(.*?)\n\n<END>', block, re.DOTALL)
-        if not text_content_match:
-            continue
-            
-        text_content = text_content_match.group(1)
-        
-        strings_info.append({
-            'original_offset': original_offset,
-            'pointer_locs': pointer_locs,
-            'text': text_content
-        })
-        
-    # Ordena as strings pelo seu offset original para processá-las na ordem correta.
-    strings_info.sort(key=lambda x: x['original_offset'])
-    return strings_info
+def read_index_cached(index_path, index_cache=None):
+    """scn_index.read_index, reaproveitando o índice já lido enquanto o arquivo não mudar."""
+    if index_cache is None:
+        return scn_index.read_index(index_path)
+    mtime = os.stat(index_path).st_mtime_ns
+    cached = index_cache.get(index_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    index = scn_index.read_index(index_path)
+    index_cache[index_path] = (mtime, index)
+    return index
+
+def load_strings_info(txt_path, original_data, index_cache=None):
+    """
+    Monta a lista de strings a reinserir. Se houver um índice .idx ao lado do .txt,
+    offsets e ponteiros vêm dele e do .txt só se aproveita o texto; sem índice,
+    tudo é lido dos comentários do .txt.
+    Retorna (strings, tabela_de_relocação), ou (None, None) se algo não bater. A
+    tabela (pares local, alvo de todos os ponteiros do dump) é None sem índice ou
+    com um índice antigo, sem relocações.
+    `index_cache` (dicionário) guarda os índices já lidos, para o modo --watch.
+    """
+    index_path = scn_index.index_path_for(txt_path)
+    try:
+        index = read_index_cached(index_path, index_cache)
+    except FileNotFoundError:
+        strings_info = parse_filtered_txt(txt_path)
+        if strings_info is None:
+            print("ERRO: Não foi possível ler ou parsear o arquivo de texto.")
+            return None, None
+        return strings_info, None
+    except ValueError as error:
+        print(f"ERRO: {error}")
+        return None, None
 
+    if index.source_sha256 != scn_index.source_hash(original_data):
+        print(f"ERRO: O índice {os.path.basename(index_path)} foi gerado a partir de outro .SCN (hash diferente). "
+              "Refaça o dump deste arquivo antes do repack.")
+        return None, None
+
+    texts = parse_translated_texts(txt_path)
+    if texts is None:
+        print("ERRO: Não foi possível ler ou parsear o arquivo de texto.")
+        return None, None
+    if len(texts) != len(index.entries):
+        print(f"ERRO: {os.path.basename(txt_path)} tem {len(texts)} blocos de texto, "
+              f"mas o índice {os.path.basename(index_path)} tem {len(index.entries)} strings.")
+        return None, None
+
+    return strings_info_from_index(index.entries, texts), index.relocations
+
+def strings_info_from_index(entries, texts):
+    """Tabela de strings (ordenada por offset) a partir das entradas do índice e dos textos, na mesma ordem."""
+    strings_info = scn_strings.StringTable(entries.offsets, entries.lengths, entries.pointer_starts,
+                                           entries.pointer_locs, list(texts))
+    return strings_info.sorted_by_offset()
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
 def convert_text_to_bytes(text):
-    """Converte o texto do script de volta para a sua forma em bytes."""
-    # Substitui quebras de linha pelo byte 0x0E.
-    text = text.replace('\n', chr(0x0E))
-    
-    # Converte as tags <HEX=..> de volta para bytes.
-    def hex_replacer(match):
-        hex_value = int(match.group(1), 16)
-        return chr(hex_value)
-        
-    text = re.sub(r'<HEX=([0-9A-F]{2})>', hex_replacer, text, flags=re.IGNORECASE)
-    
-    # Codifica o resultado final usando 'latin-1' para preservar todos os bytes.
-    return text.encode('latin-1')
+    """
+    Converte o texto do script de volta para a sua forma em bytes (codec 'scn').
+    Um texto repetido em vários arquivos é codificado uma vez só e os bytes são compartilhados.
+    """
+    return scn_codec.encode(text)[0]
 
 def find_end_of_string_block(data, start_offset):
     """Encontra o fim de uma string e pula todos os bytes nulos de preenchimento."""
@@ -81,108 +143,641 @@ def find_end_of_string_block(data, start_offset):
         pos += 1
     return pos
 
-def repack_file(txt_path, original_scn_path, output_scn_path):
+def find_tail_merges(encoded_texts, can_host):
     """
-    Reconstrói um arquivo .SCN usando o texto de um arquivo .txt, preservando os dados órfãos.
-    NOVA LÓGICA: não adiciona terminador; apenas insere o texto e reaproveita
-    do arquivo original os bytes de terminador/padding entre as strings.
+    Compactação: para cada string que é igual a outra ou sufixo dela, escolhe a string
+    que a hospeda (a mais longa da cadeia). Retorna {índice: índice_da_hospedeira}.
+
+    Os textos são ordenados pelo texto invertido: assim, todas as strings que terminam
+    com um texto X ficam logo depois de X, e basta comparar cada uma com a seguinte,
+    de trás para frente, herdando a hospedeira da seguinte. Só hospeda quem tem o
+    próprio terminador 0x00 logo depois do texto (`can_host`).
     """
-    print(f"--- Repack: {os.path.basename(txt_path)} -> {os.path.basename(output_scn_path)} ---")
+    reversed_texts = [text[::-1] for text in encoded_texts]
+    order = sorted(range(len(encoded_texts)), key=reversed_texts.__getitem__)
+    hosts = {}
+    for k in range(len(order) - 2, -1, -1):
+        current, following = order[k], order[k + 1]
+        if not reversed_texts[following].startswith(reversed_texts[current]):
+            continue
+        host = hosts.get(following)
+        if host is None and can_host[following]:
+            host = following
+        if host is not None:
+            hosts[current] = host
+    return hosts
 
-    strings_info = parse_filtered_txt(txt_path)
-    if not strings_info:
-        print("ERRO: Não foi possível ler ou parsear o arquivo de texto.")
-        return
+def overflow_report(strings_info, old_starts, overflows, new_size):
+    """Mensagem do OverflowError: o que passou do limite dos ponteiros de 16 bits e por quanto."""
+    first_target, first_new = min(overflows, key=lambda item: item[1])
+    worst_new = max(new_target for _, new_target in overflows)
+    lines = [f"{len(overflows)} alvo(s) de ponteiro iriam passar de 0x{POINTER_LIMIT:X} "
+             f"(novo tamanho: {new_size} bytes)."]
+    i = bisect.bisect_right(old_starts, first_target) - 1
+    if i >= 0 and old_starts[i] == first_target:
+        preview = strings_info.texts[i][:40].replace("\n", "\\n")
+        lines.append(f"  Primeira: a string de 0x{first_target:08X} (\"{preview}\") iria para 0x{first_new:X}.")
+    else:
+        lines.append(f"  Primeiro: o alvo 0x{first_target:08X} (dados preservados) iria para 0x{first_new:X}.")
+    lines.append(f"  O alvo mais distante iria para 0x{worst_new:X}: o texto antes dele precisa encolher "
+                 f"{worst_new - POINTER_LIMIT} bytes.")
+    return "\n".join(lines)
+
+def rebuild_scn(original_data, strings_info, encoded_texts=None, relocations=None, compact=False):
+    """
+    Monta o novo .SCN num único buffer do tamanho exato do resultado, sem cópias
+    intermediárias do arquivo inteiro: o bloco de ponteiros, o texto traduzido de
+    cada string e os terminadores/padding/órfãos originais entre as strings.
+    Retorna (novo_conteúdo, tamanho_do_novo_bloco_de_texto, ponteiros_atualizados,
+    (strings_reaproveitadas, bytes_economizados)).
+    `encoded_texts` permite reaproveitar os textos já convertidos para bytes.
+
+    `relocations` é a tabela (local, alvo) de todos os ponteiros do dump: cada alvo é
+    levado para a nova posição por uma única tabela ordenada antigo -> novo (bisect),
+    e assim também os ponteiros das strings que o filtro descartou acompanham o texto
+    que se moveu. Sem a tabela, só os ponteiros das strings do .txt são atualizados.
+
+    Com `compact`, uma string igual a outra (ou sufixo dela) não é gravada: seus
+    ponteiros vão para o fim do texto da hospedeira, que já termina em 0x00. O trecho
+    preservado depois dela (padding, órfãos) continua no lugar; só o terminador dela sai.
+    Levanta OverflowError, com o relatório de tudo o que passou, se algum ponteiro tiver
+    de passar do limite de 16 bits.
+    """
+    if encoded_texts is None:
+        encoded_texts = [convert_text_to_bytes(text) for text in strings_info.texts]
+    file_end = len(original_data)
+    original_view = memoryview(original_data)
+    offsets = strings_info.offsets
+    string_count = len(offsets)
+    first_string_original_offset = offsets[0]
+
+    # 1. Localiza, para cada string, o trecho do original a preservar e depois a sua nova posição.
+    # As strings estão ordenadas por offset, então o terminador encontrado para uma
+    # string continua válido para as seguintes até ser ultrapassado: cada byte do
+    # bloco de texto é examinado no máximo uma vez.
+    # Colunas em vez de uma tupla por string: o arquivo inteiro cabe em 64 KB, e objetos
+    # por string custariam mais memória que o próprio buffer de saída.
+    texts = []                  # bytes do texto de cada string
+    tail_starts = array('I')    # trecho do original preservado depois dela: início...
+    tail_ends = array('I')      # ...e fim
+    old_starts = offsets
+    terminator = -1
+    for i in range(string_count):
+        original_offset = offsets[i]
+        # Próxima string no original (ou EOF se for a última)
+        if i + 1 < string_count:
+            next_start = offsets[i+1]
+        else:
+            next_start = file_end
+
+        # Texto traduzido (sem adicionar terminador)
+        text_bytes = encoded_texts[i]
+
+        # Primeiro 0x00 em/após o texto original (início do terminador original).
+        if terminator < original_offset and terminator != file_end:
+            terminator = original_data.find(b'\x00', original_offset)
+            if terminator == -1:
+                terminator = file_end
+
+        # A próxima string começa no meio desta (sem 0x00 entre elas). Se o texto desta
+        # ainda termina com o da próxima (as duas sem mudança, por exemplo), grava só o
+        # começo, que a próxima continua como no original. Senão, esta ganha o seu próprio
+        # terminador: a próxima não é mais o fim dela.
+        if terminator >= next_start and i + 1 < string_count:
+            inner_bytes = encoded_texts[i+1]
+            if text_bytes.endswith(inner_bytes):
+                text_bytes = text_bytes[:len(text_bytes) - len(inner_bytes)]
+            else:
+                text_bytes += b'\x00'
+
+        # Preserva do primeiro 0x00 até o início da próxima string (terminador+padding+qualquer dado no meio).
+        # Caso raro: sem 0x00 antes da próxima string. Não insere nada (respeita "não adicionar terminador").
+        texts.append(text_bytes)
+        tail_starts.append(terminator if terminator < next_start else next_start)
+        tail_ends.append(next_start)
+
+    # Compactação: as strings hospedadas somem do texto (e o terminador delas também,
+    # se o byte antes delas já for 0x00 e nada depender do terminador).
+    merges = {}
+    if compact:
+        can_host = [tail_starts[i] < tail_ends[i] and original_data[tail_starts[i]] == 0 for i in range(string_count)]
+        merges = {i: host for i, host in find_tail_merges(encoded_texts, can_host).items()
+                  if original_data[old_starts[i] - 1] == 0}
+    bytes_saved = 0
+    for i in merges:
+        bytes_saved += len(texts[i])
+        texts[i] = b''
+        if tail_starts[i] < tail_ends[i] and original_data[tail_starts[i]] == 0:
+            tail_starts[i] += 1
+            bytes_saved += 1
+
+    new_starts = array('I')
+    new_size = first_string_original_offset
+    for text_bytes, tail_start, tail_end in zip(texts, tail_starts, tail_ends):
+        new_starts.append(new_size)
+        new_size += len(text_bytes) + tail_end - tail_start
+    merged_starts = {i: new_starts[host] + len(encoded_texts[host]) - len(encoded_texts[i])
+                     for i, host in merges.items()}
+
+    # 2. Preenche o buffer final.
+    new_data = bytearray(new_size)
+    new_data[:first_string_original_offset] = original_view[:first_string_original_offset]
+    position = first_string_original_offset
+    for text_bytes, tail_start, tail_end in zip(texts, tail_starts, tail_ends):
+        new_data[position:position + len(text_bytes)] = text_bytes
+        position += len(text_bytes)
+        new_data[position:position + tail_end - tail_start] = original_view[tail_start:tail_end]
+        position += tail_end - tail_start
+
+    # 3. Atualiza os ponteiros (little-endian, 2 bytes) pela tabela antigo -> novo.
+    # A varredura lê um candidato em cada byte, então locais vizinhos se sobrepõem e não
+    # podem ser os dois ponteiros de verdade: cada sequência de candidatos sobrepostos
+    # fica só com os mais prováveis (choose_pointer_locs). O peso e o valor novo de cada
+    # local ficam em vetores do tamanho da área de ponteiros, sem um objeto por local.
+    if relocations is None:
+        relocations = strings_info.relocations()
+    weights = bytearray(first_string_original_offset)
+    new_values = array('H', bytes(2 * first_string_original_offset))
+    overflows = []
+    last_target = None
+    for loc, target in relocations:
+        if loc + 2 > first_string_original_offset:
+            continue
+        if target != last_target:
+            last_target = target
+            new_target, weight = relocate_target(original_data, target, old_starts, new_starts, texts,
+                                                 tail_starts, merged_starts)
+            if new_target is not None and new_target > POINTER_LIMIT:
+                overflows.append((target, new_target))
+                new_target = None
+        if new_target is None or not weight:
+            continue
+        new_values[loc] = new_target
+        weights[loc] = weight
+    if overflows:
+        raise OverflowError(overflow_report(strings_info, old_starts, overflows, new_size))
+
+    chosen_locs = choose_pointer_locs(weights)
+    for loc in chosen_locs:
+        struct.pack_into('<H', new_data, loc, new_values[loc])
 
+    return new_data, new_size - first_string_original_offset, len(chosen_locs), (len(merges), bytes_saved)
+
+def choose_pointer_locs(weights):
+    """
+    Escolhe os locais que serão gravados. `weights` tem um byte por local da área de
+    ponteiros (0 = sem candidato). Locais vizinhos se sobrepõem (loc e loc + 1 dividem
+    um byte), então cada sequência de locais consecutivos fica com o conjunto sem
+    sobreposição de maior peso total (programação dinâmica); no empate, ficam os
+    locais pares (alinhados).
+    """
+    chosen = []
+    for run in CANDIDATE_RUN_PATTERN.finditer(weights):
+        run_start, run_end = run.span()
+        if run_end - run_start == 1:
+            chosen.append(run_start)
+            continue
+        # best[j]: (pontuação, locais escolhidos) para os j - 1 primeiros locais.
+        best = [(0, ()), (0, ())]
+        for j, loc in enumerate(range(run_start, run_end)):
+            score = weights[loc] * 2 + (loc % 2 == 0)
+            skip = best[j + 1]
+            take = (best[j][0] + score, best[j][1] + (loc,))
+            best.append(take if take[0] > skip[0] else skip)
+        chosen.extend(best[-1][1])
+    return chosen
+
+
+def relocate_target(original_data, target, old_starts, new_starts, texts, tail_starts, merged_starts=None):
+    """
+    Nova posição do offset `target` do original depois do rebuild_scn e o peso do
+    candidato a ponteiro que aponta para ele (choose_pointer_locs): (novo_offset, peso),
+    com novo_offset None se ele não puder ser relocado.
+
+    Antes da primeira string do .txt nada se move; o início de uma string do .txt vai
+    para o início do seu texto novo (ou para dentro da hospedeira, se ela foi
+    compactada, em `merged_starts`); o início de uma string não vazia no trecho
+    preservado (strings descartadas, órfãos) anda junto com ele. Um alvo no meio do
+    texto original de uma string traduzida não tem correspondente (e quase sempre é um
+    falso ponteiro no bytecode): fica como está.
+
+    O peso diz quão provável é o candidato ser um ponteiro de verdade. O que mais conta
+    é o alvo começar uma string (0x00 antes, texto depois): os ponteiros de verdade
+    apontam para o começo de uma string e um falso ponteiro cai quase sempre no meio de
+    uma. O alvo ser uma string do .txt só desempata. 0: nenhum dos dois.
+    """
+    weight = 4 if original_data[target - 1] == 0 and original_data[target] != 0 else 0
+    i = bisect.bisect_right(old_starts, target) - 1
+    if i < 0:
+        return target, weight
+    if target == old_starts[i]:
+        if merged_starts and i in merged_starts:
+            return merged_starts[i], weight + 2
+        return new_starts[i], weight + 2
+    tail_start = tail_starts[i]
+    if target >= tail_start and weight:
+        return target - tail_start + new_starts[i] + len(texts[i]), weight
+    return None, 0
+
+def patch_scn_in_place(original_data, strings_info, encoded_texts):
+    """
+    Caminho rápido: grava cada tradução no próprio lugar da string original, sem mover
+    nada e sem mexer nos ponteiros. Uma tradução cabe se, junto com pelo menos um 0x00,
+    ocupar no máximo a string original mais os 0x00 de terminador/padding que a seguem
+    (sem passar do início da próxima string).
+    Retorna (novo_conteúdo, strings_alteradas, bytes_alterados), ou (None, offset, espaço)
+    da primeira string que não couber.
+    """
+    file_end = len(original_data)
+    slots = []  # (offset, bytes_do_texto, fim_da_string_original)
+    terminator = -1
+    offsets = strings_info.offsets.tolist()
+    for i, original_offset in enumerate(offsets):
+        next_start = offsets[i+1] if i + 1 < len(offsets) else file_end
+        text_bytes = encoded_texts[i]
+
+        if terminator < original_offset and terminator != file_end:
+            terminator = original_data.find(b'\x00', original_offset)
+            if terminator == -1:
+                terminator = file_end
+
+        # O espaço disponível vai até o fim dos 0x00 que seguem a string (sem passar da próxima).
+        slot_end = terminator
+        while slot_end < next_start and original_data[slot_end] == 0:
+            slot_end += 1
+
+        # Texto igual ao original (até o terminador): nada a gravar, mesmo que outra
+        # string comece no meio desta (ponteiro para o meio de uma string).
+        if text_bytes == original_data[original_offset:terminator]:
+            continue
+        # Sem terminador próprio (strings sobrepostas) a string só pode ficar como está.
+        if terminator >= next_start or original_offset + len(text_bytes) >= slot_end:
+            return None, original_offset, max(slot_end - original_offset - 1, 0)
+        slots.append((original_offset, text_bytes, terminator))
+
+    new_data = bytearray(original_data)
+    changed_strings = 0
+    changed_bytes = 0
+    for original_offset, text_bytes, string_end in slots:
+        text_end = original_offset + len(text_bytes)
+        new_data[original_offset:text_end] = text_bytes
+        # O que sobrar da string original vira 0x00, como o terminador original.
+        if text_end < string_end:
+            new_data[text_end:string_end] = bytes(string_end - text_end)
+        changed_strings += 1
+        changed_bytes += max(text_end, string_end) - original_offset
+
+    return new_data, changed_strings, changed_bytes
+
+def load_original_scn(original_scn_path, image_path=None):
+    """Lê o .SCN original da pasta de entrada ou, com `image_path`, de dentro da imagem do disco."""
+    if image_path:
+        file_name = os.path.basename(original_scn_path)
+        try:
+            return scn_iso.open_image_cached(image_path).read_file(file_name)
+        except KeyError:
+            print(f"ERRO: Arquivo .SCN original não encontrado na imagem '{image_path}': {file_name}")
+        except (OSError, ValueError) as e:
+            print(f"ERRO: Não foi possível ler a imagem '{image_path}': {e}")
+        return None
     try:
         with open(original_scn_path, 'rb') as f:
-            original_data = f.read()
+            return f.read()
     except FileNotFoundError:
         print(f"ERRO: Arquivo .SCN original não encontrado: {original_scn_path}")
-        return
+        return None
 
-    file_end = len(original_data)
+def inject_into_image(source_image, output_image, scn_paths):
+    """
+    Grava os .SCN reconstruídos dentro da imagem de saída (criada como cópia da original
+    na primeira vez). Só os arquivos cujo conteúdo mudou em relação à imagem são gravados.
+    """
+    try:
+        scn_iso.prepare_output_image(source_image, output_image)
+        with scn_iso.DiscImage(output_image, writable=True) as image:
+            written = relocated = 0
+            for scn_path in sorted(scn_paths):
+                file_name = os.path.basename(scn_path).upper()
+                try:
+                    image.resolve(file_name)
+                except KeyError:
+                    print(f"AVISO: {file_name} não existe na imagem; ignorado.")
+                    continue
+                except ValueError as e:
+                    print(f"AVISO: {e}; ignorado.")
+                    continue
+                with open(scn_path, 'rb') as f:
+                    new_data = f.read()
+                if image.read_file(file_name) == new_data:
+                    continue
+                moved = image.write_file(file_name, new_data)
+                written += 1
+                relocated += moved
+                metrics.info(f"  GRAVADO NA IMAGEM: {file_name}" + (" (realocado para o fim da imagem)" if moved else ""))
+    except (OSError, ValueError) as e:
+        print(f"ERRO: Não foi possível gravar na imagem '{output_image}': {e}")
+        return False
+    print(f"=== Imagem: {written} arquivo(s) gravado(s), {relocated} realocado(s) em '{output_image}' ===")
+    return True
 
-    # 1. Separa o bloco de código/ponteiros original.
-    first_string_original_offset = strings_info[0]['original_offset']
-    pointer_block = bytearray(original_data[:first_string_original_offset])
-    
-    # 2. Reconstrói o bloco de texto, inserindo o texto traduzido e preservando
-    # exatamente os bytes de terminador/padding/orfãos que já existiam no original.
-    new_text_block = bytearray()
-    new_pointer_map = {}  # Mapeia {offset_original -> offset_novo}
-    current_new_offset = first_string_original_offset
+def repack_file(txt_path, original_scn_path, output_scn_path, relocate=False, image_path=None, sheet_folder=None,
+                compact=False):
+    """
+    Reconstrói um arquivo .SCN usando o texto de um arquivo .txt, preservando os dados órfãos.
+    NOVA LÓGICA: não adiciona terminador; apenas insere o texto e reaproveita
+    do arquivo original os bytes de terminador/padding entre as strings.
+    Se todas as traduções couberem no espaço original, as strings são gravadas no
+    lugar (patch); senão, ou com `relocate`, o bloco de texto é reconstruído.
+    Com `image_path`, o .SCN original é lido de dentro da imagem do disco; com
+    `sheet_folder`, os textos vêm da planilha sem repetições (string_table); com
+    `compact`, a reconstrução reaproveita strings iguais e sufixos (rebuild_scn).
+    """
+    metrics.info(f"--- Repack: {os.path.basename(txt_path)} -> {os.path.basename(output_scn_path)} ---")
 
-    for i, string_info in enumerate(strings_info):
-        original_offset = string_info['original_offset']
-        new_pointer_map[original_offset] = current_new_offset
+    with metrics.phase("read"):
+        original_data = load_original_scn(original_scn_path, image_path)
+    if original_data is None:
+        return False
+    return repack_data(txt_path, original_data, output_scn_path, relocate, sheet_folder=sheet_folder, compact=compact)
 
-        # Próxima string no original (ou EOF se for a última)
-        if i + 1 < len(strings_info):
-            next_start = strings_info[i+1]['original_offset']
+def repack_data(txt_path, original_data, output_scn_path, relocate=False, index_cache=None, sheet_folder=None,
+                compact=False):
+    """O repack de um arquivo a partir do .SCN original já em memória (usado também pelo --watch)."""
+    with metrics.phase("read"):
+        strings_info, relocations = load_strings_info(txt_path, original_data, index_cache)
+    if strings_info is None:
+        return False
+    if not strings_info:
+        # O refine não manteve nenhuma string deste arquivo: não há o que traduzir.
+        with metrics.phase("write"), open(output_scn_path, 'wb') as f_out:
+            f_out.write(original_data)
+        metrics.info(f"--> Nenhuma string no .txt; o .SCN original foi copiado para: {output_scn_path}\n")
+        return True
+    if sheet_folder:
+        try:
+            with metrics.phase("read"):
+                sheet = string_table.load_sheet_cached(sheet_folder)
+        except (OSError, ValueError) as e:
+            print(f"ERRO: Não foi possível ler a planilha em '{sheet_folder}': {e}")
+            return False
+        name = os.path.splitext(os.path.basename(txt_path))[0]
+        from_sheet = string_table.apply_sheet(name, strings_info, sheet)
+        metrics.count("strings_from_sheet", from_sheet)
+        metrics.info(f"--> {from_sheet} de {len(strings_info)} strings vieram da planilha.")
+    if strings_info.offsets[-1] > len(original_data):
+        print(f"ERRO: A string em 0x{strings_info.offsets[-1]:08X} está além do fim do .SCN original "
+              f"({len(original_data)} bytes).")
+        return False
+
+    with metrics.phase("encode"):
+        encoded_texts = [convert_text_to_bytes(text) for text in strings_info.texts]
+    metrics.count("strings", len(strings_info))
+
+    new_data = None
+    if not relocate:
+        with metrics.phase("patch"):
+            new_data, changed, space = patch_scn_in_place(original_data, strings_info, encoded_texts)
+        if new_data is not None:
+            metrics.count("files_patched")
+            metrics.count("strings_patched", changed)
+            metrics.info(f"--> Patch no lugar: {changed} strings alteradas ({space} bytes), nenhum ponteiro movido.")
         else:
-            next_start = file_end
+            metrics.info(f"--> A string em 0x{changed:08X} não cabe no espaço original ({space} bytes); "
+                         "usando a realocação completa.")
+
+    if new_data is None:
+        try:
+            with metrics.phase("relocate"):
+                new_data, text_block_size, pointers_updated, (merged, saved) = rebuild_scn(
+                    original_data, strings_info, encoded_texts, relocations, compact)
+        except OverflowError as error:
+            print(f"ERRO: Texto grande demais em {os.path.basename(txt_path)}: {error}")
+            if not compact:
+                print("  Tente também --compact (reaproveita strings iguais e sufixos).")
+            return False
+        metrics.count("files_relocated")
+        metrics.count("pointers_updated", pointers_updated)
+        metrics.info(f"--> Bloco de texto reconstruído. Novo tamanho: {text_block_size} bytes.")
+        metrics.info(f"--> {pointers_updated} ponteiros foram recalculados e atualizados.")
+        if compact:
+            metrics.count("strings_merged", merged)
+            metrics.count("bytes_saved", saved)
+            metrics.info(f"--> Compactação: {merged} strings reaproveitadas (iguais ou sufixos), {saved} bytes economizados.")
+
+    # 3. Grava o buffer final de uma vez.
+    with metrics.phase("write"), open(output_scn_path, 'wb') as f_out:
+        f_out.write(new_data)
+        
+    metrics.info(f"--> Arquivo repacked salvo com sucesso em: {output_scn_path}\n")
+    return True
+
+def scn_paths_for(txt_path):
+    """Caminhos do .SCN original e do .SCN reconstruído que correspondem a um .txt."""
+    base_name = os.path.splitext(os.path.basename(txt_path))[0]
+    return os.path.join(ORIGINAL_FOLDER, f"{base_name}.SCN"), os.path.join(REPACK_FOLDER, f"{base_name}.SCN")
+
+class RepackWatcher:
+    """
+    Modo --watch: mantém na memória os .SCN originais e os índices .idx já lidos e,
+    a cada intervalo, compara as datas de modificação dos .txt (e dos .idx) da pasta
+    de textos. Só o arquivo que mudou é lido de novo e reconstruído; erros de parse e
+    de repack aparecem na hora, sem interromper a observação. Com a planilha
+    (--sheet), uma mudança nela refaz todos os arquivos.
+    """
+
+    def __init__(self, relocate=False, image_path=None, output_image=None, sheet_folder=None, compact=False):
+        self.relocate = relocate
+        self.compact = compact
+        self.image_path = image_path
+        self.output_image = output_image
+        self.sheet_folder = sheet_folder
+        self.originals = {}     # caminho do original -> (mtime ou None se veio da imagem, conteúdo)
+        self.index_cache = {}
+        self.stamps = self.scan()
+        self.sheet_stamp = self.scan_sheet()
 
-        # Converte texto traduzido (sem adicionar terminador)
-        text_bytes = convert_text_to_bytes(string_info['text'])
-        new_text_block.extend(text_bytes)
-        current_new_offset += len(text_bytes)
+    def scan(self):
+        """{caminho do .txt: (mtime do .txt, mtime do .idx ou None)} da pasta de textos."""
+        stamps = {}
+        with os.scandir(TEXT_FOLDER) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".txt"):
+                    continue
+                try:
+                    txt_mtime = entry.stat().st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                try:
+                    index_mtime = os.stat(scn_index.index_path_for(entry.path)).st_mtime_ns
+                except FileNotFoundError:
+                    index_mtime = None
+                stamps[entry.path] = (txt_mtime, index_mtime)
+        return stamps
 
-        # Localiza o primeiro 0x00 após o texto original (início do terminador original)
-        first_zero = original_data.find(b'\x00', original_offset)
+    def scan_sheet(self):
+        """mtimes da planilha e do mapeamento (None sem --sheet ou se faltarem)."""
+        if not self.sheet_folder:
+            return None
+        try:
+            return tuple(os.stat(path).st_mtime_ns for path in string_table.sheet_paths(self.sheet_folder))
+        except FileNotFoundError:
+            return None
 
-        # Copia do primeiro 0x00 até o início da próxima string (preserva terminador+padding+qualquer dado no meio)
-        if first_zero != -1 and first_zero < next_start:
-            tail = original_data[first_zero:next_start]
-            new_text_block.extend(tail)
-            current_new_offset += len(tail)
+    def preload(self):
+        """Carrega de uma vez os originais de todos os .txt da pasta."""
+        paths = [scn_paths_for(txt_path)[0] for txt_path in self.stamps]
+        if self.image_path:
+            image = scn_iso.open_image_cached(self.image_path)
+            for path in paths:
+                try:
+                    self.originals[path] = (None, image.read_file(os.path.basename(path)))
+                except (KeyError, ValueError):
+                    continue
         else:
-            # Caso raro: sem 0x00 antes da próxima string. Não insere nada (respeita “não adicionar terminador”).
-            pass
-
-    print(f"--> Bloco de texto reconstruído. Novo tamanho: {len(new_text_block)} bytes.")
-
-    # 3. Atualiza todos os ponteiros no bloco de ponteiros (little-endian 2 bytes).
-    pointers_updated = 0
-    for string_info in strings_info:
-        original_offset = string_info['original_offset']
-        new_offset = new_pointer_map.get(original_offset)
-        if new_offset is not None:
-            new_pointer_bytes = struct.pack('<H', new_offset)
-            for loc in string_info['pointer_locs']:
-                if loc + 2 <= len(pointer_block):
-                    pointer_block[loc:loc+2] = new_pointer_bytes
-                    pointers_updated += 1
-    
-    print(f"--> {pointers_updated} ponteiros foram recalculados e atualizados.")
+            for path in paths:
+                if os.path.exists(path):
+                    self.originals[path] = (os.stat(path).st_mtime_ns, load_original_scn(path))
+        print(f"--> {len(self.originals)} arquivo(s) original(is) carregado(s) na memória.")
 
-    # 4. Junta os blocos e salva o novo arquivo.
-    final_data = bytes(pointer_block) + bytes(new_text_block)
-    with open(output_scn_path, 'wb') as f_out:
-        f_out.write(final_data)
-        
-    print(f"--> Arquivo repacked salvo com sucesso em: {output_scn_path}\n")
+    def original(self, path):
+        """O .SCN original, da memória enquanto o arquivo em disco não mudar (a imagem não muda)."""
+        cached = self.originals.get(path)
+        if self.image_path:
+            if cached is None:
+                data = load_original_scn(path, self.image_path)
+                if data is not None:
+                    self.originals[path] = (None, data)
+                return data
+            return cached[1]
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            print(f"ERRO: Arquivo .SCN original não encontrado: {path}")
+            return None
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        data = load_original_scn(path)
+        if data is not None:
+            self.originals[path] = (mtime, data)
+        return data
+
+    def repack(self, txt_path):
+        name = os.path.basename(txt_path)
+        original_path, output_path = scn_paths_for(txt_path)
+        start = time.perf_counter()
+        data = self.original(original_path)
+        ok = False
+        if data is not None:
+            result = batch.run_task(repack_data, name,
+                                    (txt_path, data, output_path, self.relocate, self.index_cache, self.sheet_folder,
+                                     self.compact),
+                                    capture=False)
+            if result.error:
+                print(f"ERRO: exceção ao processar {name}:\n{result.error}")
+            ok = result.ok
+        if ok and self.output_image:
+            ok = inject_into_image(self.image_path, self.output_image, [output_path])
+        elapsed = time.perf_counter() - start
+        print(f"[{time.strftime('%H:%M:%S')}] {'OK' if ok else 'FALHA'}: {name} em {elapsed * 1000:.1f} ms")
+
+    def run(self, interval=WATCH_INTERVAL):
+        print(f"=== Modo watch: observando '{TEXT_FOLDER}' a cada {interval} s (Ctrl+C para sair) ===")
+        try:
+            while True:
+                time.sleep(interval)
+                stamps = self.scan()
+                sheet_stamp = self.scan_sheet()
+                sheet_changed = sheet_stamp != self.sheet_stamp
+                for txt_path in sorted(stamps):
+                    if sheet_changed or stamps[txt_path] != self.stamps.get(txt_path):
+                        self.repack(txt_path)
+                self.stamps = stamps
+                self.sheet_stamp = sheet_stamp
+        except KeyboardInterrupt:
+            print("\n=== Modo watch encerrado. ===")
 
 def main():
+    parser = argparse.ArgumentParser(description="Reconstrói os .SCN a partir dos .txt traduzidos.")
+    batch.add_jobs_argument(parser)
+    build_cache.add_force_argument(parser)
+    parser.add_argument("--relocate", action="store_true",
+                        help="sempre reconstrói o bloco de texto, mesmo quando as traduções cabem no lugar")
+    parser.add_argument("--compact", action="store_true",
+                        help="ao reconstruir, grava uma vez só as strings iguais e põe as que são sufixo de "
+                             "outra no fim dela, para caber nos 64 KB dos ponteiros")
+    parser.add_argument("--image", metavar="IMAGEM",
+                        help="lê os .SCN originais de uma imagem ISO/BIN do disco e grava os novos numa cópia dela")
+    parser.add_argument("--output-image", metavar="IMAGEM",
+                        help=f"imagem onde os .SCN novos são gravados (padrão: '{REPACK_FOLDER}/<nome da imagem>')")
+    parser.add_argument("--sheet", nargs="?", const=string_table.SHEET_FOLDER, metavar="PASTA",
+                        help="usa a planilha de tradução sem repetições gerada pelo refine "
+                             f"(padrão: '{string_table.SHEET_FOLDER}') no lugar do texto de cada .txt")
+    parser.add_argument("--watch", action="store_true",
+                        help="depois do repack, continua rodando e refaz cada .txt assim que ele for salvo")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL,
+                        help=f"segundos entre as verificações do --watch (padrão: {WATCH_INTERVAL})")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure(args)
+
     for folder in [ORIGINAL_FOLDER, TEXT_FOLDER, REPACK_FOLDER]:
         if not os.path.exists(folder):
             os.makedirs(folder)
             print(f"Pasta '{folder}' criada.")
 
     search_path = os.path.join(TEXT_FOLDER, "*.txt")
-    text_files = glob.glob(search_path)
+    text_files = sorted(glob.glob(search_path))
     
-    if not text_files:
+    if not text_files and not args.watch:
         print(f"Nenhum arquivo .txt encontrado na pasta '{TEXT_FOLDER}'.")
         return
-        
+
+    output_image = None
+    if args.image:
+        output_image = args.output_image or os.path.join(REPACK_FOLDER, os.path.basename(args.image))
+        if os.path.abspath(output_image) == os.path.abspath(args.image):
+            print("ERRO: A imagem de saída não pode ser a original (os .SCN originais seriam perdidos).")
+            return
+
+    if args.sheet:
+        try:
+            translations, mapping = string_table.load_sheet(args.sheet)
+        except (OSError, ValueError) as e:
+            print(f"ERRO: Não foi possível ler a planilha em '{args.sheet}': {e}")
+            return
+        print(f"Planilha: {len(translations)} strings únicas para {len(mapping)} arquivo(s).")
+
+    settings = {'relocate': args.relocate, 'sheet': bool(args.sheet), 'compact': args.compact}
+    if args.image:
+        settings.update(scn_iso.image_fingerprint(args.image))
+    config = build_cache.config_fingerprint(settings, [__file__, dump_format.__file__, scn_codec.__file__, scn_index.__file__,
+                                                      scn_iso.__file__, scn_strings.__file__, string_table.__file__])
+    manifest = build_cache.BuildManifest(REPACK_FOLDER, "repack", config, force=args.force)
+
+    tasks = []
     for txt_path in text_files:
-        base_name = os.path.splitext(os.path.basename(txt_path))[0]
-        
-        original_scn_path = os.path.join(ORIGINAL_FOLDER, f"{base_name}.SCN")
-        output_scn_path = os.path.join(REPACK_FOLDER, f"{base_name}.SCN")
-        
-        repack_file(txt_path, original_scn_path, output_scn_path)
+        original_scn_path, output_scn_path = scn_paths_for(txt_path)
+        input_paths = [txt_path, scn_index.index_path_for(txt_path)]
+        if not args.image:
+            input_paths.append(original_scn_path)
+        if args.sheet:
+            input_paths.extend(string_table.sheet_paths(args.sheet))
+        tasks.append((os.path.basename(txt_path),
+                      (txt_path, original_scn_path, output_scn_path, args.relocate, args.image, args.sheet, args.compact),
+                      input_paths, [output_scn_path]))
+
+    with metrics.session(args, "repack"):
+        build_cache.run_incremental(manifest, repack_file, tasks, args.jobs)
+
+        if output_image and tasks:
+            built = [outputs[0] for name, _, _, outputs in tasks if name not in manifest.failed and os.path.exists(outputs[0])]
+            with metrics.phase("image"):
+                inject_into_image(args.image, output_image, built)
+
+    if args.watch:
+        watcher = RepackWatcher(args.relocate, args.image, output_image, args.sheet, args.compact)
+        watcher.preload()
+        watcher.run(args.interval)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,87 @@
+"""
+Codec de texto dos arquivos .SCN, registrado no módulo `codecs` com o nome 'scn'.
+
+Decodificação (bytes -> texto do dump):
+  - 0x20-0x7E (ASCII imprimível) e 0xA1-0xDF (katakana half-width) viram o caractere latin-1 correspondente;
+  - 0x0E vira quebra de linha;
+  - qualquer outro byte vira a tag <HEX=XX>.
+
+Codificação (texto traduzido -> bytes):
+  - quebra de linha vira 0x0E;
+  - tags <HEX=XX> (maiúsculas ou minúsculas) voltam a ser o byte XX;
+  - o resto é codificado como latin-1, preservando todos os valores de byte (inclusive acentos da fonte editada).
+
+Uso: `data.decode('scn')` / `text.encode('scn')` depois de `import scn_codec`.
+"""
+import codecs
+import re
+
+CODEC_NAME = "scn"
+LINE_BREAK_BYTE = 0x0E
+LINE_BREAK_CHAR = chr(LINE_BREAK_BYTE)
+
+# Tabela de 256 entradas byte -> texto, montada uma única vez.
+DECODING_TABLE = {}
+for _byte in range(256):
+    if _byte == LINE_BREAK_BYTE:
+        DECODING_TABLE[_byte] = '\n'
+    elif 0x20 <= _byte <= 0x7E or 0xA1 <= _byte <= 0xDF:
+        DECODING_TABLE[_byte] = chr(_byte)
+    else:
+        DECODING_TABLE[_byte] = f"<HEX={_byte:02X}>"
+del _byte
+
+# Classes de bytes usadas pelos filtros: texto de verdade vs. códigos de controle (tags <HEX>).
+TEXT_BYTES = bytes(b for b in range(256) if DECODING_TABLE[b] == chr(b))
+NON_TEXT_BYTES = bytes(b for b in range(256) if DECODING_TABLE[b] != chr(b))
+CONTROL_CODE_BYTES = bytes(b for b in range(256) if b not in TEXT_BYTES and b != LINE_BREAK_BYTE)
+
+HEX_TAG_PATTERN = re.compile(r'<HEX=([0-9A-F]{2})>', re.IGNORECASE)
+
+# Tabela de 256 entradas "XX" -> caractere, nas quatro combinações de caixa aceitas pela tag.
+ENCODING_TABLE = {}
+for _byte in range(256):
+    _upper, _lower = f"{_byte:02X}", f"{_byte:02x}"
+    for _digits in (_upper, _lower, _upper[0] + _lower[1], _lower[0] + _upper[1]):
+        ENCODING_TABLE[_digits] = chr(_byte)
+del _byte, _upper, _lower, _digits
+
+
+def decode(data, errors='strict'):
+    """Decodifica um trecho inteiro de bytes de uma vez via charmap."""
+    return codecs.charmap_decode(data, errors, DECODING_TABLE)
+
+
+def encode(text, errors='strict'):
+    """Codifica o texto, convertendo quebras de linha e tags <HEX=XX> em bytes."""
+    converted = text.replace('\n', LINE_BREAK_CHAR)
+    if '<' in converted:
+        converted = HEX_TAG_PATTERN.sub(lambda match: ENCODING_TABLE[match.group(1)], converted)
+    return converted.encode('latin-1', errors), len(text)
+
+
+def count_control_codes(raw):
+    """Quantas tags <HEX=XX> a decodificação de `raw` produz."""
+    return len(raw) - len(raw.translate(None, CONTROL_CODE_BYTES))
+
+
+def strip_control_codes(raw):
+    """Texto de `raw` sem as tags <HEX=XX> e sem as quebras de linha."""
+    return raw.translate(None, NON_TEXT_BYTES).decode('latin-1')
+
+
+def decode_string_at(data, start_offset):
+    """Decodifica a string que começa em `start_offset` até o primeiro 0x00 (ou o fim dos dados)."""
+    end = data.find(b'\x00', start_offset)
+    if end == -1:
+        end = len(data)
+    return decode(memoryview(data)[start_offset:end])[0] if start_offset < end else ""
+
+
+def _search_function(name):
+    if name == CODEC_NAME:
+        return codecs.CodecInfo(encode, decode, name=CODEC_NAME)
+    return None
+
+
+codecs.register(_search_function)
@@ -0,0 +1,137 @@
+"""
+Índice binário (.idx) que acompanha cada dump .txt.
+
+O dump.py grava, ao lado de output/<nome>.txt, um output/<nome>.idx com o offset,
+o tamanho original em bytes e os locais dos ponteiros de cada string do dump, na
+mesma ordem dos blocos, além do SHA-256 do .SCN de origem e da tabela de
+relocação completa: todos os pares (local do ponteiro, alvo) encontrados pela
+varredura, inclusive os das strings que o filtro descartou. O refine.py grava um
+.idx só com as strings que mantém (a tabela de relocação passa inteira), e o
+repack.py usa esse índice no lugar dos comentários do .txt, que um editor de
+texto pode estragar.
+
+Formato (little-endian), versão 2:
+    cabeçalho  : 'SCNI', versão (u16), reservado (u16), quantidade de strings (u32),
+                 quantidade de relocações (u32), SHA-256 (32 bytes)
+    strings    : offset (u32), tamanho (u32), início em 'ponteiros' (u32), quantidade de ponteiros (u32)
+    relocações : local do ponteiro (u32), alvo (u32), ordenadas por alvo e local
+    ponteiros  : local de cada ponteiro (u32)
+A versão 1 (sem a contagem e a seção de relocações) continua sendo lida.
+As strings são lidas e gravadas como uma scn_strings.StringTable, coluna a coluna.
+"""
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+import scn_strings
+
+INDEX_EXTENSION = ".idx"
+INDEX_MAGIC = b"SCNI"
+INDEX_VERSION = 2
+
+PREFIX_STRUCT = struct.Struct('<4sH')
+HEADER_STRUCT_V1 = struct.Struct('<4sHHI32s')
+HEADER_STRUCT = struct.Struct('<4sHHII32s')
+ENTRY_STRUCT = struct.Struct('<IIII')
+RELOCATION_STRUCT = struct.Struct('<II')
+POINTER_STRUCT = struct.Struct('<I')
+
+# entries: StringTable (sem textos); relocations: lista de (local, alvo), ou None num índice da versão 1.
+ScnIndex = namedtuple('ScnIndex', ['source_sha256', 'entries', 'relocations'])
+
+
+def source_hash(data):
+    """SHA-256 (bytes) do conteúdo do .SCN original."""
+    return hashlib.sha256(data).digest()
+
+
+def _u32_bytes(values):
+    """Bytes little-endian de um array('I')."""
+    if sys.byteorder == 'big':
+        values = array('I', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _u32_array(buffer):
+    """array('I') com os u32 little-endian de `buffer`."""
+    values = array('I')
+    values.frombytes(buffer)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def write_index(path, source_sha256, entries, relocations=()):
+    """
+    Grava o índice de uma vez. `entries` é uma StringTable e `relocations`, uma
+    sequência de pares (local, alvo).
+    """
+    relocations = relocations or ()
+    starts = entries.pointer_starts
+    rows = array('I')
+    for i in range(len(entries)):
+        rows.extend((entries.offsets[i], entries.lengths[i], starts[i], starts[i + 1] - starts[i]))
+    parts = [HEADER_STRUCT.pack(INDEX_MAGIC, INDEX_VERSION, 0, len(entries), len(relocations), source_sha256),
+             _u32_bytes(rows)]
+    parts.extend(RELOCATION_STRUCT.pack(loc, target) for loc, target in relocations)
+    parts.append(_u32_bytes(entries.pointer_locs))
+    with open(path, 'wb') as f_out:
+        f_out.write(b"".join(parts))
+
+
+def read_index(path):
+    """
+    Lê o índice via mmap. Levanta FileNotFoundError se ele não existir e
+    ValueError se o arquivo não for um índice válido.
+    """
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) < HEADER_STRUCT_V1.size:
+            raise ValueError(f"índice truncado: {path}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            magic, version = PREFIX_STRUCT.unpack_from(view, 0)
+            if magic != INDEX_MAGIC or version not in (1, INDEX_VERSION):
+                raise ValueError(f"formato de índice desconhecido: {path}")
+            if version == 1:
+                _, _, _, count, sha256 = HEADER_STRUCT_V1.unpack_from(view, 0)
+                relocation_count = None
+                entries_start = HEADER_STRUCT_V1.size
+            else:
+                if len(view) < HEADER_STRUCT.size:
+                    raise ValueError(f"índice truncado: {path}")
+                _, _, _, count, relocation_count, sha256 = HEADER_STRUCT.unpack_from(view, 0)
+                entries_start = HEADER_STRUCT.size
+
+            relocations_start = entries_start + count * ENTRY_STRUCT.size
+            pointers_start = relocations_start + (relocation_count or 0) * RELOCATION_STRUCT.size
+            if pointers_start > len(view):
+                raise ValueError(f"índice truncado: {path}")
+            relocations = None
+            if relocation_count is not None:
+                relocations = list(RELOCATION_STRUCT.iter_unpack(view[relocations_start:pointers_start]))
+            total_pointers = (len(view) - pointers_start) // POINTER_STRUCT.size
+            pointer_locs = _u32_array(view[pointers_start:pointers_start + total_pointers * POINTER_STRUCT.size])
+            rows = _u32_array(view[entries_start:relocations_start])
+
+    # Os locais de cada string vêm logo depois dos da anterior (é assim que write_index grava),
+    # então os inícios gravados já são a coluna pointer_starts da StringTable.
+    pointer_starts = rows[2::4]
+    end = 0
+    for i, pointer_count in enumerate(rows[3::4]):
+        if i and pointer_starts[i] != end:
+            raise ValueError(f"índice inválido (locais de ponteiro fora de ordem): {path}")
+        end = pointer_starts[i] + pointer_count
+        if end > total_pointers:
+            raise ValueError(f"índice truncado: {path}")
+    pointer_starts.append(end if count else 0)
+    entries = scn_strings.StringTable(rows[0::4], rows[1::4], pointer_starts, pointer_locs)
+    return ScnIndex(sha256, entries, relocations)
+
+
+def index_path_for(txt_path):
+    """Caminho do índice que acompanha um dump .txt."""
+    base_path = txt_path[:-4] if txt_path.lower().endswith(".txt") else txt_path
+    return base_path + INDEX_EXTENSION
@@ -0,0 +1,383 @@
+"""
+Acesso direto aos .SCN dentro de uma imagem do disco (Sega Saturn), sem extrair nada.
+
+Aceita imagens ISO 9660 "cozidas" (setores de 2048 bytes) e imagens BIN cruas
+(setores de 2352 bytes, Mode 1 ou Mode 2 Form 1). A imagem é mapeada com mmap; os
+registros de diretório são percorridos para achar a extensão (setor inicial e
+tamanho) de cada arquivo.
+
+Os arquivos são guardados pelo caminho completo ("/SCN/A001.SCN"); o nome sozinho
+também serve, desde que ele não apareça em mais de uma pasta da imagem.
+
+Na gravação, o arquivo novo é escrito na própria extensão se couber no mesmo número
+de setores; senão ele é realocado para o fim da imagem. Nos dois casos o registro de
+diretório (setor e tamanho) é atualizado. Em imagens BIN, o EDC/ECC de cada setor
+alterado é recalculado.
+"""
+import mmap
+import os
+import shutil
+from collections import namedtuple
+
+SECTOR_SIZE = 2048
+RAW_SECTOR_SIZE = 2352
+SYNC_PATTERN = b'\x00' + b'\xff' * 10 + b'\x00'
+PVD_SECTOR = 16
+PVD_SIGNATURE = b'\x01CD001'
+
+# Campos do Primary Volume Descriptor e dos registros de diretório (ISO 9660).
+PVD_VOLUME_SPACE_SIZE = 80
+PVD_ROOT_RECORD = 156
+RECORD_EXTENT = 2
+RECORD_SIZE = 10
+RECORD_FLAGS = 25
+RECORD_NAME_LENGTH = 32
+RECORD_NAME = 33
+FLAG_DIRECTORY = 0x02
+
+# Estrutura dos setores crus.
+RAW_HEADER = 12
+RAW_MODE = 15
+MODE1_DATA = 16
+MODE2_FORM1_DATA = 24
+
+# name: nome sem ';1' e sem pasta; path: caminho completo na imagem ("/SCN/A001.SCN").
+# record_pos: posição (em bytes de dados do setor) do registro de diretório do arquivo.
+IsoEntry = namedtuple('IsoEntry', ['name', 'path', 'record_lba', 'record_offset', 'extent', 'size'])
+
+
+def _both_endian32(value):
+    return value.to_bytes(4, 'little') + value.to_bytes(4, 'big')
+
+
+def _sectors_for(size):
+    return (size + SECTOR_SIZE - 1) // SECTOR_SIZE
+
+
+# --- EDC/ECC dos setores crus (mesmo algoritmo do padrão CD-ROM / ECMA-130) ---
+
+def _build_tables():
+    ecc_f = [0] * 256
+    ecc_b = [0] * 256
+    edc = [0] * 256
+    for i in range(256):
+        j = ((i << 1) ^ (0x11D if i & 0x80 else 0)) & 0xFF
+        ecc_f[i] = j
+        ecc_b[i ^ j] = i
+        value = i
+        for _ in range(8):
+            value = (value >> 1) ^ (0xD8018001 if value & 1 else 0)
+        edc[i] = value
+    return ecc_f, ecc_b, edc
+
+
+ECC_F_TABLE, ECC_B_TABLE, EDC_TABLE = _build_tables()
+
+
+def compute_edc(data):
+    edc = 0
+    for byte in data:
+        edc = (edc >> 8) ^ EDC_TABLE[(edc ^ byte) & 0xFF]
+    return edc
+
+
+def _compute_ecc_block(sector, major_count, minor_count, major_mult, minor_inc, dest):
+    size = major_count * minor_count
+    for major in range(major_count):
+        index = (major >> 1) * major_mult + (major & 1)
+        ecc_a = 0
+        ecc_b = 0
+        for _ in range(minor_count):
+            value = sector[RAW_HEADER + index]
+            index += minor_inc
+            if index >= size:
+                index -= size
+            ecc_a ^= value
+            ecc_b ^= value
+            ecc_a = ECC_F_TABLE[ecc_a]
+        ecc_a = ECC_B_TABLE[ECC_F_TABLE[ecc_a] ^ ecc_b]
+        sector[dest + major] = ecc_a
+        sector[dest + major + major_count] = ecc_a ^ ecc_b
+
+
+def regenerate_edc_ecc(sector):
+    """Recalcula EDC e ECC (P e Q) de um setor cru de 2352 bytes (bytearray), Mode 1 ou Mode 2 Form 1."""
+    if sector[RAW_MODE] == 1:
+        sector[0x810:0x814] = compute_edc(sector[0:0x810]).to_bytes(4, 'little')
+        sector[0x814:0x81C] = bytes(8)
+        _compute_ecc_block(sector, 86, 24, 2, 86, 0x81C)
+        _compute_ecc_block(sector, 52, 43, 86, 88, 0x8C8)
+    else:
+        sector[0x818:0x81C] = compute_edc(sector[0x10:0x818]).to_bytes(4, 'little')
+        # No Mode 2 o endereço do cabeçalho não entra no ECC.
+        header = bytes(sector[RAW_HEADER:RAW_HEADER + 4])
+        sector[RAW_HEADER:RAW_HEADER + 4] = bytes(4)
+        _compute_ecc_block(sector, 86, 24, 2, 86, 0x81C)
+        _compute_ecc_block(sector, 52, 43, 86, 88, 0x8C8)
+        sector[RAW_HEADER:RAW_HEADER + 4] = header
+
+
+def _msf_header(lba, mode):
+    """Endereço absoluto em BCD (minuto, segundo, quadro) do cabeçalho de um setor cru."""
+    position = lba + 150
+    minutes, rest = divmod(position, 75 * 60)
+    seconds, frames = divmod(rest, 75)
+    to_bcd = lambda value: ((value // 10) << 4) | (value % 10)
+    return bytes([to_bcd(minutes), to_bcd(seconds), to_bcd(frames), mode])
+
+
+class DiscImage:
+    """
+    Imagem de disco mapeada em memória. Use como gerenciador de contexto:
+
+        with DiscImage("utena.bin") as image:
+            data = image.read_file("A001.SCN")
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        self._file = open(path, 'r+b' if writable else 'rb')
+        self._map = None
+        self._open_map()
+        self._detect_format()
+        self.files = {}       # caminho completo em maiúsculas -> IsoEntry
+        self._paths = {}      # nome em maiúsculas -> caminhos completos com esse nome
+        self._walk_directories()
+        for name, paths in sorted(self._paths.items()):
+            if len(paths) > 1:
+                print(f"AVISO: {name} aparece em mais de uma pasta de {os.path.basename(path)} "
+                      f"({', '.join(paths)}); use o caminho completo.")
+
+    # --- Infraestrutura ---
+
+    def _open_map(self):
+        access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+        self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+
+    def close(self):
+        if self._map is not None:
+            if self.writable:
+                self._map.flush()
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _detect_format(self):
+        if self._map[:len(SYNC_PATTERN)] == SYNC_PATTERN:
+            self.raw_sector_size = RAW_SECTOR_SIZE
+            self.mode = self._map[RAW_MODE]
+            if self.mode == 1:
+                self.data_offset = MODE1_DATA
+            elif self.mode == 2:
+                self.data_offset = MODE2_FORM1_DATA
+            else:
+                raise ValueError(f"modo de setor desconhecido ({self.mode}) em {self.path}")
+        else:
+            self.raw_sector_size = SECTOR_SIZE
+            self.mode = None
+            self.data_offset = 0
+
+        if len(self._map) < (PVD_SECTOR + 1) * self.raw_sector_size:
+            raise ValueError(f"imagem pequena demais para ser ISO 9660: {self.path}")
+        if bytes(self.sector(PVD_SECTOR)[:len(PVD_SIGNATURE)]) != PVD_SIGNATURE:
+            raise ValueError(f"descritor de volume ISO 9660 não encontrado em {self.path}")
+
+    @property
+    def sector_count(self):
+        return len(self._map) // self.raw_sector_size
+
+    def sector(self, lba):
+        """Os 2048 bytes de dados do setor `lba`, sem cópia (memoryview sobre o mmap)."""
+        start = lba * self.raw_sector_size + self.data_offset
+        return memoryview(self._map)[start:start + SECTOR_SIZE]
+
+    def _write_sector(self, lba, data):
+        """Grava os dados de um setor (completando com zeros) e, em BIN, refaz o EDC/ECC."""
+        data = bytes(data).ljust(SECTOR_SIZE, b'\x00')
+        start = lba * self.raw_sector_size
+        if self.raw_sector_size == SECTOR_SIZE:
+            self._map[start:start + SECTOR_SIZE] = data
+            return
+        raw = bytearray(self._map[start:start + RAW_SECTOR_SIZE])
+        raw[self.data_offset:self.data_offset + SECTOR_SIZE] = data
+        regenerate_edc_ecc(raw)
+        self._map[start:start + RAW_SECTOR_SIZE] = raw
+
+    def _grow(self, extra_sectors, template_lba):
+        """Acrescenta setores vazios ao fim da imagem. Retorna o primeiro setor novo."""
+        first_new = self.sector_count
+        self._map.close()
+        self._file.seek(0, os.SEEK_END)
+        template = None
+        if self.raw_sector_size == RAW_SECTOR_SIZE:
+            start = template_lba * RAW_SECTOR_SIZE
+            self._file.seek(start)
+            template = bytearray(self._file.read(RAW_SECTOR_SIZE))
+            self._file.seek(0, os.SEEK_END)
+        for k in range(extra_sectors):
+            if template is None:
+                self._file.write(bytes(SECTOR_SIZE))
+                continue
+            sector = bytearray(template)
+            sector[RAW_HEADER:RAW_HEADER + 4] = _msf_header(first_new + k, self.mode)
+            sector[self.data_offset:self.data_offset + SECTOR_SIZE] = bytes(SECTOR_SIZE)
+            regenerate_edc_ecc(sector)
+            self._file.write(sector)
+        self._file.flush()
+        self._open_map()
+        return first_new
+
+    # --- Diretórios ---
+
+    def _walk_directories(self):
+        root = bytes(self.sector(PVD_SECTOR)[PVD_ROOT_RECORD:PVD_ROOT_RECORD + 34])
+        pending = [("", int.from_bytes(root[RECORD_EXTENT:RECORD_EXTENT + 4], 'little'),
+                    int.from_bytes(root[RECORD_SIZE:RECORD_SIZE + 4], 'little'))]
+        visited = set()
+        while pending:
+            folder, extent, size = pending.pop()
+            if extent in visited:
+                continue
+            visited.add(extent)
+            for k in range(_sectors_for(size)):
+                lba = extent + k
+                sector = self.sector(lba)
+                offset = 0
+                while offset < SECTOR_SIZE:
+                    length = sector[offset]
+                    if length == 0:
+                        break   # O resto do setor é preenchimento; os registros continuam no próximo.
+                    record = bytes(sector[offset:offset + length])
+                    offset += length
+                    name_length = record[RECORD_NAME_LENGTH]
+                    raw_name = record[RECORD_NAME:RECORD_NAME + name_length]
+                    if raw_name in (b'\x00', b'\x01'):
+                        continue   # "." e ".."
+                    name = raw_name.decode('ascii', 'replace').split(';')[0]
+                    child_extent = int.from_bytes(record[RECORD_EXTENT:RECORD_EXTENT + 4], 'little')
+                    child_size = int.from_bytes(record[RECORD_SIZE:RECORD_SIZE + 4], 'little')
+                    path = f"{folder}/{name}"
+                    if record[RECORD_FLAGS] & FLAG_DIRECTORY:
+                        pending.append((path, child_extent, child_size))
+                    elif path.upper() not in self.files:
+                        self.files[path.upper()] = IsoEntry(name.upper(), path, lba, offset - length,
+                                                            child_extent, child_size)
+                        self._paths.setdefault(name.upper(), []).append(path.upper())
+
+    def resolve(self, name):
+        """
+        Caminho completo (em maiúsculas) do arquivo `name`: o próprio caminho completo
+        ("/SCN/A001.SCN" ou "SCN/A001.SCN"; na raiz, "/README.TXT") ou só o nome, se ele
+        for único na imagem. Levanta KeyError se o arquivo não existir e ValueError se o
+        nome aparecer em mais de uma pasta.
+        """
+        key = name.upper()
+        if '/' in key:
+            key = '/' + key.lstrip('/')
+            if key not in self.files:
+                raise KeyError(name)
+            return key
+        paths = self._paths.get(key)
+        if not paths:
+            raise KeyError(name)
+        if len(paths) > 1:
+            raise ValueError(f"{name} aparece em mais de uma pasta da imagem ({', '.join(paths)}); "
+                             "use o caminho completo")
+        return paths[0]
+
+    def list_files(self, extension):
+        """
+        Arquivos com a extensão dada, em ordem: o nome (em maiúsculas) de cada um ou,
+        para nomes repetidos em mais de uma pasta, o caminho completo.
+        """
+        names = []
+        for name, paths in self._paths.items():
+            if name.endswith(extension.upper()):
+                names.extend(paths if len(paths) > 1 else [name])
+        return sorted(names)
+
+    # --- Leitura e gravação de arquivos ---
+
+    def read_file(self, name):
+        """Conteúdo do arquivo. Em ISO é uma única fatia do mmap; em BIN, os setores são reunidos."""
+        entry = self.files[self.resolve(name)]
+        if self.raw_sector_size == SECTOR_SIZE:
+            start = entry.extent * SECTOR_SIZE
+            return self._map[start:start + entry.size]
+        chunks = [self.sector(entry.extent + k) for k in range(_sectors_for(entry.size))]
+        return b''.join(chunks)[:entry.size]
+
+    def write_file(self, name, data):
+        """
+        Grava o novo conteúdo do arquivo e atualiza seu registro de diretório.
+        Retorna True se o arquivo precisou ser realocado para o fim da imagem.
+        """
+        if not self.writable:
+            raise PermissionError(f"imagem aberta só para leitura: {self.path}")
+        entry = self.files[self.resolve(name)]
+        old_sectors = _sectors_for(entry.size)
+        new_sectors = _sectors_for(len(data))
+
+        relocated = new_sectors > old_sectors
+        extent = self._grow(new_sectors, entry.extent) if relocated else entry.extent
+
+        view = memoryview(data)
+        for k in range(new_sectors):
+            self._write_sector(extent + k, view[k * SECTOR_SIZE:(k + 1) * SECTOR_SIZE])
+
+        # Atualiza o registro de diretório (setor inicial e tamanho, nos dois formatos de bytes).
+        record_sector = bytearray(self.sector(entry.record_lba))
+        position = entry.record_offset
+        record_sector[position + RECORD_EXTENT:position + RECORD_EXTENT + 8] = _both_endian32(extent)
+        record_sector[position + RECORD_SIZE:position + RECORD_SIZE + 8] = _both_endian32(len(data))
+        self._write_sector(entry.record_lba, record_sector)
+
+        if relocated:
+            pvd = bytearray(self.sector(PVD_SECTOR))
+            pvd[PVD_VOLUME_SPACE_SIZE:PVD_VOLUME_SPACE_SIZE + 8] = _both_endian32(self.sector_count)
+            self._write_sector(PVD_SECTOR, pvd)
+
+        self.files[entry.path.upper()] = entry._replace(extent=extent, size=len(data))
+        return relocated
+
+
+_image_cache = {}
+
+
+def open_image_cached(path):
+    """
+    DiscImage só para leitura, aberta uma vez por processo: os registros de diretório
+    são percorridos uma vez só, e cada arquivo lido depois é só uma fatia do mmap.
+    A imagem é aberta de novo se o tamanho ou a data dela mudarem.
+    """
+    status = os.stat(path)
+    stamp = (status.st_size, status.st_mtime_ns)
+    key = os.path.abspath(path)
+    cached = _image_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    image = DiscImage(path)
+    _image_cache[key] = (stamp, image)
+    return image
+
+
+def image_fingerprint(path):
+    """Identificação barata da imagem para o cache incremental (caminho, tamanho e data)."""
+    status = os.stat(path)
+    return {'image': os.path.abspath(path), 'image_size': status.st_size, 'image_mtime': status.st_mtime_ns}
+
+
+def prepare_output_image(source_path, output_path):
+    """Cria a imagem de saída como cópia da original, se ela ainda não existir."""
+    if not os.path.exists(output_path):
+        print(f"--> Copiando a imagem original para {output_path} (só na primeira vez).")
+        shutil.copyfile(source_path, output_path)
@@ -0,0 +1,114 @@
+"""
+Leitura estruturada do bytecode dos .SCN a partir de uma tabela de opcodes.
+
+A varredura bruta do dump.py trata cada offset da área de ponteiros como um
+possível ponteiro de 16 bits. Com uma tabela de opcodes, o bytecode é percorrido
+comando a comando (cada opcode tem um tamanho fixo conhecido) e só os operandos
+marcados como ponteiro de texto viram candidatos. Ao encontrar um opcode que não
+está na tabela (ou um comando que passaria do fim da área), o resto da área volta
+para a varredura bruta, então uma tabela incompleta nunca perde ponteiros: só
+deixa de ganhar com a parte que não cobre.
+
+Formato da tabela (JSON; números podem ser inteiros ou texto em hexa, "0x1F"):
+    {
+      "bytecode_start": "0x0C",
+      "opcodes": {
+        "0x00": {"length": 1, "name": "fim"},
+        "0x10": {"length": 5, "text_pointers": [1, 3], "name": "fala"}
+      }
+    }
+`bytecode_start` é onde o primeiro comando começa (o cabeçalho antes dele
+continua na varredura bruta, por causa do ponteiro âncora); `length` conta o
+próprio opcode; `text_pointers` são as posições, dentro do comando, dos operandos
+de 16 bits que apontam para strings.
+"""
+import json
+from collections import namedtuple
+from functools import lru_cache
+
+DEFAULT_BYTECODE_START = 0x0C
+
+# lengths: 256 tamanhos (0 = opcode desconhecido); text_pointers: 256 tuplas de posições.
+OpcodeTable = namedtuple('OpcodeTable', ['bytecode_start', 'lengths', 'text_pointers', 'names'])
+# stop: onde a leitura parou (== fim da área se cobriu tudo); unknown_opcode: o byte em
+# `stop` se a parada foi por opcode desconhecido, senão None.
+WalkResult = namedtuple('WalkResult', ['pointer_locs', 'commands', 'stop', 'unknown_opcode'])
+
+
+def _number(value, what):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value, 0)
+        except ValueError:
+            pass
+    raise ValueError(f"{what}: número inválido {value!r}")
+
+
+def parse_opcode_table(content):
+    """Monta a OpcodeTable a partir do JSON já carregado. Levanta ValueError se estiver errado."""
+    if not isinstance(content, dict) or not isinstance(content.get('opcodes'), dict):
+        raise ValueError("a tabela precisa de um objeto 'opcodes'")
+    bytecode_start = _number(content.get('bytecode_start', DEFAULT_BYTECODE_START), "bytecode_start")
+    lengths = [0] * 256
+    text_pointers = [()] * 256
+    names = {}
+    for key, spec in content['opcodes'].items():
+        opcode = _number(key, "opcode")
+        if not 0 <= opcode <= 0xFF:
+            raise ValueError(f"opcode fora de 0x00-0xFF: {key}")
+        if not isinstance(spec, dict):
+            raise ValueError(f"opcode {key}: esperado um objeto com 'length'")
+        length = _number(spec.get('length'), f"opcode {key}, length")
+        if length < 1:
+            raise ValueError(f"opcode {key}: length precisa ser pelo menos 1")
+        positions = tuple(sorted(_number(position, f"opcode {key}, text_pointers")
+                                 for position in spec.get('text_pointers', ())))
+        for position in positions:
+            if not 1 <= position <= length - 2:
+                raise ValueError(f"opcode {key}: operando na posição {position} não cabe num comando de {length} bytes")
+        lengths[opcode] = length
+        text_pointers[opcode] = positions
+        if 'name' in spec:
+            names[opcode] = str(spec['name'])
+    return OpcodeTable(bytecode_start, tuple(lengths), tuple(text_pointers), names)
+
+
+@lru_cache(maxsize=None)
+def load_opcode_table(path):
+    """
+    Lê a tabela de opcodes (uma vez por processo e caminho). Levanta OSError se o
+    arquivo não puder ser lido e ValueError se o conteúdo for inválido.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            content = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON inválido: {e}") from None
+    return parse_opcode_table(content)
+
+
+def walk_bytecode(data, table, area_end):
+    """
+    Percorre os comandos de `table.bytecode_start` até `area_end` e devolve os locais
+    dos operandos de ponteiro de texto, em ordem. Para no primeiro opcode desconhecido
+    ou no primeiro comando que passaria de `area_end`.
+    """
+    lengths = table.lengths
+    text_pointers = table.text_pointers
+    pointer_locs = []
+    commands = 0
+    position = table.bytecode_start
+    while position < area_end:
+        opcode = data[position]
+        length = lengths[opcode]
+        if not length:
+            return WalkResult(pointer_locs, commands, position, opcode)
+        if position + length > area_end:
+            break
+        for operand in text_pointers[opcode]:
+            pointer_locs.append(position + operand)
+        commands += 1
+        position += length
+    return WalkResult(pointer_locs, commands, position, None)
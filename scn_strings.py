@@ -0,0 +1,94 @@
+"""
+Modelo compacto das strings de um .SCN, usado pelo dump.py, refine.py e repack.py.
+
+- StringRecord: uma string (offset, tamanho original em bytes, locais dos
+  ponteiros, texto), com __slots__ no lugar de um dicionário por string.
+- StringTable: as mesmas informações para todas as strings de um arquivo, em
+  colunas (struct-of-arrays): offsets e tamanhos em array('I'), os locais de
+  ponteiro de todas as strings num único array('I') e, para cada string, o início
+  dos seus locais nele (`pointer_starts`, com uma posição a mais no fim); os
+  textos ficam numa lista (None enquanto não forem conhecidos).
+
+Os locais dos ponteiros da string i são pointer_locs[pointer_starts[i]:pointer_starts[i + 1]].
+Numa tabela ordenada por offset, a sequência de pares (local, offset) na ordem
+das colunas é a própria tabela de relocação do scn_index.
+"""
+from array import array
+
+
+def relocations_of(records):
+    """Pares (local, offset) de todos os ponteiros de registros em ordem de offset (a tabela de relocação)."""
+    return [(loc, record.offset) for record in records for loc in record.pointer_locs]
+
+
+class StringRecord:
+    """Uma string do .SCN. `length` é 0 quando o tamanho original não é conhecido."""
+    __slots__ = ('offset', 'length', 'pointer_locs', 'text')
+
+    def __init__(self, offset, length, pointer_locs, text=None):
+        self.offset = offset
+        self.length = length
+        self.pointer_locs = pointer_locs
+        self.text = text
+
+    def __repr__(self):
+        return f"{type(self).__name__}(0x{self.offset:X}, {self.length}, {list(self.pointer_locs)}, {self.text!r})"
+
+
+class StringTable:
+    """Strings de um arquivo em colunas. Indexar ou iterar devolve StringRecord."""
+    __slots__ = ('offsets', 'lengths', 'pointer_starts', 'pointer_locs', 'texts')
+
+    def __init__(self, offsets=None, lengths=None, pointer_starts=None, pointer_locs=None, texts=None):
+        self.offsets = offsets if offsets is not None else array('I')
+        self.lengths = lengths if lengths is not None else array('I', bytes(4 * len(self.offsets)))
+        self.pointer_starts = pointer_starts if pointer_starts is not None else array('I', [0])
+        self.pointer_locs = pointer_locs if pointer_locs is not None else array('I')
+        self.texts = texts if texts is not None else [None] * len(self.offsets)
+
+    @classmethod
+    def from_records(cls, records):
+        table = cls()
+        for record in records:
+            table.append(record.offset, record.length, record.pointer_locs, record.text)
+        return table
+
+    def append(self, offset, length, pointer_locs, text=None):
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.pointer_locs.extend(pointer_locs)
+        self.pointer_starts.append(len(self.pointer_locs))
+        self.texts.append(text)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def locs(self, i):
+        """Locais dos ponteiros da string i (um array('I') novo)."""
+        return self.pointer_locs[self.pointer_starts[i]:self.pointer_starts[i + 1]]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.offsets)
+        return StringRecord(self.offsets[i], self.lengths[i], self.locs(i), self.texts[i])
+
+    def __iter__(self):
+        for i in range(len(self.offsets)):
+            yield self[i]
+
+    def select(self, indices):
+        """Nova tabela só com as strings de `indices`, nessa ordem."""
+        table = StringTable()
+        for i in indices:
+            table.append(self.offsets[i], self.lengths[i],
+                         self.pointer_locs[self.pointer_starts[i]:self.pointer_starts[i + 1]], self.texts[i])
+        return table
+
+    def sorted_by_offset(self):
+        return self.select(sorted(range(len(self.offsets)), key=self.offsets.__getitem__))
+
+    def relocations(self):
+        """Gera os pares (local, offset) de todos os ponteiros, na ordem das colunas, sem montar uma lista."""
+        offsets = self.offsets
+        starts = self.pointer_starts
+        return ((self.pointer_locs[j], offsets[i]) for i in range(len(offsets)) for j in range(starts[i], starts[i + 1]))
@@ -0,0 +1,209 @@
+"""
+Tabela global de strings: uma planilha de tradução sem repetições para o corpus inteiro.
+
+Falas repetidas, nomes e mensagens do sistema aparecem em muitos .SCN. Depois do
+refine, os textos de todos os filtered_files/*.txt são agrupados pela chave (hash
+do texto decodificado) e gravados uma vez só em sheet/strings.txt, no mesmo formato
+de blocos dos dumps:
+
+    ####################################
+    // STRING #1
+    // Chave: 3f9a0c1d2e4b5a69
+    // Ocorrências: 12 (A001, A002, B010, ...)
+
+    Texto da string
+
+    <END>
+    ####################################
+
+Ao lado fica sheet/mapping.json, que liga cada arquivo de volta aos offsets:
+    {"version": 1, "files": {"A001": [[offset, chave], ...], ...}}
+
+Com `repack.py --sheet`, cada string mapeada recebe o texto da planilha (que tem
+prioridade sobre o .txt do arquivo). Reconstruir a planilha preserva o texto já
+traduzido de todas as chaves que continuam existindo.
+
+Uso direto (sem rodar o refine): python string_table.py
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+
+import dump_format
+import scn_index
+
+TEXT_FOLDER = "filtered_files"
+SHEET_FOLDER = "sheet"
+SHEET_NAME = "strings.txt"
+MAPPING_NAME = "mapping.json"
+MAPPING_VERSION = 1
+# Quantos arquivos listar no comentário de ocorrências de cada string.
+OCCURRENCE_NAMES = 5
+
+KEY_PATTERN = re.compile(r"// Chave:\s+([0-9a-f]{16})")
+
+
+def text_key(text):
+    """Chave de uma string: 64 bits do BLAKE2b do texto decodificado, em hexa."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def sheet_paths(sheet_folder=SHEET_FOLDER):
+    return os.path.join(sheet_folder, SHEET_NAME), os.path.join(sheet_folder, MAPPING_NAME)
+
+
+def read_file_strings(txt_path):
+    """
+    [(offset, texto)] de um .txt filtrado, na ordem dos blocos. Os offsets vêm do .idx
+    quando ele existe e bate com o .txt; senão, dos comentários "// String Offset".
+    """
+    parser = dump_format.DumpParser(os.path.basename(txt_path))
+    with open(txt_path, 'r', encoding='utf-8') as f:
+        blocks = list(parser.parse(f))
+    try:
+        entries = scn_index.read_index(scn_index.index_path_for(txt_path)).entries
+    except (FileNotFoundError, ValueError):
+        entries = None
+    if entries is not None and len(entries) == len(blocks):
+        return [(offset, block.text) for offset, block in zip(entries.offsets, blocks)]
+    return [(block.string_offset, block.text) for block in blocks if block.string_offset is not None]
+
+
+def collect_strings(txt_paths):
+    """
+    Agrupa as strings de vários .txt pela chave.
+    Retorna (textos {chave: texto} na ordem da primeira ocorrência,
+             arquivos {chave: [nomes]}, mapeamento {nome: [[offset, chave]]}).
+    """
+    texts = {}
+    files_by_key = {}
+    mapping = {}
+    for txt_path in sorted(txt_paths):
+        name = os.path.splitext(os.path.basename(txt_path))[0]
+        pairs = []
+        for offset, text in read_file_strings(txt_path):
+            key = text_key(text)
+            texts.setdefault(key, text)
+            files_by_key.setdefault(key, []).append(name)
+            pairs.append([offset, key])
+        mapping[name] = pairs
+    return texts, files_by_key, mapping
+
+
+def read_sheet(sheet_path):
+    """{chave: texto} de uma planilha. Levanta FileNotFoundError se ela não existir."""
+    parser = dump_format.DumpParser(os.path.basename(sheet_path))
+    translations = {}
+    with open(sheet_path, 'r', encoding='utf-8') as f:
+        for block in parser.parse(f):
+            match = KEY_PATTERN.search(block.raw)
+            if match is None:
+                parser.warn(block.line, "bloco sem '// Chave'; ignorado.")
+                continue
+            translations[match.group(1)] = block.text
+    return translations
+
+
+def format_sheet_block(number, key, text, names):
+    shown = ", ".join(dict.fromkeys(names[:OCCURRENCE_NAMES]))
+    if len(names) > OCCURRENCE_NAMES:
+        shown += ", ..."
+    return (f"{dump_format.BLOCK_SEPARATOR}\n"
+            f"{dump_format.STRING_MARKER}{number}\n"
+            f"// Chave: {key}\n"
+            f"// Ocorrências: {len(names)} ({shown})\n\n"
+            f"{text}\n\n"
+            f"{dump_format.END_MARKER}\n"
+            f"{dump_format.BLOCK_SEPARATOR}\n\n")
+
+
+def build_sheet(text_folder=TEXT_FOLDER, sheet_folder=SHEET_FOLDER):
+    """
+    (Re)gera a planilha e o mapeamento a partir dos .txt de `text_folder`, mantendo o
+    texto que a planilha anterior já tinha para cada chave. Retorna False se não
+    houver o que agrupar.
+    """
+    txt_paths = glob.glob(os.path.join(text_folder, "*.txt"))
+    if not txt_paths:
+        return False
+    texts, files_by_key, mapping = collect_strings(txt_paths)
+    sheet_path, mapping_path = sheet_paths(sheet_folder)
+    try:
+        previous = read_sheet(sheet_path)
+    except FileNotFoundError:
+        previous = {}
+    kept = sum(1 for key in texts if key in previous and previous[key] != texts[key])
+
+    os.makedirs(sheet_folder, exist_ok=True)
+    with open(sheet_path, 'w', encoding='utf-8') as f_out:
+        f_out.write(f"// Planilha de tradução: {len(texts)} strings únicas de {len(mapping)} arquivos\n\n")
+        for number, (key, text) in enumerate(texts.items(), 1):
+            f_out.write(format_sheet_block(number, key, previous.get(key, text), files_by_key[key]))
+    with open(mapping_path, 'w', encoding='utf-8') as f_out:
+        json.dump({'version': MAPPING_VERSION, 'files': mapping}, f_out, separators=(',', ':'))
+
+    occurrences = sum(len(pairs) for pairs in mapping.values())
+    saved = 100 * (1 - len(texts) / occurrences) if occurrences else 0
+    print(f"=== Planilha: {len(texts)} strings únicas de {occurrences} ocorrências em {len(mapping)} arquivo(s) "
+          f"({saved:.1f}% a menos para traduzir) -> {sheet_path} ===")
+    if kept:
+        print(f"--> {kept} tradução(ões) da planilha anterior preservada(s).")
+    return True
+
+
+def load_sheet(sheet_folder=SHEET_FOLDER):
+    """
+    Lê a planilha e o mapeamento. Retorna (traduções {chave: texto},
+    mapeamento {nome: {offset: chave}}). Levanta OSError/ValueError se faltarem ou estiverem inválidos.
+    """
+    sheet_path, mapping_path = sheet_paths(sheet_folder)
+    translations = read_sheet(sheet_path)
+    with open(mapping_path, 'r', encoding='utf-8') as f:
+        try:
+            content = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{mapping_path}: JSON inválido: {e}") from None
+    if not isinstance(content, dict) or content.get('version') != MAPPING_VERSION:
+        raise ValueError(f"{mapping_path}: versão de mapeamento desconhecida")
+    mapping = {name: {offset: key for offset, key in pairs} for name, pairs in content['files'].items()}
+    return translations, mapping
+
+
+_sheet_cache = {}
+
+
+def load_sheet_cached(sheet_folder=SHEET_FOLDER):
+    """load_sheet, reaproveitando a leitura anterior enquanto os dois arquivos não mudarem."""
+    stamp = tuple(os.stat(path).st_mtime_ns for path in sheet_paths(sheet_folder))
+    cached = _sheet_cache.get(sheet_folder)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    sheet = load_sheet(sheet_folder)
+    _sheet_cache[sheet_folder] = (stamp, sheet)
+    return sheet
+
+
+def apply_sheet(name, strings_info, sheet):
+    """
+    Troca o texto das strings de `name` que estão no mapeamento pelo texto da
+    planilha. Retorna quantas strings vieram da planilha.
+    """
+    translations, mapping = sheet
+    offsets = mapping.get(name)
+    if not offsets:
+        return 0
+    applied = 0
+    texts = strings_info.texts
+    for i, original_offset in enumerate(strings_info.offsets):
+        key = offsets.get(original_offset)
+        if key is not None and key in translations:
+            texts[i] = translations[key]
+            applied += 1
+    return applied
+
+
+if __name__ == "__main__":
+    if not build_sheet():
+        print(f"Nenhum arquivo '.txt' encontrado na pasta '{TEXT_FOLDER}'.")
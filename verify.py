@@ -0,0 +1,272 @@
+"""
+Verificação de ida e volta: dump -> refine -> repack com o texto sem tradução.
+
+Cada .SCN passa pelo pipeline inteiro em memória (nada é gravado em disco): as
+strings são extraídas e filtradas como no dump.py, o dump é filtrado e renumerado
+pelo refine.py, e os textos resultantes são codificados de volta e reinseridos
+pelo repack.py, pelo patch no lugar e pela reconstrução do bloco de texto. Sem
+tradução, os dois caminhos precisam devolver o .SCN original byte a byte.
+
+A comparação é feita em blocos de memoryview; na primeira diferença o relatório
+mostra o offset, os bytes e a quem ele pertence (o ponteiro da área de ponteiros
+ou a string e o texto dela). Os arquivos rodam em paralelo (--jobs, padrão: um
+processo por CPU) e o código de saída é 1 se algum arquivo não bater, para uso
+em hooks de commit e CI.
+
+Uso: python verify.py [--image IMAGEM] [--mode patch|relocate|both] [-j N] [-q]
+"""
+import argparse
+import bisect
+import glob
+import os
+import struct
+import sys
+import time
+
+import batch
+import dump
+import dump_format
+import metrics
+import refine
+import repack
+import scn_iso
+import scn_strings
+
+# --- CONFIGURAÇÃO ---
+INPUT_FOLDER = dump.INPUT_FOLDER
+FILE_EXTENSION = dump.FILE_EXTENSION
+# Tamanho de cada bloco comparado de uma vez.
+COMPARE_CHUNK_SIZE = 4096
+# Quantos caracteres do texto da string mostrar no relatório de diferença.
+PREVIEW_LENGTH = 40
+
+MODES = {'patch': ('patch',), 'relocate': ('relocate',), 'both': ('patch', 'relocate')}
+
+
+def first_difference(original, rebuilt, start=0, chunk_size=COMPARE_CHUNK_SIZE):
+    """
+    Offset do primeiro byte diferente entre os dois buffers, a partir de `start` (o fim
+    do menor, se um for prefixo do outro), ou None se forem idênticos. Compara blocos de
+    `chunk_size` bytes por memoryview, sem copiar, e só desce ao byte no bloco que difere.
+    """
+    original_view = memoryview(original)
+    rebuilt_view = memoryview(rebuilt)
+    size = min(len(original_view), len(rebuilt_view))
+    for start in range(start, size, chunk_size):
+        end = min(start + chunk_size, size)
+        if original_view[start:end] != rebuilt_view[start:end]:
+            for offset in range(start, end):
+                if original_view[offset] != rebuilt_view[offset]:
+                    return offset
+    if len(original_view) != len(rebuilt_view):
+        return max(size, start)
+    return None
+
+
+def pointer_area_end_of(data):
+    return struct.unpack_from('<H', data, dump.ANCHOR_POINTER_OFFSET)[0]
+
+
+def describe_offset(offset, original_data, strings_info, relocations):
+    """A que parte do .SCN original o offset pertence: um ponteiro, uma string ou os dados entre elas."""
+    if offset < pointer_area_end_of(original_data):
+        pointers = [(loc, target) for loc, target in relocations or () if loc <= offset <= loc + 1]
+        if not pointers:
+            return "área de ponteiros/bytecode, fora de qualquer ponteiro conhecido"
+        return ", ".join(f"ponteiro em 0x{loc:08X} (alvo 0x{target:08X})" for loc, target in pointers)
+
+    i = bisect.bisect_right(strings_info.offsets, offset) - 1
+    if i < 0:
+        return "área de texto, antes da primeira string"
+    string_info = strings_info[i]
+    string_end = string_info.offset + string_info.length
+    preview = string_info.text[:PREVIEW_LENGTH].replace("\n", "\\n")
+    where = f"STRING #{i + 1} (0x{string_info.offset:08X}) \"{preview}\""
+    if offset > string_end:
+        return f"dados preservados depois da {where}"
+    return where
+
+
+def report_difference(file_name, mode, original_data, rebuilt, strings_info, relocations):
+    offset = first_difference(original_data, rebuilt)
+    if offset is None:
+        return True
+    original_byte = f"{original_data[offset]:02X}" if offset < len(original_data) else "fim"
+    rebuilt_byte = f"{rebuilt[offset]:02X}" if offset < len(rebuilt) else "fim"
+    print(f"ERRO: {file_name} ({mode}): primeira diferença em 0x{offset:08X} "
+          f"(original {original_byte}, reconstruído {rebuilt_byte}) -> "
+          f"{describe_offset(offset, original_data, strings_info, relocations)}")
+    # Um ponteiro diferente costuma ser consequência de algo que mudou de tamanho no texto.
+    pointer_area_end = pointer_area_end_of(original_data)
+    if offset < pointer_area_end:
+        text_offset = first_difference(original_data, rebuilt, pointer_area_end)
+        if text_offset is not None:
+            print(f"  Primeira diferença no texto: 0x{text_offset:08X} -> "
+                  f"{describe_offset(text_offset, original_data, strings_info, relocations)}")
+    if len(rebuilt) != len(original_data):
+        print(f"  Tamanho: original {len(original_data)} bytes, reconstruído {len(rebuilt)} bytes.")
+    return False
+
+
+def run_pipeline(file_name, data, opcode_table):
+    """
+    dump -> refine em memória. Retorna (strings, tabela_de_relocação) como o repack as
+    leria do .txt filtrado e do .idx, None se o arquivo não tiver strings de texto
+    ou False se o .txt filtrado não bater com as strings mantidas.
+    """
+    records = dump.extract_string_records(data, opcode_table)
+    if records is None:
+        return None
+    with metrics.phase("filter"):
+        valid_records = [record for record in records if dump.is_valid_text_record(record)]
+    if not valid_records:
+        return None
+    dump_text = dump.format_filtered_dump(file_name, valid_records)
+    refined_text, positions, _ = refine.refine_dump(dump_text.splitlines(keepends=True), file_name)
+    if not positions:
+        return None
+
+    with metrics.phase("read"):
+        parser = dump_format.DumpParser(file_name)
+        texts = [block.text for block in parser.parse(refined_text.splitlines(keepends=True))]
+    if len(texts) != len(positions):
+        print(f"ERRO: {file_name}: o .txt filtrado tem {len(texts)} blocos de texto, "
+              f"mas o refine manteve {len(positions)} strings.")
+        return False
+    # O mesmo que o dump e o refine gravariam no .idx.
+    entries = scn_strings.StringTable.from_records(valid_records).select(positions)
+    relocations = scn_strings.relocations_of(records)
+    return repack.strings_info_from_index(entries, texts), relocations
+
+
+def verify_data(file_name, data, opcode_table=None, modes=MODES['both']):
+    """Roda o pipeline em memória sobre `data` e compara cada modo de repack com o original."""
+    start = time.perf_counter()
+    # As mensagens por arquivo do dump/refine/repack não interessam aqui; erros e avisos continuam.
+    level = metrics.get_level()
+    metrics.set_level(metrics.QUIET)
+    try:
+        pipeline = run_pipeline(file_name, data, opcode_table)
+    finally:
+        metrics.set_level(level)
+    if pipeline is False:
+        return False
+    if pipeline is None:
+        metrics.count("files_without_strings")
+        metrics.info(f"--  {file_name}: nenhuma string de texto; nada a reconstruir.")
+        return True
+    strings_info, relocations = pipeline
+
+    with metrics.phase("encode"):
+        encoded_texts = [repack.convert_text_to_bytes(text) for text in strings_info.texts]
+
+    ok = True
+    for mode in modes:
+        try:
+            with metrics.phase(mode):
+                if mode == 'patch':
+                    rebuilt = repack.patch_scn_in_place(data, strings_info, encoded_texts)[0]
+                else:
+                    rebuilt = repack.rebuild_scn(data, strings_info, encoded_texts, relocations)[0]
+        except OverflowError as error:
+            print(f"ERRO: {file_name} ({mode}): {error}")
+            ok = False
+            continue
+        if rebuilt is None:
+            print(f"ERRO: {file_name} ({mode}): o texto original não coube no próprio lugar.")
+            ok = False
+            continue
+        with metrics.phase("compare"):
+            ok = report_difference(file_name, mode, data, rebuilt, strings_info, relocations) and ok
+
+    metrics.count("files")
+    metrics.count("strings", len(strings_info))
+    metrics.count("bytes_verified", len(data))
+    if ok:
+        metrics.count("files_identical")
+        metrics.info(f"OK  {file_name}: {len(strings_info)} strings, {' e '.join(modes)} idênticos ao original "
+                     f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    return ok
+
+
+def verify_file(file_path, opcodes_path=None, modes=MODES['both']):
+    with metrics.phase("read"):
+        data = dump.load_scn(file_path)
+    if data is None:
+        return False
+    return verify_data(os.path.basename(file_path), data, dump.load_opcode_table(opcodes_path), modes)
+
+
+def verify_image_file(image_path, file_name, opcodes_path=None, modes=MODES['both']):
+    try:
+        with metrics.phase("read"):
+            data = scn_iso.open_image_cached(image_path).read_file(file_name)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERRO: Não foi possível ler '{file_name}' da imagem '{image_path}': {e}")
+        return False
+    return verify_data(file_name, data, dump.load_opcode_table(opcodes_path), modes)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Confere que dump -> refine -> repack sem tradução devolve cada .SCN original byte a byte.")
+    batch.add_jobs_argument(parser)
+    parser.set_defaults(jobs=0)
+    parser.add_argument("--image", metavar="IMAGEM",
+                        help="lê os .SCN direto de uma imagem ISO/BIN do disco, em vez da pasta de entrada")
+    parser.add_argument("--opcodes", metavar="TABELA.json",
+                        help=f"tabela de opcodes para ler o bytecode (padrão: '{dump.OPCODE_TABLE_FILE}', se existir)")
+    parser.add_argument("--brute-force", action="store_true",
+                        help="ignora a tabela de opcodes e varre todos os offsets da área de ponteiros")
+    parser.add_argument("--mode", choices=list(MODES), default="both",
+                        help="caminho do repack a conferir: patch no lugar, reconstrução do bloco de texto "
+                             "ou os dois (padrão)")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure(args)
+
+    opcodes_path = None
+    if not args.brute_force:
+        opcodes_path = args.opcodes or (dump.OPCODE_TABLE_FILE if os.path.exists(dump.OPCODE_TABLE_FILE) else None)
+    if opcodes_path:
+        try:
+            dump.load_opcode_table(opcodes_path)
+        except (OSError, ValueError) as e:
+            print(f"ERRO: Tabela de opcodes inválida '{opcodes_path}': {e}")
+            return 1
+
+    modes = MODES[args.mode]
+    if args.image:
+        try:
+            with scn_iso.DiscImage(args.image) as image:
+                files_to_verify = image.list_files(FILE_EXTENSION)
+        except (OSError, ValueError) as e:
+            print(f"ERRO: Não foi possível abrir a imagem '{args.image}': {e}")
+            return 1
+        tasks = [(name, (args.image, name, opcodes_path, modes)) for name in files_to_verify]
+        source_description = f"na imagem '{args.image}'"
+    else:
+        files_to_verify = sorted(glob.glob(os.path.join(INPUT_FOLDER, f"*{FILE_EXTENSION}")))
+        tasks = [(os.path.basename(path), (path, opcodes_path, modes)) for path in files_to_verify]
+        source_description = f"na pasta '{INPUT_FOLDER}'"
+    if not tasks:
+        print(f"Nenhum arquivo '{FILE_EXTENSION}' encontrado {source_description}.")
+        return 1
+
+    start = time.perf_counter()
+    with metrics.session(args, "verify"):
+        results = batch.run_batch(verify_image_file if args.image else verify_file, tasks, args.jobs)
+    elapsed = time.perf_counter() - start
+
+    counters = metrics.snapshot()['counters']
+    verified_bytes = counters.get("bytes_verified", 0)
+    failures = sum(1 for result in results if not result.ok)
+    print(f"=== Verificação ({' + '.join(modes)}): {len(results) - failures} de {len(results)} arquivo(s) "
+          f"idênticos ao original, {verified_bytes / 1e6:.1f} MB em {elapsed:.2f} s "
+          f"({verified_bytes / 1e6 / elapsed if elapsed else 0:.1f} MB/s, "
+          f"{min(batch.resolve_jobs(args.jobs), len(tasks))} processo(s)) ===")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())